@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from rest_framework import status
 
+from apps.core import streaming
 from accounts.api.serializers import AdminUserSerializer
 
 User = get_user_model()
@@ -14,8 +15,7 @@ class AdminUsersList(APIView):
 
     def get(self, request):
         users = User.objects.all().order_by("school_id")
-        serializer = AdminUserSerializer(users, many=True)
-        return Response(serializer.data)
+        return streaming.stream_list(request, users, AdminUserSerializer)
 
 
 class AdminChangeUserRole(APIView):
@@ -13,7 +13,7 @@ from apps.accounts.api.serializers import (
     StudentProfileSerializer,
     StudentProfileUpdateSerializer,
 )
-from apps.notes.models import Note
+from apps.notes.stats import user_note_counts
 
 
 MAX_AVATAR_SIZE = 2 * 1024 * 1024  # 2MB
@@ -127,7 +127,7 @@ class ProfileAPIView(APIView):
 
     def get(self, request):
         user = request.user
-        notes_count = Note.objects.filter(uploader=user).count()
+        notes_count = user_note_counts(user)["uploaded"]
 
         return Response({
             "school_id": user.school_id,
@@ -10,7 +10,8 @@ from .forms import (
     ProfileForm,
 )
 from .models import Profile
-from apps.notes.models import Note
+from apps.notes import visibility
+from apps.notes.stats import user_note_counts
 
 
 # ============================
@@ -86,11 +87,8 @@ def profile_view(request):
     )
 
     saved_notes = (
-        Note.objects.filter(
-            bookmarked_by__user=request.user,
-            is_deleted=False,
-            is_approved=True,
-        )
+        visibility.feed(request.user)
+        .filter(bookmarked_by__user=request.user)
         .select_related("uploader", "subject")
         .order_by("-uploaded_at")
     )
@@ -117,6 +115,7 @@ def profile_view(request):
             "form": form,
             "profile": profile,
             "saved_notes": saved_notes,
+            "note_counts": user_note_counts(request.user),
         },
     )
 
@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import OutboxEmail
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "subject",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "sent_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("subject", "recipients")
+    readonly_fields = ("attempts", "claimed_by", "last_error", "sent_at")
@@ -0,0 +1,499 @@
+"""
+Multi-process channel layer backed by a local Unix-socket broker.
+
+This is the stand-in for channels_redis when running several Daphne /
+Uvicorn workers on one host: every worker connects to one broker
+process (`manage.py run_channel_broker`), which owns group membership
+and routes send()/group_send() to the worker that holds each channel.
+A group_send to 1k sockets spread over N workers costs N frames, one per
+worker, each listing that worker's channels.
+
+Frames are a 4-byte big-endian length followed by a JSON object, so
+messages must be JSON-serializable (the consumers only send dicts of
+strings/numbers).
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import string
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+
+from channels.layers import BaseChannelLayer
+
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+
+
+# ======================================================
+# FRAMING
+# ======================================================
+def encode_frame(payload):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    return HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader):
+    try:
+        header = await reader.readexactly(HEADER.size)
+        (length,) = HEADER.unpack(header)
+        if length > MAX_FRAME:
+            raise ValueError(f"frame of {length} bytes exceeds limit")
+        return json.loads(await reader.readexactly(length))
+    except asyncio.IncompleteReadError:
+        return None
+
+
+# ======================================================
+# BROKER
+# ======================================================
+class Broker:
+    """
+    Routes messages between worker connections.
+
+    channel -> owning connection, group -> {channel: joined_at} (with
+    channel -> groups to undo it), plus a small backlog for channels that
+    nobody is listening on yet. A channel leaves every group when its
+    connection closes or stops listening on it, and backlog entries
+    older than expiry are dropped, so a dead worker leaves nothing to
+    accumulate. Writes to a connection are drained before the sender's
+    next frame is read: a slow worker slows down its senders instead of
+    growing the broker's buffers.
+    """
+
+    def __init__(self, capacity=100, expiry=60, group_expiry=86400):
+        self.capacity = capacity
+        self.expiry = expiry
+        self.group_expiry = group_expiry
+        self.owners = {}
+        self.owned = defaultdict(set)
+        self.groups = defaultdict(dict)
+        self.memberships = defaultdict(set)
+        self.backlog = defaultdict(deque)
+
+    async def serve(self, path):
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        sweeper = asyncio.create_task(self._sweep_backlog())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                targets = self.dispatch(frame, writer)
+                await writer.drain()
+                await self._drain(targets - {writer})
+        except (ConnectionError, ValueError) as exc:
+            logger.warning("Dropping channel layer client: %s", exc)
+        finally:
+            self.disconnect(writer)
+            writer.close()
+
+    async def _drain(self, writers):
+        for writer in writers:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass  # that connection's own handler cleans it up
+
+    def disconnect(self, writer):
+        for channel in self.owned.pop(writer, ()):
+            if self.owners.get(channel) is writer:
+                del self.owners[channel]
+                self._forget(channel)
+
+    def dispatch(self, frame, writer):
+        """
+        Applies one frame; returns the connections it wrote to.
+        """
+        op = frame.get("op")
+
+        if op == "listen":
+            for channel in frame["channels"]:
+                self.owners[channel] = writer
+                self.owned[writer].add(channel)
+                self._flush_backlog(channel, writer)
+            return {writer}
+
+        elif op == "unlisten":
+            for channel in frame["channels"]:
+                if self.owners.get(channel) is writer:
+                    del self.owners[channel]
+                    self._forget(channel)
+                self.owned[writer].discard(channel)
+
+        elif op == "send":
+            return self.deliver([frame["channel"]], frame["message"])
+
+        elif op == "group_add":
+            self.groups[frame["group"]][frame["channel"]] = time.monotonic()
+            self.memberships[frame["channel"]].add(frame["group"])
+
+        elif op == "group_discard":
+            self._leave(frame["group"], frame["channel"])
+
+        elif op == "group_send":
+            return self.deliver(self._members(frame["group"]), frame["message"])
+
+        elif op == "flush":
+            self.groups.clear()
+            self.memberships.clear()
+            self.backlog.clear()
+
+        return set()
+
+    # -------------------------
+    # GROUPS
+    # -------------------------
+    def _leave(self, group, channel):
+        members = self.groups.get(group)
+        if members is not None:
+            members.pop(channel, None)
+            if not members:
+                del self.groups[group]
+
+        groups = self.memberships.get(channel)
+        if groups is not None:
+            groups.discard(group)
+            if not groups:
+                del self.memberships[channel]
+
+    def _forget(self, channel):
+        """
+        Drops a channel nobody listens on any more from every group, and
+        whatever was queued for it.
+        """
+        for group in self.memberships.pop(channel, ()):
+            members = self.groups.get(group)
+            if members is not None:
+                members.pop(channel, None)
+                if not members:
+                    del self.groups[group]
+        self.backlog.pop(channel, None)
+
+    def _members(self, group):
+        members = self.groups.get(group)
+        if not members:
+            return []
+
+        cutoff = time.monotonic() - self.group_expiry
+        for channel in [c for c, joined in members.items() if joined < cutoff]:
+            self._leave(group, channel)
+        return list(members)
+
+    # -------------------------
+    # DELIVERY & BACKLOG
+    # -------------------------
+    def deliver(self, channels, message):
+        by_owner = defaultdict(list)
+        for channel in channels:
+            writer = self.owners.get(channel)
+            if writer is None:
+                self._queue(channel, message)
+            else:
+                by_owner[writer].append(channel)
+
+        for writer, targets in by_owner.items():
+            writer.write(encode_frame({
+                "op": "deliver",
+                "channels": targets,
+                "message": message,
+            }))
+        return set(by_owner)
+
+    def _queue(self, channel, message):
+        queue = self.backlog[channel]
+        self._expire(queue, time.monotonic() - self.expiry)
+        if len(queue) >= self.capacity:
+            queue.popleft()
+        queue.append((time.monotonic(), message))
+
+    @staticmethod
+    def _expire(queue, cutoff):
+        while queue and queue[0][0] < cutoff:
+            queue.popleft()
+
+    def expire_backlog(self):
+        """
+        Drops backlog entries older than expiry, and channels left with
+        none. Returns how many channels were dropped.
+        """
+        cutoff = time.monotonic() - self.expiry
+        empty = []
+        for channel, queue in self.backlog.items():
+            self._expire(queue, cutoff)
+            if not queue:
+                empty.append(channel)
+        for channel in empty:
+            del self.backlog[channel]
+        return len(empty)
+
+    async def _sweep_backlog(self):
+        while True:
+            await asyncio.sleep(self.expiry)
+            self.expire_backlog()
+
+    def _flush_backlog(self, channel, writer):
+        queue = self.backlog.pop(channel, None)
+        if not queue:
+            return
+
+        self._expire(queue, time.monotonic() - self.expiry)
+        for _, message in queue:
+            writer.write(encode_frame({
+                "op": "deliver",
+                "channels": [channel],
+                "message": message,
+            }))
+
+
+# ======================================================
+# CLIENT LAYER
+# ======================================================
+class _Connection:
+    """
+    The process's link to the broker. Lives on the layer's own event
+    loop, like everything that touches it.
+    """
+
+    def __init__(self, reader, writer, layer):
+        self.reader = reader
+        self.writer = writer
+        self.layer = layer
+        self.queues = {}
+        self.last_used = {}
+        self.reader_task = asyncio.create_task(self._read())
+
+    def write(self, payload):
+        self.writer.write(encode_frame(payload))
+
+    def queue_for(self, channel):
+        queue = self.queues.get(channel)
+        if queue is None:
+            queue = self.queues[channel] = asyncio.Queue()
+            self.write({"op": "listen", "channels": [channel]})
+        self.last_used[channel] = time.monotonic()
+        return queue
+
+    def adopt(self, previous):
+        """
+        Takes over the channels (and undelivered messages) of a
+        connection that dropped.
+        """
+        for channel, queue in previous.queues.items():
+            self.queues[channel] = queue
+            self.last_used[channel] = previous.last_used[channel]
+        if self.queues:
+            self.write({"op": "listen", "channels": list(self.queues)})
+        previous.close()
+
+    def put(self, channel, message):
+        queue = self.queues.get(channel)
+        if queue is None:
+            return
+        if queue.qsize() >= self.layer.get_capacity(channel):
+            queue.get_nowait()  # drop the oldest
+        queue.put_nowait(message)
+
+    def sweep(self):
+        """
+        Stops listening on channels nobody has received from within expiry
+        (their consumers disconnected).
+        """
+        cutoff = time.monotonic() - self.layer.expiry
+        stale = [
+            channel for channel, used in self.last_used.items()
+            if used < cutoff and not self.queues[channel]._getters
+        ]
+        for channel in stale:
+            del self.queues[channel]
+            del self.last_used[channel]
+        if stale:
+            self.write({"op": "unlisten", "channels": stale})
+
+    async def _read(self):
+        swept = time.monotonic()
+        while True:
+            frame = await read_frame(self.reader)
+            if frame is None:
+                break
+            if frame.get("op") == "deliver":
+                for channel in frame["channels"]:
+                    self.put(channel, frame["message"])
+
+            if time.monotonic() - swept > self.layer.expiry:
+                self.sweep()
+                swept = time.monotonic()
+
+    def close(self):
+        self.reader_task.cancel()
+        self.writer.close()
+
+
+class UnixSocketChannelLayer(BaseChannelLayer):
+    """
+    CHANNEL_LAYERS = {"default": {
+        "BACKEND": "apps.core.channel_layers.UnixSocketChannelLayer",
+        "CONFIG": {"path": "/run/pamana/channels.sock"},
+    }}
+
+    Each process keeps one broker connection, owned by a daemon thread
+    running the layer's event loop. Callers on any loop (the server's,
+    or the short-lived one of each async_to_sync() call from sync code)
+    hand their operations to it, so publishing from a view does not open
+    a connection per call.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, path, expiry=60, group_expiry=86400, capacity=100,
+                 channel_capacity=None, **kwargs):
+        super().__init__(
+            expiry=expiry,
+            capacity=capacity,
+            channel_capacity=channel_capacity,
+            **kwargs,
+        )
+        self.path = path
+        self.group_expiry = group_expiry
+        self.client_prefix = "".join(
+            random.choices(string.ascii_letters, k=12)
+        )
+        self._loop = None
+        self._loop_pid = None
+        self._loop_lock = threading.Lock()
+        self._conn = None
+        self._conn_lock = None
+
+    def _layer_loop(self):
+        with self._loop_lock:
+            # A forked child does not inherit the parent's thread.
+            if self._loop is None or self._loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="channel-layer", daemon=True
+                ).start()
+                self._loop, self._loop_pid = loop, os.getpid()
+                self._conn = self._conn_lock = None
+            return self._loop
+
+    async def _on_layer_loop(self, coro):
+        loop = self._layer_loop()
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coro, loop)
+        )
+
+    async def _connection(self):
+        # Runs on the layer loop only.
+        if self._conn is not None and not self._conn.reader_task.done():
+            return self._conn
+
+        if self._conn_lock is None:
+            self._conn_lock = asyncio.Lock()
+        async with self._conn_lock:
+            if self._conn is not None and not self._conn.reader_task.done():
+                return self._conn
+
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            previous, self._conn = self._conn, _Connection(reader, writer, self)
+            if previous is not None:
+                self._conn.adopt(previous)
+            return self._conn
+
+    async def _write(self, payload):
+        async def write():
+            conn = await self._connection()
+            conn.write(payload)
+            await conn.writer.drain()
+
+        await self._on_layer_loop(write())
+
+    # -------------------------
+    # CHANNELS
+    # -------------------------
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        await self._write({"op": "send", "channel": channel, "message": message})
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+
+        async def receive():
+            conn = await self._connection()
+            message = await conn.queue_for(channel).get()
+            conn.last_used[channel] = time.monotonic()
+            return message
+
+        return await self._on_layer_loop(receive())
+
+    async def new_channel(self, prefix="specific."):
+        channel = "%s%s!%s" % (
+            prefix,
+            self.client_prefix,
+            "".join(random.choices(string.ascii_letters, k=12)),
+        )
+
+        async def listen():
+            conn = await self._connection()
+            conn.queue_for(channel)
+
+        await self._on_layer_loop(listen())
+        return channel
+
+    # -------------------------
+    # GROUPS
+    # -------------------------
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._write({"op": "group_add", "group": group, "channel": channel})
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._write(
+            {"op": "group_discard", "group": group, "channel": channel}
+        )
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        await self._write({"op": "group_send", "group": group, "message": message})
+
+    # -------------------------
+    # FLUSH
+    # -------------------------
+    async def flush(self):
+        async def flush():
+            conn = await self._connection()
+            conn.write({"op": "flush"})
+            await conn.writer.drain()
+            conn.queues.clear()
+            conn.last_used.clear()
+
+        await self._on_layer_loop(flush())
+
+    async def close(self):
+        async def close():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+        if self._loop is not None:
+            await self._on_layer_loop(close())
@@ -0,0 +1,83 @@
+"""
+Safe client retries for non-idempotent POSTs (like / save toggles).
+
+A client that may retry a request sends an Idempotency-Key header, any
+unique string per logical action. respond() records the key with the
+response data in the same transaction as the change, so
+
+    - a retry of a request that committed gets the stored response back
+      (Idempotent-Replayed: true) and changes nothing, and
+    - a request that failed leaves no key behind and can be retried.
+
+A retry that arrives while the first request is still running waits on
+the key's unique constraint and then replays. Keys belong to a user and
+a request (method and path); reusing one for another request is a 422.
+Keys are honored for IDEMPOTENCY_KEY_HOURS; purge() drops older ones.
+Requests without the header run as usual.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def lifetime():
+    return timedelta(hours=getattr(settings, "IDEMPOTENCY_KEY_HOURS", 24))
+
+
+def respond(request, perform):
+    """
+    Response(perform()), or the stored data when the request's
+    Idempotency-Key was already used. perform() returns response data
+    and may raise (Http404, ...) to abort; nothing is stored then.
+    """
+    key = request.headers.get(HEADER)
+    if not key:
+        return Response(perform())
+    if len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    scope = f"{request.method} {request.path}"
+    with transaction.atomic():
+        record, created = IdempotencyKey.objects.get_or_create(
+            user=request.user, key=key, defaults={"scope": scope},
+        )
+        if not created and record.created_at < timezone.now() - lifetime():
+            # Expired: the key starts over for this request.
+            record.scope = scope
+            record.created_at = timezone.now()
+            created = True
+
+        if not created:
+            if record.scope != scope:
+                return Response(
+                    {"detail": f"{HEADER} was already used for another request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            return Response(record.response, headers={"Idempotent-Replayed": "true"})
+
+        record.response = perform()
+        record.save(update_fields=["scope", "created_at", "response"])
+    return Response(record.response)
+
+
+def purge():
+    """
+    Deletes keys past their lifetime; returns how many.
+    """
+    expired = IdempotencyKey.objects.filter(
+        created_at__lt=timezone.now() - lifetime()
+    )
+    return expired.delete()[0]
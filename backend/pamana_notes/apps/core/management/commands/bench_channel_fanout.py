@@ -0,0 +1,153 @@
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from channels import DEFAULT_CHANNEL_LAYER
+from channels.layers import InMemoryChannelLayer, channel_layers
+from django.core.management.base import BaseCommand, CommandError
+
+
+GROUP = "bench_fanout"
+
+
+async def _listen(layer, sockets, messages, timeout, on_ready):
+    """
+    Joins `sockets` channels to the group, then records the latency of
+    every message delivered to each of them.
+    """
+    channels = [await layer.new_channel() for _ in range(sockets)]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+    on_ready()
+
+    latencies = []
+
+    async def drain(channel):
+        for _ in range(messages):
+            message = await layer.receive(channel)
+            latencies.append(time.time() - message["sent"])
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(drain(channel) for channel in channels)),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        pass
+    return latencies
+
+
+async def _publish(layer, messages, interval):
+    for _ in range(messages):
+        await layer.group_send(
+            GROUP, {"type": "bench.message", "sent": time.time()}
+        )
+        await asyncio.sleep(interval)
+
+
+def _worker(sockets, messages, timeout, ready, results):
+    layer = channel_layers.make_backend(DEFAULT_CHANNEL_LAYER)
+    latencies = asyncio.run(
+        _listen(layer, sockets, messages, timeout, ready.set)
+    )
+    results.put(latencies)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure group_send fan-out latency from one publisher to many "
+        "websocket channels spread across worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sockets", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--messages", type=int, default=20)
+        parser.add_argument(
+            "--interval", type=float, default=0.05,
+            help="Seconds between published messages.",
+        )
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        sockets = options["sockets"]
+        messages = options["messages"]
+        layer = channel_layers[DEFAULT_CHANNEL_LAYER]
+
+        if messages > layer.capacity:
+            raise CommandError(
+                f"--messages must not exceed the layer capacity ({layer.capacity})."
+            )
+
+        if isinstance(layer, InMemoryChannelLayer):
+            self.stdout.write("In-memory layer: running in a single process.")
+            latencies = asyncio.run(self._in_process(layer, options))
+            workers = 1
+        else:
+            workers = max(1, min(options["workers"], sockets))
+            latencies = self._multi_process(workers, options)
+
+        self._report(latencies, sockets * messages, workers, layer)
+
+    async def _in_process(self, layer, options):
+        ready = asyncio.Event()
+        listener = asyncio.create_task(_listen(
+            layer, options["sockets"], options["messages"],
+            options["timeout"], ready.set,
+        ))
+        await ready.wait()
+        await _publish(layer, options["messages"], options["interval"])
+        return await listener
+
+    def _multi_process(self, workers, options):
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        per_worker = [
+            options["sockets"] // workers + (i < options["sockets"] % workers)
+            for i in range(workers)
+        ]
+
+        procs = []
+        events = []
+        for count in per_worker:
+            ready = ctx.Event()
+            proc = ctx.Process(
+                target=_worker,
+                args=(count, options["messages"], options["timeout"], ready, results),
+                daemon=True,
+            )
+            proc.start()
+            procs.append(proc)
+            events.append(ready)
+
+        for ready in events:
+            if not ready.wait(options["timeout"]):
+                raise CommandError("Workers did not subscribe in time.")
+        # Let the last group_add frames reach the layer before publishing.
+        time.sleep(0.2)
+
+        publisher = channel_layers.make_backend(DEFAULT_CHANNEL_LAYER)
+        asyncio.run(_publish(publisher, options["messages"], options["interval"]))
+
+        latencies = []
+        for _ in procs:
+            latencies.extend(results.get(timeout=options["timeout"] + 5))
+        for proc in procs:
+            proc.join()
+        return latencies
+
+    def _report(self, latencies, expected, workers, layer):
+        self.stdout.write(
+            f"{type(layer).__name__}: {workers} worker(s), "
+            f"{len(latencies)}/{expected} deliveries"
+        )
+        if len(latencies) < 2:
+            raise CommandError("Not enough deliveries to report latency.")
+
+        cuts = statistics.quantiles(latencies, n=100)
+        ms = lambda seconds: f"{seconds * 1000:.2f} ms"
+        self.stdout.write(
+            f"p50 {ms(cuts[49])}  p95 {ms(cuts[94])}  "
+            f"p99 {ms(cuts[98])}  max {ms(max(latencies))}"
+        )
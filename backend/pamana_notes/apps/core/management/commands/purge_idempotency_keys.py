@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.core import idempotency
+
+
+class Command(BaseCommand):
+    help = "Delete Idempotency-Key records older than IDEMPOTENCY_KEY_HOURS."
+
+    def handle(self, *args, **options):
+        purged = idempotency.purge()
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} key(s)."))
@@ -0,0 +1,44 @@
+import asyncio
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.channel_layers import Broker
+
+
+class Command(BaseCommand):
+    help = "Run the local channel layer broker shared by all ASGI workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=settings.CHANNEL_BROKER_SOCKET,
+            help="Unix socket path (defaults to CHANNEL_BROKER_SOCKET).",
+        )
+        parser.add_argument("--capacity", type=int, default=100)
+        parser.add_argument("--expiry", type=int, default=60)
+        parser.add_argument("--group-expiry", type=int, default=86400)
+
+    def handle(self, *args, **options):
+        path = options["socket"]
+        if not path:
+            raise CommandError("Pass --socket or set CHANNEL_BROKER_SOCKET.")
+
+        # A socket file left behind by a previous run blocks bind().
+        if os.path.exists(path):
+            os.unlink(path)
+
+        broker = Broker(
+            capacity=options["capacity"],
+            expiry=options["expiry"],
+            group_expiry=options["group_expiry"],
+        )
+        self.stdout.write(f"Channel broker listening on {path}")
+        try:
+            asyncio.run(broker.serve(path))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if os.path.exists(path):
+                os.unlink(path)
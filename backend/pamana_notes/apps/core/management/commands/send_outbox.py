@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails in batches over one connection each."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=outbox.BATCH_SIZE)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, polling every --interval seconds.",
+        )
+        parser.add_argument("--interval", type=float, default=5.0)
+
+    def handle(self, *args, batch, loop, interval, **options):
+        while True:
+            sent, failed = outbox.drain(batch)
+            if sent or failed or not loop:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Sent {sent} email(s), {failed} failed.")
+                )
+            if not loop:
+                return
+            try:
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,23 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # A no-op unless a CACHES entry uses the database backend; existing
+    # tables are left alone.
+    call_command(
+        "createcachetable",
+        database=schema_editor.connection.alias,
+        verbosity=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,85 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+# --------------------
+# Email Outbox
+# --------------------
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be delivered by apps.core.outbox.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When a pending email is next due; also the lease a worker takes
+    # on the emails it is sending.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                condition=models.Q(status="pending"),
+                name="outbox_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+# --------------------
+# Idempotency Keys
+# --------------------
+class IdempotencyKey(models.Model):
+    """
+    A request's Idempotency-Key and the response to replay for it
+    (apps.core.idempotency).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    key = models.CharField(max_length=255)
+    # "<method> <path>" of the request the key was first used for.
+    scope = models.CharField(max_length=255)
+    response = models.JSONField(null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"],
+                name="idempotency_key_per_user",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.scope})"
@@ -0,0 +1,21 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ContentNegotiation(DefaultContentNegotiation):
+    """
+    Skips renderers and parsers whose optional dependency is missing
+    (available = False), so clients asking for them get a 406 or 415
+    instead of a server error.
+    """
+
+    def select_parser(self, request, parsers):
+        return super().select_parser(request, _available(parsers))
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return super().select_renderer(
+            request, _available(renderers), format_suffix
+        )
+
+
+def _available(candidates):
+    return [c for c in candidates if getattr(c, "available", True)]
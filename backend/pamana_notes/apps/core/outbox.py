@@ -0,0 +1,220 @@
+"""
+Durable email outbox.
+
+enqueue() / enqueue_many() write OutboxEmail rows in the caller's
+transaction, so an email exists exactly when the change it announces is
+committed, and requests never wait on SMTP. Delivery claims due emails
+in batches, sends each batch over one EMAIL_BACKEND connection, and
+retries failures with exponential backoff up to EMAIL_OUTBOX_MAX_ATTEMPTS
+before marking them failed.
+
+EMAIL_OUTBOX_WORKER = True   a daemon thread delivers after each commit
+                    = False  delivery is left to `manage.py send_outbox`
+
+Claims are leases: a worker that dies mid-batch leaves its emails to be
+picked up again once the lease expires, so delivery is at-least-once.
+Point EMAIL_BACKEND at the locmem or filebased backend to run without an
+SMTP server.
+"""
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "EMAIL_OUTBOX_BATCH", 50)
+MAX_ATTEMPTS = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+RETRY_SECONDS = getattr(settings, "EMAIL_OUTBOX_RETRY_SECONDS", 60)
+LEASE_SECONDS = 300
+POLL_SECONDS = 30
+
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+# ======================================================
+# ENQUEUE
+# ======================================================
+def enqueue(subject, body, recipients, from_email=None):
+    return enqueue_many([(subject, body, from_email, recipients)])[0]
+
+
+def enqueue_many(datatuple):
+    """
+    Queues (subject, body, from_email, recipients) tuples, the format
+    send_mass_mail() takes, with one INSERT.
+    """
+    emails = OutboxEmail.objects.bulk_create([
+        OutboxEmail(
+            subject=subject,
+            body=body,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            recipients=list(recipients),
+        )
+        for subject, body, from_email, recipients in datatuple
+    ])
+    if emails:
+        transaction.on_commit(wake)
+    return emails
+
+
+# ======================================================
+# DELIVERY
+# ======================================================
+def _claim(batch_size):
+    """
+    Leases up to batch_size due emails to this call. The outer filter is
+    re-checked against each row as it is updated, so two workers never
+    claim the same email.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = (
+        OutboxEmail.objects
+        .filter(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now)
+        .order_by("next_attempt_at", "id")
+        .values("pk")[:batch_size]
+    )
+    claimed = OutboxEmail.objects.filter(
+        pk__in=Subquery(due),
+        status=OutboxEmail.STATUS_PENDING,
+        next_attempt_at__lte=now,
+    ).update(
+        claimed_by=token,
+        next_attempt_at=now + timedelta(seconds=LEASE_SECONDS),
+        attempts=F("attempts") + 1,
+    )
+    if not claimed:
+        return []
+    return list(OutboxEmail.objects.filter(claimed_by=token).order_by("id"))
+
+
+def _message(email, connection):
+    return EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.recipients,
+        connection=connection,
+    )
+
+
+def send_batch(batch_size=BATCH_SIZE):
+    """
+    Claims one batch and delivers it over a single connection.
+    Returns (sent, failed) counts.
+    """
+    emails = _claim(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent = []
+    errors = {}
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.warning("Email outbox could not connect: %s", exc)
+        errors = {email.pk: repr(exc) for email in emails}
+    else:
+        try:
+            for email in emails:
+                try:
+                    if connection.send_messages([_message(email, connection)]):
+                        sent.append(email.pk)
+                    else:
+                        errors[email.pk] = "not accepted by the backend"
+                except Exception as exc:
+                    errors[email.pk] = repr(exc)
+        finally:
+            connection.close()
+
+    _record(emails, sent, errors)
+    return len(sent), len(errors)
+
+
+def _record(emails, sent, errors):
+    now = timezone.now()
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(
+            status=OutboxEmail.STATUS_SENT,
+            sent_at=now,
+            claimed_by="",
+            last_error="",
+        )
+
+    failed = [email for email in emails if email.pk in errors]
+    for email in failed:
+        email.claimed_by = ""
+        email.last_error = errors[email.pk]
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = OutboxEmail.STATUS_FAILED
+            logger.error(
+                "Giving up on outbox email %s after %s attempts: %s",
+                email.pk, email.attempts, email.last_error,
+            )
+        else:
+            email.next_attempt_at = now + timedelta(
+                seconds=RETRY_SECONDS * 2 ** (email.attempts - 1)
+            )
+    if failed:
+        OutboxEmail.objects.bulk_update(
+            failed,
+            ["status", "next_attempt_at", "claimed_by", "last_error"],
+        )
+
+
+def drain(batch_size=BATCH_SIZE):
+    """
+    Sends batches until nothing is due. Returns (sent, failed) totals.
+    """
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = send_batch(batch_size)
+        if not sent and not failed:
+            return total_sent, total_failed
+        total_sent += sent
+        total_failed += failed
+
+
+# ======================================================
+# BACKGROUND WORKER
+# ======================================================
+def _run():
+    while True:
+        # Woken after each commit that queued mail; the timeout picks up
+        # retries that come due while nothing new is queued.
+        _wakeup.wait(POLL_SECONDS)
+        _wakeup.clear()
+        try:
+            close_old_connections()
+            drain()
+        except Exception:
+            logger.exception("Email outbox worker failed")
+        finally:
+            close_old_connections()
+
+
+def wake():
+    global _worker
+    if not getattr(settings, "EMAIL_OUTBOX_WORKER", True):
+        return
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run, name="email-outbox", daemon=True
+            )
+            _worker.start()
+    _wakeup.set()
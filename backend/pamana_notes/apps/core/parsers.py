@@ -0,0 +1,64 @@
+"""
+API parsers matching apps.core.renderers.
+
+FastJSONParser reads UTF-8 JSON bodies with orjson and falls back to
+DRF's JSONParser without it, for other charsets, and for documents
+orjson rejects, so errors keep DRF's messages. MessagePackParser accepts
+application/msgpack bodies when msgpack is installed.
+
+MultiPartParser answers 413 when an upload handler or
+DATA_UPLOAD_MAX_MEMORY_SIZE refuses the body, instead of the bare 400
+Django gives a RequestDataTooBig.
+"""
+import io
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from rest_framework import parsers, status
+from rest_framework.exceptions import APIException, ParseError
+
+from .renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(parsers.BaseParser):
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+    available = msgpack is not None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(
+                f"MessagePack parse error - {exc or 'malformed data'}"
+            )
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Request body is too large."
+    default_code = "payload_too_large"
+
+
+class MultiPartParser(parsers.MultiPartParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return super().parse(stream, media_type, parser_context)
+        except RequestDataTooBig as exc:
+            raise PayloadTooLarge(str(exc) or None)
@@ -0,0 +1,77 @@
+"""
+API renderers: orjson-backed JSON and optional MessagePack.
+
+FastJSONRenderer is a drop-in for DRF's JSONRenderer. With orjson
+installed it encodes in C, handling dicts, lists, strings, numbers,
+UUIDs and datetimes (ISO 8601, "Z" for UTC) natively and everything
+else (Decimal as float, lazy strings, querysets, ...) through DRF's
+JSONEncoder.default, so the output matches JSONRenderer apart from
+float spelling (1e-05 vs 0.00001). Without orjson, for indented output,
+and for anything orjson refuses (integers beyond 64 bits), it falls back
+to the stdlib encoder.
+
+MessagePackRenderer answers clients that ask for application/msgpack
+(Accept header or ?format=msgpack). It needs the msgpack package;
+without it the renderer reports itself unavailable and negotiation
+(apps.core.negotiation) skips it.
+"""
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: msgpack is then not offered
+    msgpack = None
+
+
+# DRF's conversions for types the fast encoders do not know.
+_default = JSONEncoder().default
+
+_JS_UNSAFE = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same as JSONRenderer: keep the output a strict JavaScript subset.
+        for raw, escaped in _JS_UNSAFE:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    available = msgpack is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(
+            data, default=_default, use_bin_type=True, datetime=False
+        )
@@ -0,0 +1,152 @@
+"""
+Cached bodies for anonymous, identical-for-everyone API responses.
+
+respond() stores the rendered bytes, not the data, so a hit is one cache
+read with no queries and no serialization. Each response belongs to a
+namespace; invalidate() gives the namespace a new version after commit,
+so every body built before a change stops matching at once.
+
+Entries are fresh for RESPONSE_CACHE_SECONDS and kept as long again
+after that. When an entry needs rebuilding, the first request takes a
+short lock (cache.add) and rebuilds it while the others
+
+    - keep serving the previous body, if it only aged out, or
+    - wait for the rebuild (up to LOCK_SECONDS), if it was invalidated,
+
+so a burst of traffic after an expiry or a moderation decision costs one
+rebuild, not one per request.
+
+JSON and MessagePack renderings are cached; the browsable API passes
+through. The cache must be shared between workers (CACHES) for
+invalidation to reach all of them.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+
+# Public catalogue
+PUBLIC_NOTES = "public-notes"
+PUBLIC_SUBJECTS = "public-subjects"
+PUBLIC_COURSES = "public-courses"
+
+CACHED_FORMATS = {"json", "msgpack"}
+LOCK_SECONDS = 5
+WAIT_SECONDS = 0.05
+
+
+def timeout():
+    return getattr(settings, "RESPONSE_CACHE_SECONDS", 60)
+
+
+# ======================================================
+# VERSIONS
+# ======================================================
+def _version_key(namespace):
+    return f"response:{namespace}:version"
+
+
+def _version(namespace):
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def invalidate(*namespaces):
+    # After commit, so a concurrent rebuild cannot store the old rows
+    # under the new version.
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {_version_key(ns): uuid.uuid4().hex for ns in namespaces},
+            None,
+        )
+    )
+
+
+# ======================================================
+# RESPONSES
+# ======================================================
+def _key(namespace, request, params):
+    # Absolute file URLs depend on the scheme and host, so they are part
+    # of the key. Of the query string, only the parameters the view reads
+    # count, in a fixed order; anything else would only split the cache.
+    query = [(name, request.query_params.getlist(name)) for name in sorted(params)]
+    vary = "\n".join([
+        request.accepted_media_type,
+        request.scheme,
+        request.get_host(),
+        request.path,
+        repr(query),
+    ])
+    digest = hashlib.sha256(vary.encode()).hexdigest()[:32]
+    return f"response:{namespace}:{digest}"
+
+
+def _render(request, data, version):
+    renderer = request.accepted_renderer
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+
+    return {
+        "version": version,
+        "fresh_until": time.time() + timeout(),
+        "content_type": content_type,
+        "body": renderer.render(
+            data, request.accepted_media_type, {"request": request}
+        ),
+    }
+
+
+def _response(entry):
+    return HttpResponse(entry["body"], content_type=entry["content_type"])
+
+
+def respond(request, namespace, build, params=()):
+    """
+    The response for build() (a callable returning response data),
+    served from the cache when a current copy exists. `params` names the
+    query parameters build() reads; the rest of the query string is
+    ignored.
+    """
+    if request.accepted_renderer.format not in CACHED_FORMATS:
+        return Response(build())
+
+    version = _version(namespace)
+    key = _key(namespace, request, params)
+    entry = cache.get(key)
+    current = entry is not None and entry["version"] == version
+    if current and entry["fresh_until"] > time.time():
+        return _response(entry)
+
+    lock = f"{key}:lock"
+    if cache.add(lock, 1, LOCK_SECONDS):
+        try:
+            entry = _render(request, build(), version)
+            cache.set(key, entry, 2 * timeout())
+        finally:
+            cache.delete(lock)
+        return _response(entry)
+
+    if current:
+        return _response(entry)
+
+    deadline = time.monotonic() + LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_SECONDS)
+        entry = cache.get(key)
+        if entry is not None and entry["version"] == version:
+            return _response(entry)
+
+    # The rebuild is taking too long; answer this request directly.
+    return _response(_render(request, build(), version))
@@ -0,0 +1,88 @@
+"""
+Streaming JSON arrays for list endpoints that are not paged.
+
+stream_list() walks a queryset with .iterator() (a server-side cursor on
+Postgres, fetchmany() batches elsewhere), serializes STREAMING_CHUNK_SIZE
+rows at a time and yields each batch as soon as it is encoded, so memory
+per request stays flat however many rows match. The bytes are the same as
+JSONRenderer would produce for the whole list.
+
+Under ASGI the batches are produced through an async iterator, one
+sync_to_async step per batch; Django would otherwise read a sync
+iterator to the end before sending anything.
+
+The response has started by the time rows are read, so checks that can
+fail (permissions, bad parameters) belong before the call.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+
+
+_DONE = object()
+
+
+def chunk_size():
+    return getattr(settings, "STREAMING_CHUNK_SIZE", 500)
+
+
+def _context_for(context, rows):
+    return context(rows) if callable(context) else (context or {})
+
+
+def _batches(queryset, size):
+    rows = queryset.iterator(chunk_size=size)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _encode(renderer, queryset, serializer_class, context):
+    yield b"["
+    separator = b""
+    for batch in _batches(queryset, chunk_size()):
+        data = serializer_class(
+            batch, many=True, context=_context_for(context, batch)
+        ).data
+        # The batch rendered as an array, without its brackets.
+        yield separator + renderer.render(data)[1:-1]
+        separator = b","
+    yield b"]"
+
+
+async def _async(parts):
+    step = sync_to_async(next)
+    try:
+        while (part := await step(parts, _DONE)) is not _DONE:
+            yield part
+    finally:
+        await sync_to_async(parts.close)()
+
+
+def stream_list(request, queryset, serializer_class, context=None):
+    """
+    Streams serializer_class(queryset, many=True) as a JSON array.
+
+    context is the serializer context, or a callable that returns it
+    for each batch of instances (for per-batch lookups such as
+    saved_note_ids).
+    """
+    renderer = request.accepted_renderer
+    if renderer.format != "json":
+        # The browsable API renders a whole page anyway.
+        rows = list(queryset)
+        return Response(serializer_class(
+            rows, many=True, context=_context_for(context, rows)
+        ).data)
+
+    parts = _encode(renderer, queryset, serializer_class, context)
+    if isinstance(request._request, ASGIRequest):
+        parts = _async(parts)
+
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f"{content_type}; charset={renderer.charset}"
+    return StreamingHttpResponse(parts, content_type=content_type)
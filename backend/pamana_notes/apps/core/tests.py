@@ -1,3 +1,433 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import decimal
+import io
+import os
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.api.serializers import AdminUserSerializer
+from apps.core import idempotency, outbox, toggles
+from apps.core.channel_layers import Broker, UnixSocketChannelLayer, encode_frame
+from apps.core.parsers import FastJSONParser
+from apps.core.renderers import FastJSONRenderer, MessagePackRenderer, msgpack
+from apps.core.models import IdempotencyKey, OutboxEmail
+from apps.notes.models import Note, NoteLike, NoteSave
+from apps.subjects.models import Course, Subject
+from apps.wall.models import FreedomPost, FreedomPostLike
+
+
+# ======================================================
+# EMAIL OUTBOX
+# ======================================================
+class CountingBackend(EmailBackend):
+    """
+    locmem backend that records how many connections were opened.
+    """
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return True
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("SMTP is down")
+
+
+@override_settings(EMAIL_OUTBOX_WORKER=False)
+class OutboxTests(TestCase):
+    def queue(self, n):
+        return outbox.enqueue_many(
+            (f"Subject {i}", "Body", None, [f"user{i}@example.com"])
+            for i in range(n)
+        )
+
+    @override_settings(EMAIL_BACKEND="apps.core.tests.CountingBackend")
+    def test_batch_shares_one_connection(self):
+        self.queue(5)
+        CountingBackend.opened = 0
+
+        self.assertEqual(outbox.drain(batch_size=5), (5, 0))
+        self.assertEqual(CountingBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.STATUS_SENT).count(),
+            5,
+        )
+
+    def test_rows_commit_with_the_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.queue(2)
+        self.assertEqual(callbacks, [outbox.wake])
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(EMAIL_BACKEND="apps.core.tests.FailingBackend")
+    def test_failures_back_off_then_give_up(self):
+        (email,) = self.queue(1)
+
+        self.assertEqual(outbox.drain(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("SMTP is down", email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        # Not due again until the backoff passes.
+        self.assertEqual(outbox.drain(), (0, 0))
+
+        for _ in range(outbox.MAX_ATTEMPTS - 1):
+            OutboxEmail.objects.update(
+                next_attempt_at=timezone.now() - timedelta(seconds=1)
+            )
+            outbox.drain()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, outbox.MAX_ATTEMPTS)
+
+    def test_expired_lease_is_reclaimed(self):
+        self.queue(1)
+        self.assertEqual(len(outbox._claim(10)), 1)
+        self.assertEqual(outbox._claim(10), [])
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.drain(), (1, 0))
+
+
+# ======================================================
+# STREAMING LISTS
+# ======================================================
+class StreamingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(
+            "A-0000", "admin@example.com", "pw-12345678",
+            first_name="Ad", last_name="Min", role="admin", is_staff=True,
+        )
+        User.objects.bulk_create([
+            User(school_id=f"S-{i:04d}", email=f"s{i}@example.com")
+            for i in range(25)
+        ])
+
+    def test_streams_the_same_bytes_in_batches(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.settings(STREAMING_CHUNK_SIZE=10):
+            response = client.get("/api/accounts/users/")
+            parts = list(response.streaming_content)
+
+        users = get_user_model().objects.order_by("school_id")
+        expected = JSONRenderer().render(
+            AdminUserSerializer(users, many=True).data
+        )
+        self.assertEqual(b"".join(parts), expected)
+        # "[", three batches of at most ten users, "]"
+        self.assertEqual(len(parts), 5)
+
+
+# ======================================================
+# RENDERERS / PARSERS
+# ======================================================
+class RendererTests(TestCase):
+    data = {
+        "id": 7,
+        "title": "Ünïcode\u2028line",
+        "price": decimal.Decimal("1.50"),
+        "when": datetime.datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=datetime.timezone.utc),
+        "day": datetime.date(2024, 1, 2),
+        "label": gettext_lazy("Notes"),
+        "keys": {1: "one"},
+        "huge": 2 ** 70,
+        "nested": [{"a": None, "b": True}],
+    }
+
+    def test_json_matches_drf(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data),
+        )
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, "application/json; indent=4"),
+            JSONRenderer().render(self.data, "application/json; indent=4"),
+        )
+
+    def test_json_parser(self):
+        body = JSONRenderer().render({"ids": [1, 2], "reason": "Ünïcode"})
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+        with self.assertRaisesMessage(ParseError, "JSON parse error"):
+            FastJSONParser().parse(io.BytesIO(b"{bad"))
+
+    def test_msgpack_is_not_offered_without_the_package(self):
+        client = APIClient()
+        with mock.patch.object(MessagePackRenderer, "available", False):
+            response = client.get(
+                "/api/subjects/courses/public/",
+                HTTP_ACCEPT="application/msgpack",
+            )
+        self.assertEqual(response.status_code, 406)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack_negotiation(self):
+        response = APIClient().get(
+            "/api/subjects/courses/public/", HTTP_ACCEPT="application/msgpack"
+        )
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), [])
+
+
+# ======================================================
+# TOGGLES & IDEMPOTENCY KEYS
+# ======================================================
+class ToggleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        subject = Subject.objects.create(name="Programming", course=course)
+        cls.student = get_user_model().objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.note = Note.objects.create(
+            title="Note", uploader=cls.student, subject=subject,
+            is_approved=True,
+        )
+        cls.post = FreedomPost.objects.create(user=cls.student, content="Hi")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def like(self, **headers):
+        return self.client.post(
+            f"/api/notes/notes/{self.note.pk}/like/", headers=headers
+        )
+
+    def test_like_toggles_row_and_counter(self):
+        self.assertEqual(self.like().data, {"liked": True, "likes_count": 1})
+        self.assertTrue(NoteLike.objects.filter(note=self.note).exists())
+
+        self.assertEqual(self.like().data, {"liked": False, "likes_count": 0})
+        self.assertFalse(NoteLike.objects.filter(note=self.note).exists())
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.likes_count, 0)
+
+    def test_toggle_is_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            toggles.toggle(
+                NoteSave, "note", self.note.pk, self.student,
+                counter="saves_count",
+            )
+        statements = [
+            q["sql"] for q in queries
+            if not q["sql"].startswith(("SAVEPOINT", "RELEASE"))
+        ]
+        # Elsewhere: DELETE, INSERT, counter UPDATE and SELECT.
+        expected = 1 if connection.vendor == "postgresql" else 4
+        self.assertEqual(len(statements), expected, statements)
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.saves_count, 1)
+
+    def test_retry_with_key_replays(self):
+        first = self.like(**{"Idempotency-Key": "tap-1"})
+        retry = self.like(**{"Idempotency-Key": "tap-1"})
+
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(NoteLike.objects.filter(note=self.note).count(), 1)
+
+        # A new key is a new tap.
+        self.assertFalse(self.like(**{"Idempotency-Key": "tap-2"}).data["liked"])
+
+    def test_key_reused_for_another_request(self):
+        self.like(**{"Idempotency-Key": "tap-1"})
+        response = self.client.post(
+            f"/api/notes/notes/{self.note.pk}/save/",
+            headers={"Idempotency-Key": "tap-1"},
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(NoteSave.objects.exists())
+
+    def test_failed_request_leaves_no_key(self):
+        hidden = Note.objects.create(
+            title="Pending", uploader=self.student, subject=self.note.subject,
+        )
+        other = get_user_model().objects.create_user(
+            "S-0002", "other@example.com", "pw-12345678",
+            first_name="O", last_name="Ther", course=self.student.course,
+        )
+        self.client.force_authenticate(other)
+        response = self.client.post(
+            f"/api/notes/notes/{hidden.pk}/like/",
+            headers={"Idempotency-Key": "tap-1"},
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_expired_keys(self):
+        self.like(**{"Idempotency-Key": "tap-1"})
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - idempotency.lifetime() - timedelta(minutes=1)
+        )
+        self.assertFalse(self.like(**{"Idempotency-Key": "tap-1"}).data["liked"])
+
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - idempotency.lifetime() - timedelta(minutes=1)
+        )
+        self.assertEqual(idempotency.purge(), 1)
+
+    def test_wall_like_counts_rows(self):
+        other = get_user_model().objects.create_user(
+            "S-0002", "other@example.com", "pw-12345678",
+            first_name="O", last_name="Ther", course=self.student.course,
+        )
+        FreedomPostLike.objects.create(post=self.post, user=other)
+
+        url = f"/api/wall/posts/{self.post.pk}/like/"
+        self.assertEqual(
+            self.client.post(url).data, {"liked": True, "likes_count": 2}
+        )
+        self.assertEqual(
+            self.client.post(url).data, {"liked": False, "likes_count": 1}
+        )
+
+
+# ======================================================
+# CHANNEL BROKER
+# ======================================================
+class FakeWriter:
+    def __init__(self):
+        self.frames = []
+        self.drains = 0
+
+    def write(self, data):
+        self.frames.append(data)
+
+    async def drain(self):
+        self.drains += 1
+
+    def close(self):
+        pass
+
+
+class BrokerTests(unittest.TestCase):
+    def setUp(self):
+        self.broker = Broker(capacity=10, expiry=60)
+        self.worker = FakeWriter()
+        self.broker.dispatch({"op": "listen", "channels": ["a", "b"]}, self.worker)
+        for channel in ("a", "b"):
+            self.broker.dispatch(
+                {"op": "group_add", "group": "reviewers", "channel": channel},
+                self.worker,
+            )
+
+    def test_closed_connection_leaves_its_groups(self):
+        self.broker.disconnect(self.worker)
+        self.broker.dispatch(
+            {"op": "group_send", "group": "reviewers", "message": {}},
+            FakeWriter(),
+        )
+
+        self.assertEqual(dict(self.broker.groups), {})
+        self.assertEqual(dict(self.broker.memberships), {})
+        self.assertEqual(dict(self.broker.backlog), {})
+
+    def test_unlisten_leaves_groups(self):
+        self.broker.dispatch({"op": "unlisten", "channels": ["a"]}, self.worker)
+        self.assertEqual(list(self.broker.groups["reviewers"]), ["b"])
+
+    def test_backlog_expires(self):
+        clock = "apps.core.channel_layers.time.monotonic"
+        with mock.patch(clock, return_value=1000):
+            self.broker.deliver(["nobody"], {"n": 1})
+        with mock.patch(clock, return_value=1030):
+            self.broker.deliver(["nobody"], {"n": 2})
+            self.broker.deliver(["idle"], {"n": 1})
+
+        with mock.patch(clock, return_value=1070):
+            self.assertEqual(self.broker.expire_backlog(), 0)
+            self.assertEqual(
+                [m for _, m in self.broker.backlog["nobody"]], [{"n": 2}]
+            )
+        with mock.patch(clock, return_value=1100):
+            self.assertEqual(self.broker.expire_backlog(), 2)
+        self.assertEqual(dict(self.broker.backlog), {})
+
+    def test_sender_waits_for_target_writers(self):
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(encode_frame(
+                {"op": "group_send", "group": "reviewers", "message": {}}
+            ))
+            reader.feed_eof()
+            await self.broker.handle(reader, FakeWriter())
+
+        asyncio.run(run())
+        self.assertEqual(len(self.worker.frames), 1)
+        self.assertEqual(self.worker.drains, 1)
+
+
+class CountingBroker(Broker):
+    connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        await super().handle(reader, writer)
+
+
+class UnixSocketLayerTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "channels.sock")
+
+        self.broker = CountingBroker()
+        loop = asyncio.new_event_loop()
+        server = loop.run_until_complete(
+            asyncio.start_unix_server(self.broker.handle, path=self.path)
+        )
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            server.close()
+            loop.close()
+
+        self.addCleanup(stop)
+
+    def test_sync_callers_share_one_connection(self):
+        layer = UnixSocketChannelLayer(self.path)
+        self.addCleanup(async_to_sync(layer.close))
+
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)("reviewers", channel)
+        # Each async_to_sync() call runs on a loop of its own.
+        for n in range(3):
+            async_to_sync(layer.group_send)("reviewers", {"n": n})
+
+        received = [async_to_sync(layer.receive)(channel) for _ in range(3)]
+        self.assertEqual(received, [{"n": 0}, {"n": 1}, {"n": 2}])
+        self.assertEqual(self.broker.connections, 1)
@@ -0,0 +1,149 @@
+"""
+Like / save toggles in one round trip.
+
+toggle() flips a user's row in a "user x target" table (NoteLike,
+FreedomPostLike, ...: a user FK, a target FK, created_at, unique
+together) and returns (active, count) after the flip.
+
+On PostgreSQL that is one statement. Data-modifying CTEs delete the row
+if it exists, insert it otherwise (ON CONFLICT DO NOTHING), and then
+either move the target's denormalized counter (counter="likes_count")
+or count the target's rows. A toggle racing an identical one can no
+longer fail on the unique constraint or double count: whichever request
+loses the insert simply reports the row as active. Other backends run
+the same steps as separate statements in a transaction; SQLite has a
+single writer, so the outcome is the same.
+
+The rows are written with SQL rather than save()/delete(), so model
+signals do not fire for them; the counter is moved here instead.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+
+_POSTGRES_TOGGLE = """
+WITH removed AS (
+    DELETE FROM {table} WHERE {target} = %(target)s AND {user} = %(user)s
+    RETURNING 1
+), added AS (
+    INSERT INTO {table} ({target}, {user}, {created})
+    SELECT %(target)s, %(user)s, %(now)s
+    WHERE NOT EXISTS (SELECT 1 FROM removed)
+    ON CONFLICT DO NOTHING
+    RETURNING 1
+){counted}
+SELECT NOT EXISTS (SELECT 1 FROM removed), {count}
+"""
+
+# The counter moves by what this statement did, like counters.bump().
+_POSTGRES_COUNTER = """, counted AS (
+    UPDATE {parent} SET {field} = GREATEST(
+        {field}
+        + (SELECT count(*) FROM added)
+        - (SELECT count(*) FROM removed),
+        0
+    )
+    WHERE {parent_pk} = %(target)s
+    RETURNING {field}
+)"""
+
+# Subqueries see the rows as they were before the statement.
+_POSTGRES_ROWS = """(
+    (SELECT count(*) FROM {table} WHERE {target} = %(target)s)
+    + (SELECT count(*) FROM added)
+    - (SELECT count(*) FROM removed)
+)"""
+
+
+def _columns(relation, target):
+    qn = connection.ops.quote_name
+    meta = relation._meta
+    created = meta.get_field("created_at")
+    return {
+        "table": qn(meta.db_table),
+        "target": qn(meta.get_field(target).column),
+        "user": qn(meta.get_field("user").column),
+        "created": qn(created.column),
+    }, created
+
+
+def toggle(relation, target, target_id, user, counter=None):
+    """
+    toggle(NoteLike, "note", note_id, user, counter="likes_count")
+        -> (liked, likes_count)
+
+    counter names a count field on the target model kept in step with
+    the rows; without one the target's rows are counted.
+    """
+    columns, created = _columns(relation, target)
+    params = {
+        "target": target_id,
+        "user": user.pk,
+        "now": created.get_db_prep_value(timezone.now(), connection),
+    }
+
+    if connection.vendor == "postgresql":
+        return _toggle_postgres(relation, target, counter, columns, params)
+    return _toggle_steps(relation, target, counter, columns, params)
+
+
+def _toggle_postgres(relation, target, counter, columns, params):
+    if counter:
+        parent = relation._meta.get_field(target).related_model._meta
+        qn = connection.ops.quote_name
+        counted = _POSTGRES_COUNTER.format(
+            parent=qn(parent.db_table),
+            parent_pk=qn(parent.pk.column),
+            field=qn(parent.get_field(counter).column),
+        )
+        count = "(SELECT * FROM counted)"
+    else:
+        counted = ""
+        count = _POSTGRES_ROWS.format(**columns)
+
+    sql = _POSTGRES_TOGGLE.format(counted=counted, count=count, **columns)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        active, total = cursor.fetchone()
+    return active, total or 0
+
+
+def _toggle_steps(relation, target, counter, columns, params):
+    insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+    suffix = connection.ops.on_conflict_suffix_sql(
+        None, OnConflict.IGNORE, None, None
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM {table} WHERE {target} = %s AND {user} = %s"
+            .format(**columns),
+            [params["target"], params["user"]],
+        )
+        removed = cursor.rowcount > 0
+        added = False
+        if not removed:
+            cursor.execute(
+                "{insert} {table} ({target}, {user}, {created}) "
+                "VALUES (%s, %s, %s) {suffix}"
+                .format(insert=insert, suffix=suffix, **columns),
+                [params["target"], params["user"], params["now"]],
+            )
+            added = cursor.rowcount > 0
+
+        if not counter:
+            rows = relation._default_manager.filter(
+                **{f"{target}_id": params["target"]}
+            )
+            return not removed, rows.count()
+
+        parent = relation._meta.get_field(target).related_model
+        targets = parent._default_manager.filter(pk=params["target"])
+        delta = added - removed
+        if delta:
+            targets.update(**{counter: Greatest(F(counter) + delta, 0)})
+        total = targets.values_list(counter, flat=True).first()
+        return not removed, total or 0
@@ -1,7 +1,9 @@
 from django.contrib import admin, messages
-from django.conf import settings
-from django.core.mail import send_mail
+from django.db.models import Q
 
+from apps.core import outbox
+
+from . import moderation
 from .models import Note, NoteAction
 
 
@@ -93,7 +95,7 @@ class NoteAdmin(admin.ModelAdmin):
         return self.readonly_fields
 
     # -------------------------------------------------
-    # Save hook (emails + timeline)
+    # Save hook (outbox emails + timeline)
     # -------------------------------------------------
     def save_model(self, request, obj, form, change):
         prev_approved = None
@@ -117,12 +119,10 @@ class NoteAdmin(admin.ModelAdmin):
                 action="approved",
                 actor=request.user,
             )
-            send_mail(
-                subject="Your note was approved",
-                message=f"Your note '{obj.title}' is now visible.",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[obj.uploader.email],
-                fail_silently=True,
+            outbox.enqueue(
+                "Your note was approved",
+                f"Your note '{obj.title}' is now visible.",
+                [obj.uploader.email],
             )
 
         # ---- REJECTED ----
@@ -133,12 +133,10 @@ class NoteAdmin(admin.ModelAdmin):
                 actor=request.user,
                 reason=obj.rejection_reason,
             )
-            send_mail(
-                subject="Your note was rejected",
-                message=f"Reason:\n{obj.rejection_reason}",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[obj.uploader.email],
-                fail_silently=True,
+            outbox.enqueue(
+                "Your note was rejected",
+                f"Reason:\n{obj.rejection_reason}",
+                [obj.uploader.email],
             )
 
     # -------------------------------------------------
@@ -146,43 +144,45 @@ class NoteAdmin(admin.ModelAdmin):
     # -------------------------------------------------
     @admin.action(description="Approve selected notes")
     def approve_notes(self, request, queryset):
-        count = 0
-        for note in queryset:
-            if not note.is_approved:
-                note.is_approved = True
-                note.is_rejected = False
-                note.rejection_reason = ""
-                note.save()
-
-                NoteAction.objects.create(
-                    note=note,
-                    action="approved",
-                    actor=request.user,
-                )
-                count += 1
+        results = moderation.moderate(
+            request.user,
+            queryset.values_list("pk", flat=True),
+            moderation.APPROVE,
+        )
+        count = sum(r == moderation.APPROVED for r in results.values())
 
         messages.success(request, f"{count} note(s) approved.")
+        self._report_leased(request, results)
 
     @admin.action(description="Reject selected notes (requires reason)")
     def reject_notes(self, request, queryset):
-        for note in queryset:
-            if not note.rejection_reason:
-                messages.error(
-                    request,
-                    f"Note '{note.title}' must have a rejection reason before rejecting."
-                )
-                return
-
-            if not note.is_rejected:
-                note.is_approved = False
-                note.is_rejected = True
-                note.save()
-
-                NoteAction.objects.create(
-                    note=note,
-                    action="rejected",
-                    actor=request.user,
-                    reason=note.rejection_reason,
-                )
+        missing = (
+            queryset
+            .filter(Q(rejection_reason="") | Q(rejection_reason__isnull=True))
+            .values_list("title", flat=True)
+            .first()
+        )
+        if missing is not None:
+            messages.error(
+                request,
+                f"Note '{missing}' must have a rejection reason before rejecting."
+            )
+            return
+
+        # Each note keeps its own rejection reason.
+        results = moderation.moderate(
+            request.user,
+            queryset.values_list("pk", flat=True),
+            moderation.REJECT,
+        )
 
         messages.success(request, "Selected notes rejected.")
+        self._report_leased(request, results)
+
+    def _report_leased(self, request, results):
+        leased = sum(r == moderation.LEASED for r in results.values())
+        if leased:
+            messages.warning(
+                request,
+                f"{leased} note(s) skipped: another reviewer is reviewing them.",
+            )
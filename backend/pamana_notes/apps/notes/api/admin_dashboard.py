@@ -1,78 +1,56 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
-from django.db.models import Count
-from django.db.models.functions import TruncDate
 
-from apps.notes.models import Note
-from django.contrib.auth import get_user_model
-
-User = get_user_model()
+from apps.notes import stats as note_stats
 
 
 class AdminDashboardStatsAPIView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
+        # Served from the NoteDailyStat rollups; ?days= sets the
+        # uploads-per-day window (0 = all history).
+        summary = note_stats.summary(note_stats.window_from(request))
+        totals = summary["totals"]
+
         # ======================
         # KPI STATS
         # ======================
         stats = {
-            "total_users": User.objects.count(),
-            "total_notes": Note.objects.filter(is_deleted=False).count(),
+            "total_users": summary["users"],
+            "total_notes": note_stats.count(totals, deleted=False),
 
             # pending = not approved, not rejected, not deleted
-            "pending_notes": Note.objects.filter(
-                is_approved=False,
-                is_rejected=False,
-                is_deleted=False,
-            ).count(),
+            "pending_notes": note_stats.count(
+                totals, deleted=False, approved=False, rejected=False
+            ),
 
-            "approved_notes": Note.objects.filter(
-                is_approved=True,
-                is_deleted=False,
-            ).count(),
+            "approved_notes": note_stats.count(
+                totals, deleted=False, approved=True
+            ),
 
-            "rejected_notes": Note.objects.filter(
-                is_rejected=True
-            ).count(),
+            "rejected_notes": note_stats.count(totals, rejected=True),
         }
 
         # ======================
         # UPLOADS PER DAY
         # ======================
-        uploads_per_day = (
-            Note.objects
-            .filter(is_deleted=False)
-            .annotate(day=TruncDate("uploaded_at"))
-            .values("day")
-            .annotate(notes=Count("id"))
-            .order_by("day")
-        )
-
         uploads_per_day = [
-            {"day": str(row["day"]), "notes": row["notes"]}
-            for row in uploads_per_day
-            if row["day"] is not None
+            {"day": str(day), "notes": notes}
+            for day, (notes, _) in summary["per_day"].items()
+            if notes
         ]
 
         # ======================
         # UPLOADS BY SUBJECT
         # ======================
-        uploads_by_subject = (
-            Note.objects
-            .filter(is_deleted=False)
-            .values("subject__name")
-            .annotate(notes=Count("id"))
-            .order_by("-notes")
-        )
-
         uploads_by_subject = [
             {
-                "subject": row["subject__name"] or "Uncategorized",
-                "notes": row["notes"]
+                "subject": name or "Uncategorized",
+                "notes": notes
             }
-            for row in uploads_by_subject
+            for name, notes in summary["subjects"].most_common()
         ]
 
         return Response({
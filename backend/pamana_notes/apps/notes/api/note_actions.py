@@ -1,55 +1,79 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
-from django.db.models import F
-from apps.notes.models import Note, NoteLike, NoteSave, Comment
+from rest_framework import status
+from apps.core import idempotency, toggles
+from apps.notes import comment_tree, counter_buffer, visibility
+from apps.notes.models import NoteLike, NoteSave, Comment
 from apps.notes.api.serializers import CommentSerializer
+from apps.notes.downloads import serve_note_file
 
 
 class ToggleLikeAPIView(APIView):
+    """
+    Likes or unlikes in one statement; see apps.core.toggles. Send an
+    Idempotency-Key header to make retries safe.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        note = get_object_or_404(Note, pk=pk)
-        like, created = NoteLike.objects.get_or_create(
-            user=request.user, note=note
-        )
-
-        if not created:
-            like.delete()
+        def perform():
+            visibility.readable_note_or_404(request.user, pk)
+            liked, count = toggles.toggle(
+                NoteLike, "note", pk, request.user, counter="likes_count"
+            )
+            return {"liked": liked, "likes_count": count}
 
-        return Response({"liked": created})
+        return idempotency.respond(request, perform)
 
 
 class ToggleSaveAPIView(APIView):
+    """
+    Saves or unsaves in one statement, like ToggleLikeAPIView.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        note = get_object_or_404(Note, pk=pk)
-        save, created = NoteSave.objects.get_or_create(
-            user=request.user, note=note
-        )
+        def perform():
+            visibility.readable_note_or_404(request.user, pk)
+            saved, count = toggles.toggle(
+                NoteSave, "note", pk, request.user, counter="saves_count"
+            )
+            return {"saved": saved, "saves_count": count}
+
+        return idempotency.respond(request, perform)
 
-        if not created:
-            save.delete()
 
-        return Response({"saved": created})
+class NoteDownloadAPIView(APIView):
+    """
+    Streams the note file (Range / ETag aware) and counts the download
+    in the same request.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        note = visibility.readable_note_or_404(request.user, pk)
+
+        if not note.file:
+            return Response(
+                {"detail": "No file attached."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        return serve_note_file(request, note)
+
 
 class TrackDownloadAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        note = get_object_or_404(Note, pk=pk)
+        note = visibility.readable_note_or_404(request.user, pk)
 
-        Note.objects.filter(pk=pk).update(
-            downloads=F("downloads") + 1
-        )
-
-        note.refresh_from_db()  # ✅ IMPORTANT
+        # Buffered; see apps/notes/counter_buffer.py.
+        counter_buffer.add(note.pk, "downloads")
 
         return Response({
-            "downloads": note.downloads
+            "downloads": counter_buffer.current(note, "downloads")
         })
 
 
@@ -57,23 +81,37 @@ class CommentAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        comments = Comment.objects.filter(
-            note_id=pk,
-            parent__isnull=True
-        ).order_by("created_at")
+        visibility.readable_note_or_404(request.user, pk)
+
+        tree = comment_tree.for_note(pk)
 
         return Response(
-            CommentSerializer(comments, many=True).data
+            CommentSerializer(
+                tree.roots(),
+                many=True,
+                context={"request": request, "comment_tree": tree},
+            ).data
         )
 
     def post(self, request, pk):
-        note = get_object_or_404(Note, pk=pk)
+        note = visibility.readable_note_or_404(request.user, pk)
+
+        parent = None
+        parent_id = request.data.get("parent")
+        if parent_id:
+            # Replies inherit the parent's thread, so it must be on this note.
+            parent = Comment.objects.filter(pk=parent_id, note=note).first()
+            if parent is None:
+                return Response(
+                    {"detail": "Invalid parent comment"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
         Comment.objects.create(
             user=request.user,
             note=note,
             content=request.data.get("content"),
-            parent_id=request.data.get("parent"),
+            parent=parent,
         )
 
         return Response({"success": True})
@@ -1,20 +1,23 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
+from apps.core.parsers import MultiPartParser
+from apps.notes import extraction, visibility
 from apps.notes.models import Note
 from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.uploadhandlers import MaxUploadSizeMixin
 
 
-class NoteDetailAPIView(APIView):
+class NoteDetailAPIView(MaxUploadSizeMixin, APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
     def get(self, request, pk):
-        note = get_object_or_404(Note, pk=pk)
+        note = visibility.readable_note_or_404(request.user, pk)
         return Response(
             AdminNoteSerializer(note, context={"request": request}).data
         )
@@ -31,7 +34,8 @@ class NoteDetailAPIView(APIView):
         note.title = request.data.get("title", note.title)
         note.description = request.data.get("description", note.description)
 
-        if "file" in request.FILES:
+        file_replaced = "file" in request.FILES
+        if file_replaced:
             note.file = request.FILES["file"]
 
         note.is_approved = False
@@ -40,6 +44,9 @@ class NoteDetailAPIView(APIView):
 
         note.save()
 
+        if file_replaced:
+            extraction.schedule(note)
+
         return Response(
             AdminNoteSerializer(note, context={"request": request}).data,
             status=status.HTTP_200_OK,
@@ -1,9 +1,9 @@
 from rest_framework.views import APIView
-from rest_framework.response import Response
-from django.db.models import Q
 
+from apps.core import response_cache
+from apps.notes import visibility
 from apps.notes.models import Note
-from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.api.note_rows import NoteRowSerializer
 
 
 class PublicNotesAPIView(APIView):
@@ -11,25 +11,24 @@ class PublicNotesAPIView(APIView):
     permission_classes = []      # 🚫 no login required
 
     def get(self, request):
+        return response_cache.respond(
+            request,
+            response_cache.PUBLIC_NOTES,
+            lambda: self.build(request),
+        )
+
+    def build(self, request):
         notes_qs = (
-            Note.objects.filter(
-                is_deleted=False,
-                is_approved=True,
-                visibility="public",
-            )
-            .select_related(
-                "uploader",
-                "subject",
-                "subject__course",
-            )
+            Note.objects.filter(visibility.PUBLIC)
             .order_by("-uploaded_at")
         )
 
-        return Response({
-            "count": notes_qs.count(),
-            "notes": AdminNoteSerializer(
-                notes_qs,
-                many=True,
-                context={"request": request}
-            ).data,
-        })
+        notes = NoteRowSerializer(
+            notes_qs,
+            many=True,
+            context={"request": request}
+        ).data
+        return {
+            "count": len(notes),
+            "notes": notes,
+        }
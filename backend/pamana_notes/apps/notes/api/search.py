@@ -0,0 +1,49 @@
+from rest_framework.views import APIView
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from apps.notes import search, visibility
+from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.pagination import page_size_from
+from apps.notes.utils import saved_note_ids
+
+
+class NoteSearchAPIView(APIView):
+    """
+    GET /api/notes/search/?q=<terms>&page=<n>&page_size=<n>
+
+    Ranked full-text search over the notes the caller may see.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        user = request.user
+        query = request.query_params.get("q", "").strip()
+        page_size = page_size_from(request)
+
+        try:
+            page = max(1, int(request.query_params.get("page", 1)))
+        except (TypeError, ValueError):
+            page = 1
+
+        notes, total = search.ranked_search(
+            visibility.feed(user).select_related("uploader", "subject"),
+            query,
+            offset=(page - 1) * page_size,
+            limit=page_size,
+        )
+
+        return Response({
+            "query": query,
+            "count": total,
+            "page": page,
+            "page_size": page_size,
+            "notes": AdminNoteSerializer(
+                notes,
+                many=True,
+                context={
+                    "request": request,
+                    "saved_note_ids": saved_note_ids(user, notes),
+                },
+            ).data,
+        })
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from apps.notes import comment_tree, counter_buffer
 from apps.notes.models import Note, Comment
 
 
@@ -14,22 +15,25 @@ class AdminNoteSerializer(serializers.ModelSerializer):
         source="uploader.role", read_only=True
     )
 
-    likes_count = serializers.IntegerField(
-        source="likes.count", read_only=True
-    )
-    saves_count = serializers.IntegerField(
-        source="saves.count", read_only=True
-    )
-    downloads = serializers.IntegerField(read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
+    saves_count = serializers.IntegerField(read_only=True)
+    downloads = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
     status = serializers.SerializerMethodField()
 
     def get_is_saved(self, obj):
+        saved_ids = self.context.get("saved_note_ids")
+        if saved_ids is not None:
+            return obj.id in saved_ids
+
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return False
         return obj.saves.filter(user=request.user).exists()
 
+    def get_downloads(self, obj):
+        return counter_buffer.current(obj, "downloads")
+
     def get_status(self, obj):
         if obj.is_approved:
             return "approved"
@@ -59,6 +63,27 @@ class AdminNoteSerializer(serializers.ModelSerializer):
             "rejection_reason",
         ]
 
+
+class ReviewQueueNoteSerializer(AdminNoteSerializer):
+    """
+    A pending note in the reviewer work queue, with its lease.
+    """
+    claimed_by_me = serializers.SerializerMethodField()
+
+    def get_claimed_by_me(self, obj):
+        request = self.context.get("request")
+        return bool(
+            request
+            and obj.review_claimed_by_id == request.user.pk
+            and obj.review_lease_until
+        )
+
+    class Meta(AdminNoteSerializer.Meta):
+        fields = AdminNoteSerializer.Meta.fields + [
+            "claimed_by_me",
+            "review_lease_until",
+        ]
+
 # ======================================================
 # NOTE UPDATE SERIALIZER (STUDENT ONLY)
 # ======================================================
@@ -104,6 +129,7 @@ class CommentSerializer(serializers.ModelSerializer):
         source="user.school_id", read_only=True
     )
     replies = serializers.SerializerMethodField()
+    more_replies = serializers.SerializerMethodField()
     can_delete = serializers.SerializerMethodField()
 
     class Meta:
@@ -115,19 +141,55 @@ class CommentSerializer(serializers.ModelSerializer):
             "created_at",
             "parent",
             "replies",
+            "more_replies",
             "can_delete",
         ]
 
+    def _tree(self, obj):
+        # Lists pass the preloaded CommentTree in the context; a comment
+        # serialized on its own loads its subtree in one query.
+        tree = self.context.get("comment_tree")
+        if tree is None:
+            tree = obj._comment_tree = getattr(
+                obj, "_comment_tree", None
+            ) or comment_tree.for_subtree(obj)
+        return tree
+
     def get_replies(self, obj):
+        tree = self._tree(obj)
         return CommentSerializer(
-            obj.replies.all().order_by("created_at"),
+            tree.replies(obj),
             many=True,
-            context=self.context,
+            context={**self.context, "comment_tree": tree},
         ).data
 
+    def get_more_replies(self, obj):
+        return self._tree(obj).more_replies(obj)
+
     def get_can_delete(self, obj):
         request = self.context.get("request")
         if not request:
             return False
         return request.user == obj.user or request.user.is_staff
+
+
+class TopLevelCommentSerializer(CommentSerializer):
+    """
+    A top-level comment without its thread; reply_count comes from
+    comment_tree.top_level() and replies load from the replies endpoint.
+    """
+    reply_count = serializers.IntegerField(read_only=True, default=0)
+    replies = None
+    more_replies = None
+
+    class Meta(CommentSerializer.Meta):
+        fields = [
+            "id",
+            "content",
+            "user_school_id",
+            "created_at",
+            "parent",
+            "reply_count",
+            "can_delete",
+        ]
     
\ No newline at end of file
@@ -1,10 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q
+from rest_framework import status
 
 from apps.notes.models import Note
-from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.api.note_rows import NoteRowSerializer, rows
+from apps.notes.stats import user_note_counts
+from apps.notes.pagination import InvalidCursor, keyset_page, page_size_from
+from apps.notes import visibility
+from apps.notes.utils import saved_note_ids
 
 
 class StudentDashboardAPIView(APIView):
@@ -14,82 +18,51 @@ class StudentDashboardAPIView(APIView):
         user = request.user
 
         # ==================================================
-        # BASE VISIBILITY FILTER
+        # NOTES QUERYSET
         # ==================================================
-        base_filter = (
-            Q(visibility="public") |
-            Q(visibility="school") |
-            (
-                Q(visibility="course") &
-                (
-                    Q(subject__course=user.course) |
-                    Q(subject__course__isnull=True)
-                )
-            )
+        notes_qs = rows(
+            Note.objects.filter(visibility.feed_predicate(user))
         )
 
         # ==================================================
-        # MODERATOR COURSE SCOPE
-        # ==================================================
-        if user.role == "moderator":
-            base_filter &= (
-                Q(subject__course=user.course) |
-                Q(subject__is_general=True)
-            )
-
-        # ==================================================
-        # NOTES QUERYSET
+        # FEED PAGE (KEYSET ON uploaded_at, id)
         # ==================================================
-        notes_qs = (
-            Note.objects.filter(
-                is_deleted=False,
-                is_approved=True,
+        try:
+            notes, next_cursor = keyset_page(
+                notes_qs,
+                cursor=request.query_params.get("cursor"),
+                page_size=page_size_from(request),
             )
-            .filter(base_filter)
-            .select_related(
-                "uploader",
-                "subject",
-                "subject__course",
+        except InvalidCursor as exc:
+            return Response(
+                {"detail": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            .order_by("-uploaded_at")
-        )
+
+        counts = user_note_counts(user)
 
         data = {
             # =============================
             # DASHBOARD STATS (OWN NOTES)
             # =============================
-            "my_notes": Note.objects.filter(
-                uploader=user,
-                is_deleted=False
-            ).count(),
-
-            "approved": Note.objects.filter(
-                uploader=user,
-                is_approved=True,
-                is_deleted=False
-            ).count(),
-
-            "pending": Note.objects.filter(
-                uploader=user,
-                is_approved=False,
-                is_rejected=False,
-                is_deleted=False
-            ).count(),
-
-            "rejected": Note.objects.filter(
-                uploader=user,
-                is_rejected=True,
-                is_deleted=False
-            ).count(),
+            # One cached conditional aggregate (stats.user_note_counts)
+            "my_notes": counts["my_notes"],
+            "approved": counts["approved"],
+            "pending": counts["pending"],
+            "rejected": counts["rejected"],
 
             # =============================
             # FEED
             # =============================
-            "notes": AdminNoteSerializer(
-                notes_qs,
+            "notes": NoteRowSerializer(
+                notes,
                 many=True,
-                context={"request": request}
+                context={
+                    "request": request,
+                    "saved_note_ids": saved_note_ids(user, notes),
+                }
             ).data,
+            "next_cursor": next_cursor,
         }
 
         return Response(data)
@@ -3,7 +3,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from apps.notes.models import Note
-from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.api.note_rows import NoteRowSerializer
 
 
 class StudentMyNotesAPIView(APIView):
@@ -16,7 +16,7 @@ class StudentMyNotesAPIView(APIView):
         ).order_by("-uploaded_at")
 
         return Response(
-            AdminNoteSerializer(
+            NoteRowSerializer(
                 notes,
                 many=True,
                 context={"request": request}
@@ -2,8 +2,8 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from apps.notes.models import Note
-from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes import visibility
+from apps.notes.api.note_rows import NoteRowSerializer
 
 
 class StudentSavedNotesAPIView(APIView):
@@ -11,25 +11,18 @@ class StudentSavedNotesAPIView(APIView):
 
     def get(self, request):
         notes = (
-            Note.objects.filter(
-                saves__user=request.user,  # ✅ CORRECT
-                is_deleted=False,
-                is_approved=True,
-            )
-            .select_related(
-                "uploader",
-                "subject",
-                "subject__course",
-            )
+            visibility.feed(request.user)
+            .filter(saves__user=request.user)
             .distinct()
             .order_by("-uploaded_at")
         )
 
+        data = NoteRowSerializer(
+            notes,
+            many=True,
+            context={"request": request}
+        ).data
         return Response({
-            "count": notes.count(),
-            "notes": AdminNoteSerializer(
-                notes,
-                many=True,
-                context={"request": request}
-            ).data,
+            "count": len(data),
+            "notes": data,
         })
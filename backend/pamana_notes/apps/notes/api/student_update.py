@@ -1,15 +1,18 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import FormParser
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
+from apps.core.parsers import MultiPartParser
+from apps.notes import extraction
 from apps.notes.models import Note
 from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.uploadhandlers import MaxUploadSizeMixin
 
 
-class StudentNoteUpdateAPIView(APIView):
+class StudentNoteUpdateAPIView(MaxUploadSizeMixin, APIView):
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
 
@@ -44,7 +47,8 @@ class StudentNoteUpdateAPIView(APIView):
         note.title = title
         note.description = description
 
-        if "file" in request.FILES:
+        file_replaced = "file" in request.FILES
+        if file_replaced:
             note.file = request.FILES["file"]
 
         # 🔄 Reset moderation state on edit
@@ -54,6 +58,9 @@ class StudentNoteUpdateAPIView(APIView):
 
         note.save()
 
+        if file_replaced:
+            extraction.schedule(note)
+
         return Response(
             AdminNoteSerializer(note, context={"request": request}).data,
             status=status.HTTP_200_OK,
@@ -3,107 +3,120 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from apps.notes import extraction
 from apps.notes.models import Note
+from apps.notes.uploadhandlers import (
+    MaxUploadSizeMixin, max_upload_size, too_large_message,
+)
 from apps.subjects.models import Subject
 from apps.notes.api.serializers import AdminNoteSerializer
 
 
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-
-
-class StudentUploadAPIView(APIView):
+class StudentUploadAPIView(MaxUploadSizeMixin, APIView):
+    """
+    Single-request upload. Larger files can also be sent in resumable
+    chunks (upload_sessions.py), which end in create_note() too.
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        user = request.user
-
-        title = (request.data.get("title") or "").strip()
-        description = (request.data.get("description") or "").strip()
-        subject_id = request.data.get("subject")
-        visibility = request.data.get("visibility")
-        file = request.FILES.get("file")
-
-        # ============================
-        # BASIC VALIDATION
-        # ============================
-        if not title:
-            return Response(
-                {"title": "Title is required."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        return create_note(request, request.FILES.get("file"))
 
-        if not description and not file:
-            return Response(
-                {"detail": "Provide a description or upload a file."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
 
-        if not subject_id:
-            return Response(
-                {"detail": "Subject is required."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+def create_note(request, file):
+    """
+    Validates the note fields in request.data and creates the pending
+    note with `file` (None for text-only notes).
+    """
+    user = request.user
 
-        subject = Subject.objects.filter(id=subject_id).first()
-        if not subject:
-            return Response(
-                {"detail": "Invalid subject."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    title = (request.data.get("title") or "").strip()
+    description = (request.data.get("description") or "").strip()
+    subject_id = request.data.get("subject")
+    visibility = request.data.get("visibility")
 
-        # ============================
-        # FILE SIZE
-        # ============================
-        if file and file.size > MAX_FILE_SIZE:
-            return Response(
-                {"file": "File size must be 10MB or less."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    # ============================
+    # BASIC VALIDATION
+    # ============================
+    if not title:
+        return Response(
+            {"title": "Title is required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-        # ============================
-        # MODERATOR COURSE RESTRICTION
-        # ============================
-        if user.role == "moderator":
-            if subject.course and subject.course != user.course:
-                return Response(
-                    {"detail": "Moderators can only upload notes for their own course."},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-        # ============================
-        # VISIBILITY RULES
-        # ============================
-        if visibility == "course" and subject.course is None:
-            return Response(
-                {"detail": "General subjects cannot use course visibility."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    if not description and not file:
+        return Response(
+            {"detail": "Provide a description or upload a file."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if not subject_id:
+        return Response(
+            {"detail": "Subject is required."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    subject = Subject.objects.filter(id=subject_id).first()
+    if not subject:
+        return Response(
+            {"detail": "Invalid subject."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-        if visibility == "course" and subject.course != user.course:
+    # ============================
+    # FILE SIZE
+    # ============================
+    if file and file.size > max_upload_size():
+        return Response(
+            {"file": too_large_message()},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # ============================
+    # MODERATOR COURSE RESTRICTION
+    # ============================
+    if user.role == "moderator":
+        if subject.course and subject.course != user.course:
             return Response(
-                {"detail": "You cannot upload a course note for another course."},
+                {"detail": "Moderators can only upload notes for their own course."},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # ============================
-        # CREATE NOTE (PENDING)
-        # ============================
-        note = Note.objects.create(
-            uploader=user,
-            title=title,
-            description=description,
-            file=file,
-            subject=subject,
-            visibility=visibility,
-            is_approved=False,
-            is_rejected=False,
-            rejection_reason="",
+    # ============================
+    # VISIBILITY RULES
+    # ============================
+    if visibility == "course" and subject.course is None:
+        return Response(
+            {"detail": "General subjects cannot use course visibility."},
+            status=status.HTTP_400_BAD_REQUEST,
         )
 
+    if visibility == "course" and subject.course != user.course:
         return Response(
-            AdminNoteSerializer(
-                note,
-                context={"request": request},
-            ).data,
-            status=status.HTTP_201_CREATED,
+            {"detail": "You cannot upload a course note for another course."},
+            status=status.HTTP_403_FORBIDDEN,
         )
+
+    # ============================
+    # CREATE NOTE (PENDING)
+    # ============================
+    note = Note.objects.create(
+        uploader=user,
+        title=title,
+        description=description,
+        file=file,
+        subject=subject,
+        visibility=visibility,
+        is_approved=False,
+        is_rejected=False,
+        rejection_reason="",
+    )
+    extraction.schedule(note)
+
+    return Response(
+        AdminNoteSerializer(
+            note,
+            context={"request": request},
+        ).data,
+        status=status.HTTP_201_CREATED,
+    )
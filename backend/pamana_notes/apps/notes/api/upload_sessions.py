@@ -0,0 +1,147 @@
+import os
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.shortcuts import get_object_or_404
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+
+from apps.notes import resumable
+from apps.notes.models import UploadSession, validate_file_type
+from apps.notes.uploadhandlers import max_upload_size, too_large_message
+from apps.notes.api.student_upload import create_note
+
+
+# ======================================================
+# RESUMABLE UPLOADS (see apps/notes/resumable.py)
+# ======================================================
+def _error(exc, session=None):
+    data = {"detail": exc.detail}
+    if session is not None:
+        data["offset"] = session.offset
+    return Response(data, status=exc.status_code)
+
+
+class UploadSessionCreateAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        filename = os.path.basename(str(request.data.get("filename") or ""))
+        expected_sha256 = str(request.data.get("sha256") or "").lower()
+
+        if not filename or len(filename) > 255:
+            return Response(
+                {"filename": "A file name of up to 255 characters is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            validate_file_type(File(None, name=filename))
+        except ValidationError as exc:
+            return Response(
+                {"filename": exc.messages[0]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            size = 0
+        if size < 1:
+            return Response(
+                {"size": "File size in bytes is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if size > max_upload_size():
+            return Response(
+                {"size": too_large_message()},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        if expected_sha256 and not re.fullmatch(r"[0-9a-f]{64}", expected_sha256):
+            return Response(
+                {"sha256": "Expected a hex SHA-256 digest."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        session = UploadSession.objects.create(
+            user=request.user,
+            filename=filename,
+            size=size,
+            expected_sha256=expected_sha256,
+        )
+        return Response(
+            resumable.describe(session), status=status.HTTP_201_CREATED
+        )
+
+
+class UploadSessionAPIView(APIView):
+    """
+    GET: where to resume. PATCH: append the request body as a chunk.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        session = get_object_or_404(resumable.sessions(request.user), pk=pk)
+        return Response(resumable.describe(session))
+
+    def patch(self, request, pk):
+        session = get_object_or_404(resumable.sessions(request.user), pk=pk)
+
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            return Response(
+                {"detail": "Upload-Offset header is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        length = request.headers.get("Content-Length")
+        try:
+            # The body is read here, never parsed into request.data.
+            session = resumable.append(
+                session,
+                offset,
+                request.stream,
+                length=int(length) if length and length.isdigit() else None,
+                checksum=request.headers.get("Upload-SHA256"),
+            )
+        except resumable.UploadError as exc:
+            # Report the offset as stored now; the session may also have
+            # been finalized or purged while the chunk was being read.
+            session = resumable.sessions(request.user).filter(pk=pk).first()
+            if session is None:
+                return Response(
+                    {"detail": "Upload session no longer exists."},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            return _error(exc, session)
+
+        return Response(resumable.describe(session))
+
+
+class UploadSessionFinalizeAPIView(APIView):
+    """
+    Turns a complete upload into a note; takes the same fields as
+    StudentUploadAPIView. The session stays open if they are invalid.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        session = get_object_or_404(resumable.sessions(request.user), pk=pk)
+
+        try:
+            digest = resumable.verify(session)
+        except resumable.UploadError as exc:
+            return _error(exc, session)
+
+        with open(resumable.part_path(session.pk), "rb") as fh:
+            file = File(fh, name=session.filename)
+            file.sha256 = digest  # spares the storage a second pass
+            response = create_note(request, file)
+
+        if response.status_code == status.HTTP_201_CREATED:
+            resumable.discard(session)
+        return response
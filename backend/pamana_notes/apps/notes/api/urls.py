@@ -3,17 +3,28 @@ from django.urls import path
 from .student_dashboard import StudentDashboardAPIView
 from .student_my_notes import StudentMyNotesAPIView
 from .student_upload import StudentUploadAPIView
+from .upload_sessions import (
+    UploadSessionAPIView,
+    UploadSessionCreateAPIView,
+    UploadSessionFinalizeAPIView,
+)
 from .subjects_list import SubjectListAPIView
 from .public_notes import PublicNotesAPIView
 from .note_detail import NoteDetailAPIView
 from .student_saved import StudentSavedNotesAPIView
 from .student_update import StudentNoteUpdateAPIView
 from .admin_dashboard import AdminDashboardStatsAPIView
+from .search import NoteSearchAPIView
 
 from .views import (
+    BulkModerationAPIView,
     CommentDeleteAPIView,
+    CommentRepliesAPIView,
     NoteCommentsAPIView,
     PendingNotesAPIView,
+    ReviewQueueAPIView,
+    ReviewQueueClaimAPIView,
+    ReviewQueueReleaseAPIView,
     ModeratedNotesAPIView,
     
     approve_note,
@@ -25,6 +36,7 @@ from .note_actions import (
     ToggleSaveAPIView,
     CommentAPIView,
     TrackDownloadAPIView,
+    NoteDownloadAPIView,
 )
 
 urlpatterns = [
@@ -33,6 +45,7 @@ urlpatterns = [
     # =====================
     path("public/", PublicNotesAPIView.as_view()),
     path("subjects/", SubjectListAPIView.as_view()),
+    path("search/", NoteSearchAPIView.as_view()),
 
     # =====================
     # STUDENT
@@ -40,15 +53,23 @@ urlpatterns = [
     path("student/dashboard/", StudentDashboardAPIView.as_view()),
     path("student/my-notes/", StudentMyNotesAPIView.as_view()),
     path("student/upload/", StudentUploadAPIView.as_view()),
+    path("student/uploads/", UploadSessionCreateAPIView.as_view()),
+    path("student/uploads/<uuid:pk>/", UploadSessionAPIView.as_view()),
+    path(
+        "student/uploads/<uuid:pk>/finalize/",
+        UploadSessionFinalizeAPIView.as_view(),
+    ),
     path("student/saved/", StudentSavedNotesAPIView.as_view()),
     path("student/notes/<int:pk>/", StudentNoteUpdateAPIView.as_view()),
 
     path("notes/<int:note_id>/comments/", NoteCommentsAPIView.as_view()),
     path("comments/<int:pk>/", CommentDeleteAPIView.as_view()),
+    path("comments/<int:pk>/replies/", CommentRepliesAPIView.as_view()),
 
     path("notes/<int:pk>/", NoteDetailAPIView.as_view()),
     path("notes/<int:pk>/like/", ToggleLikeAPIView.as_view()),
     path("notes/<int:pk>/track-download/", TrackDownloadAPIView.as_view()),
+    path("notes/<int:pk>/download/", NoteDownloadAPIView.as_view()),
     path("notes/<int:pk>/save/", ToggleSaveAPIView.as_view()),
     path("notes/<int:pk>/comments/", CommentAPIView.as_view()),
 
@@ -57,8 +78,12 @@ urlpatterns = [
     # =====================
     path("pending/", PendingNotesAPIView.as_view()),
     path("moderated/", ModeratedNotesAPIView.as_view()),
+    path("review-queue/", ReviewQueueAPIView.as_view()),
+    path("review-queue/claim/", ReviewQueueClaimAPIView.as_view()),
+    path("review-queue/release/", ReviewQueueReleaseAPIView.as_view()),
     path("approve/<int:pk>/", approve_note),
     path("reject/<int:pk>/", reject_note),
+    path("moderate/", BulkModerationAPIView.as_view()),
 
     # =====================
     # ADMIN ONLY
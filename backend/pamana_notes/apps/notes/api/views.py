@@ -6,20 +6,26 @@ from rest_framework import status
 from rest_framework.generics import DestroyAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
 
-from django.contrib.auth import get_user_model
-from django.db.models.functions import TruncDate
-from django.db.models import Count, Q
+from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 
+from apps.core import streaming
+from apps.notes import comment_tree, moderation, review_queue
+from apps.notes import stats as note_stats
+from apps.notes import visibility
 from apps.notes.models import Note, Comment
+from apps.notes.pagination import InvalidCursor, keyset_page, page_size_from
+from apps.notes.utils import saved_note_ids
+from .note_rows import NoteRowSerializer, rows
 from .serializers import (
     AdminNoteSerializer,
     CommentSerializer,
     NoteUpdateSerializer,
+    ReviewQueueNoteSerializer,
+    TopLevelCommentSerializer,
 )
 
-User = get_user_model()
-
 
 # ======================================================
 # PERMISSIONS
@@ -36,43 +42,104 @@ class IsReviewer(BasePermission):
 
 
 # ======================================================
-# INTERNAL HELPER — COURSE-SCOPED QUERYSET
+# REVIEWER — PENDING NOTES
 # ======================================================
-def reviewer_notes_queryset(user):
+class PendingNotesAPIView(APIView):
     """
-    Admin  -> all notes
-    Moderator -> own course + general subjects only
+    Pending notes, minus those leased to another reviewer.
     """
-    qs = Note.objects.filter(is_deleted=False)
+    permission_classes = [IsReviewer]
 
-    if user.role == "admin":
-        return qs
+    def get(self, request):
+        notes = review_queue.queue(request.user).order_by("-uploaded_at")
 
-    # MODERATOR
-    return qs.filter(
-        Q(subject__course=user.course) |
-        Q(subject__is_general=True)
-    )
+        return Response(
+            NoteRowSerializer(
+                notes, many=True, context={"request": request}
+            ).data
+        )
 
 
 # ======================================================
-# REVIEWER — PENDING NOTES
+# REVIEWER — WORK QUEUE
 # ======================================================
-class PendingNotesAPIView(APIView):
+def _queue_page(request, notes, **extra):
+    return Response({
+        "notes": ReviewQueueNoteSerializer(
+            notes,
+            many=True,
+            context={
+                "request": request,
+                "saved_note_ids": saved_note_ids(request.user, notes),
+            },
+        ).data,
+        **extra,
+    })
+
+
+class ReviewQueueAPIView(APIView):
+    """
+    Pending notes not leased to another reviewer, oldest first, paged
+    by ?cursor= (keyset on uploaded_at, id).
+    """
     permission_classes = [IsReviewer]
 
     def get(self, request):
-        notes = (
-            reviewer_notes_queryset(request.user)
-            .filter(is_approved=False, is_rejected=False)
-            .order_by("-uploaded_at")
-        )
+        try:
+            notes, next_cursor = keyset_page(
+                review_queue.queue(request.user)
+                .select_related("uploader", "subject"),
+                cursor=request.query_params.get("cursor"),
+                page_size=page_size_from(request),
+                oldest_first=True,
+            )
+        except InvalidCursor as exc:
+            return Response(
+                {"detail": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return _queue_page(request, notes, next_cursor=next_cursor)
 
-        return Response(
-            AdminNoteSerializer(
-                notes, many=True, context={"request": request}
-            ).data
+
+class ReviewQueueClaimAPIView(APIView):
+    """
+    POST {"count": N}: leases up to N more notes and returns every note
+    the reviewer holds, with leases renewed.
+    """
+    permission_classes = [IsReviewer]
+
+    def post(self, request):
+        try:
+            count = int(request.data.get("count", 10))
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "count must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        notes = list(
+            review_queue.claim(request.user, count)
+            .select_related("uploader", "subject")
         )
+        return _queue_page(request, notes)
+
+
+class ReviewQueueReleaseAPIView(APIView):
+    """
+    POST {"ids": [...]}: hands leased notes back to the queue.
+    """
+    permission_classes = [IsReviewer]
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        if not isinstance(ids, list):
+            return Response(
+                {"detail": "ids must be a list of note ids"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({
+            "released": review_queue.release(request.user, ids),
+        })
 
 
 # ======================================================
@@ -83,13 +150,13 @@ class ModeratedNotesAPIView(APIView):
 
     def get(self, request):
         notes = (
-            reviewer_notes_queryset(request.user)
+            visibility.reviewable(request.user)
             .filter(Q(is_approved=True) | Q(is_rejected=True))
             .order_by("-uploaded_at")
         )
 
         return Response(
-            AdminNoteSerializer(
+            NoteRowSerializer(
                 notes, many=True, context={"request": request}
             ).data
         )
@@ -141,50 +208,87 @@ class StudentNoteUpdateAPIView(APIView):
 # ======================================================
 # REVIEWER — APPROVE / REJECT
 # ======================================================
+def _moderate_one(request, pk, decision, reason=None):
+    """
+    None when the decision was applied, else the error response.
+    """
+    result = moderation.moderate(request.user, [pk], decision, reason)[pk]
+    if result == moderation.NOT_FOUND:
+        raise Http404
+    if result == moderation.LEASED:
+        return Response(
+            {"detail": "Another reviewer is reviewing this note."},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return None
+
+
 @api_view(["POST"])
 @permission_classes([IsReviewer])
 def approve_note(request, pk):
-    note = get_object_or_404(
-        reviewer_notes_queryset(request.user),
-        pk=pk,
-    )
-
-    note.is_approved = True
-    note.is_rejected = False
-    note.rejection_reason = ""
-    note.save(
-        update_fields=[
-            "is_approved",
-            "is_rejected",
-            "rejection_reason",
-        ]
-    )
-
-    return Response({"message": "Note approved successfully"})
+    error = _moderate_one(request, pk, moderation.APPROVE)
+    return error or Response({"message": "Note approved successfully"})
 
 
 @api_view(["POST"])
 @permission_classes([IsReviewer])
 def reject_note(request, pk):
-    note = get_object_or_404(
-        reviewer_notes_queryset(request.user),
-        pk=pk,
+    error = _moderate_one(
+        request,
+        pk,
+        moderation.REJECT,
+        request.data.get("reason", moderation.DEFAULT_REASON),
     )
+    return error or Response({"message": "Note rejected successfully"})
 
-    note.is_approved = False
-    note.is_rejected = True
-    note.rejection_reason = request.data.get(
-        "reason", "Rejected by reviewer"
-    )
-    note.save(
-        update_fields=[
-            "is_approved",
-            "is_rejected",
-            "rejection_reason",
-        ]
-    )
 
-    return Response({"message": "Note rejected successfully"})
+class BulkModerationAPIView(APIView):
+    """
+    POST {"ids": [...], "decision": "approve" | "reject", "reason": "..."}
+
+    Applies one decision to up to moderation.MAX_BATCH notes and reports
+    what happened to each id.
+    """
+    permission_classes = [IsReviewer]
+
+    def post(self, request):
+        decision = request.data.get("decision")
+        if decision not in moderation.STATES:
+            return Response(
+                {"detail": "decision must be 'approve' or 'reject'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        ids = request.data.get("ids")
+        try:
+            ids = [int(pk) for pk in ids] if isinstance(ids, list) else None
+        except (TypeError, ValueError):
+            ids = None
+        if not ids or len(ids) > moderation.MAX_BATCH:
+            return Response(
+                {
+                    "detail": "ids must be a list of 1 to "
+                              f"{moderation.MAX_BATCH} note ids"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        reason = None
+        if decision == moderation.REJECT:
+            reason = request.data.get("reason") or moderation.DEFAULT_REASON
+
+        results = moderation.moderate(request.user, ids, decision, reason)
+        return Response({
+            "decision": decision,
+            "updated": sum(
+                result == moderation.ACTIONS[decision]
+                for result in results.values()
+            ),
+            "results": [
+                {"id": pk, "result": result}
+                for pk, result in results.items()
+            ],
+        })
 
 
 # ======================================================
@@ -200,38 +304,33 @@ class AdminDashboardAPIView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
+        summary = note_stats.summary(note_stats.window_from(request))
+        totals = summary["totals"]
+
         stats = {
-            "total_users": User.objects.count(),
-            "total_notes": Note.objects.filter(is_deleted=False).count(),
-            "pending_notes": Note.objects.filter(
-                is_deleted=False,
-                is_approved=False,
-                is_rejected=False,
-            ).count(),
-            "approved_notes": Note.objects.filter(
-                is_deleted=False,
-                is_approved=True,
-            ).count(),
-            "rejected_notes": Note.objects.filter(
-                is_deleted=False,
-                is_rejected=True,
-            ).count(),
+            "total_users": summary["users"],
+            "total_notes": note_stats.count(totals, deleted=False),
+            "pending_notes": note_stats.count(
+                totals, deleted=False, approved=False, rejected=False
+            ),
+            "approved_notes": note_stats.count(
+                totals, deleted=False, approved=True
+            ),
+            "rejected_notes": note_stats.count(
+                totals, deleted=False, rejected=True
+            ),
         }
 
-        uploads_per_day = (
-            Note.objects.filter(is_deleted=False, is_approved=True)
-            .annotate(day=TruncDate("uploaded_at"))
-            .values("day")
-            .annotate(count=Count("id"))
-            .order_by("day")
-        )
+        uploads_per_day = [
+            {"day": day, "count": approved}
+            for day, (_, approved) in summary["per_day"].items()
+            if approved
+        ]
 
-        uploads_by_subject = (
-            Note.objects.filter(is_deleted=False)
-            .values("subject__name")
-            .annotate(count=Count("id"))
-            .order_by("-count")[:5]
-        )
+        uploads_by_subject = [
+            {"subject__name": name, "count": notes}
+            for name, notes in summary["subjects"].most_common(5)
+        ]
 
         return Response({
             "stats": stats,
@@ -246,15 +345,16 @@ class AdminDashboardAPIView(APIView):
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def public_notes_api(request):
-    notes = Note.objects.filter(
-        is_deleted=False,
-        is_approved=True,
-    ).order_by("-uploaded_at")
-
-    return Response(
-        AdminNoteSerializer(
-            notes, many=True, context={"request": request}
-        ).data
+    notes = visibility.feed(request.user).order_by("-uploaded_at", "-id")
+
+    return streaming.stream_list(
+        request,
+        rows(notes),
+        NoteRowSerializer,
+        context=lambda batch: {
+            "request": request,
+            "saved_note_ids": saved_note_ids(request.user, batch),
+        },
     )
 
 
@@ -265,30 +365,71 @@ class NoteCommentsAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, note_id):
-        comments = Comment.objects.filter(
-            note_id=note_id
-        ).order_by("-created_at")
+        visibility.readable_note_or_404(request.user, note_id)
+
+        # Newest top-level comments first, keyset on (created_at, id);
+        # threads load lazily from CommentRepliesAPIView.
+        try:
+            comments, next_cursor = keyset_page(
+                comment_tree.top_level(note_id),
+                cursor=request.query_params.get("cursor"),
+                page_size=page_size_from(request),
+                field="created_at",
+            )
+        except InvalidCursor as exc:
+            return Response(
+                {"detail": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         return Response({
-            "comments": CommentSerializer(
+            "comments": TopLevelCommentSerializer(
                 comments, many=True, context={"request": request}
-            ).data
+            ).data,
+            "next_cursor": next_cursor,
         })
 
     def post(self, request, note_id):
+        visibility.readable_note_or_404(request.user, note_id)
+
         comment = Comment.objects.create(
             note_id=note_id,
             user=request.user,
             content=request.data.get("content"),
         )
         return Response(
-            CommentSerializer(
+            TopLevelCommentSerializer(
                 comment, context={"request": request}
             ).data,
             status=201,
         )
 
 
+class CommentRepliesAPIView(APIView):
+    """
+    The thread under one comment, nested up to NOTES_COMMENT_MAX_DEPTH
+    levels below it; deeper replies are expanded by calling this again
+    for the comment that reports more_replies.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        comment = get_object_or_404(
+            Comment.objects.select_related("user"), pk=pk
+        )
+        visibility.readable_note_or_404(request.user, comment.note_id)
+
+        tree = comment_tree.for_subtree(comment)
+        return Response({
+            "comment": comment.pk,
+            "replies": CommentSerializer(
+                tree.replies(comment),
+                many=True,
+                context={"request": request, "comment_tree": tree},
+            ).data,
+        })
+
+
 class CommentDeleteAPIView(DestroyAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Comment.objects.all()
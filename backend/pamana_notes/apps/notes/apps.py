@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.notes'
\ No newline at end of file
+    name = 'apps.notes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,150 @@
+"""
+Comment trees loaded in one query.
+
+Every Comment stores its top-level comment (`thread`) and `depth`, so a
+note's whole discussion, or a single thread, is one SELECT ordered by
+created_at. The rows are grouped by parent in memory and handed to
+CommentSerializer through its context, so serializing the tree touches
+the database no further.
+
+Replies nested deeper than NOTES_COMMENT_MAX_DEPTH are not inlined; the
+last visible level reports how many descendants were left out in
+`more_replies`. Clients expand those through the replies endpoint,
+which loads one subtree with the cap counted from its root: the visible
+levels under that comment (a prefix match on Comment.path within its
+thread), plus one grouped count of the replies below the last of them.
+
+Note comment listings page through top-level comments only, each with
+an inline reply_count, so a client downloads the threads on screen.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Substr
+
+from .models import Comment
+
+
+def max_depth():
+    return getattr(settings, "NOTES_COMMENT_MAX_DEPTH", 5)
+
+
+class CommentTree:
+    """
+    Comments of one note (or thread) grouped by parent. Depth is capped
+    relative to base_depth, the level the tree is being shown from.
+    """
+
+    def __init__(self, comments, base_depth=0, hidden=None):
+        self.comments = list(comments)
+        self.base_depth = base_depth
+        self.children = defaultdict(list)
+        # Seeded with replies that exist below the loaded rows.
+        self.descendants = defaultdict(int, hidden or {})
+
+        for comment in self.comments:
+            if comment.parent_id is not None:
+                self.children[comment.parent_id].append(comment)
+
+        # Replies are always newer than their parent, so walking the
+        # rows newest-first finishes every subtree before its root.
+        for comment in reversed(self.comments):
+            if comment.parent_id is not None:
+                self.descendants[comment.parent_id] += (
+                    1 + self.descendants[comment.id]
+                )
+
+    def roots(self):
+        return [c for c in self.comments if c.parent_id is None]
+
+    def replies(self, comment):
+        """
+        Direct replies, oldest first, or [] once the depth cap is reached.
+        """
+        if self.is_truncated(comment):
+            return []
+        return self.children.get(comment.id, [])
+
+    def is_truncated(self, comment):
+        return comment.depth - self.base_depth + 1 >= max_depth()
+
+    def more_replies(self, comment):
+        if not self.is_truncated(comment):
+            return 0
+        return self.descendants.get(comment.id, 0)
+
+
+def _rows(queryset):
+    return queryset.select_related("user").order_by("created_at", "id")
+
+
+def for_note(note_id):
+    """
+    Every comment on a note in one query.
+    """
+    return CommentTree(_rows(Comment.objects.filter(note_id=note_id)))
+
+
+def for_subtree(comment):
+    """
+    Tree under an already loaded comment: one query for the levels that
+    are shown, and one more counting the replies under the last of them
+    when it has any rows.
+    """
+    below = Comment.objects.filter(
+        thread_id=comment.thread_id or comment.pk,
+        path__startswith=comment.subtree_path(),
+    )
+    last_level = comment.depth + max(max_depth(), 1) - 1
+    rows = list(_rows(below.filter(depth__lte=last_level)))
+
+    hidden = {}
+    if any(row.depth == last_level for row in rows):
+        # The ancestor at last_level is that segment of each path.
+        width = Comment.PATH_DIGITS + 1
+        counts = (
+            below.filter(depth__gt=last_level)
+            .annotate(
+                ancestor=Substr("path", last_level * width + 1, width - 1)
+            )
+            .order_by()
+            .values_list("ancestor")
+            .annotate(n=Count("id"))
+        )
+        hidden = {int(ancestor): n for ancestor, n in counts}
+
+    return CommentTree(
+        [comment, *rows],
+        base_depth=comment.depth,
+        hidden=hidden,
+    )
+
+
+# ======================================================
+# TOP-LEVEL PAGES
+# ======================================================
+def with_reply_counts(queryset):
+    """
+    Annotates reply_count: every reply in the thread under each
+    top-level comment, counted off the (thread, created_at) index.
+    """
+    replies = (
+        Comment.objects
+        .filter(thread_id=OuterRef("pk"))
+        .order_by()
+        .values("thread_id")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    return queryset.annotate(
+        reply_count=Coalesce(Subquery(replies), 0)
+    )
+
+
+def top_level(note_id):
+    return with_reply_counts(
+        Comment.objects
+        .filter(note_id=note_id, parent__isnull=True)
+        .select_related("user")
+    )
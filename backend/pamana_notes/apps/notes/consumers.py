@@ -1,15 +1,97 @@
+import asyncio
 import json
+import time
+from collections import deque
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from django.utils.timezone import localtime
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from apps.notes.models import Comment, Note
+from apps.notes import comment_tree, review_events, review_queue, visibility
+from apps.notes.models import Comment
 from apps.notes.api.serializers import CommentSerializer
 
 
-class CommentConsumer(AsyncWebsocketConsumer):
+# Events reaching a socket within BATCH_WINDOW seconds go out as one
+# frame. Each frame is awaited until the server has taken it; while a
+# send is slow the window stretches to the time the last one took, so a
+# slow client gets fewer, larger frames. A client whose frame is not
+# taken within SEND_TIMEOUT seconds, or that falls MAX_PENDING events
+# behind, is disconnected (code 4008) and should reload its view over
+# HTTP.
+BATCH_WINDOW = 0.02
+SEND_TIMEOUT = 5
+MAX_PENDING = 200
+CLOSE_TOO_SLOW = 4008
+
+
+class BatchingConsumer(AsyncWebsocketConsumer):
+    """
+    Sends events queued with _enqueue() in BATCH_WINDOW frames.
+    """
+    _outbox = ()
+    _flusher = None
+    _send_seconds = 0.0
+
+    def _start_batching(self):
+        self._outbox = deque()
+        self._pending = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    def _stop_batching(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+
+    def _enqueue(self, payload):
+        if self._flusher is None:
+            return
+
+        if len(self._outbox) >= MAX_PENDING:
+            # Never let one slow socket buffer without bound; the rest of
+            # the group is unaffected.
+            self._outbox.clear()
+            self._stop_batching()
+            asyncio.ensure_future(self.close(code=CLOSE_TOO_SLOW))
+            return
+
+        self._outbox.append(payload)
+        self._pending.set()
+
+    async def _flush_loop(self):
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(max(BATCH_WINDOW, self._send_seconds))
+            self._pending.clear()
+
+            if not self._outbox:
+                continue
+
+            events = list(self._outbox)
+            self._outbox.clear()
+
+            # A lone event keeps the original frame shape.
+            if len(events) == 1:
+                frame = events[0]
+            else:
+                frame = {"event": "batch", "events": events}
+
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(
+                    self.send(text_data=json.dumps(frame)), SEND_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                self._outbox.clear()
+                self._flusher = None
+                await self.close(code=CLOSE_TOO_SLOW)
+                return
+            self._send_seconds = time.monotonic() - started
+
+
+class CommentConsumer(BatchingConsumer):
     async def connect(self):
         self.note_id = self.scope["url_route"]["kwargs"]["note_id"]
         self.group_name = f"note_{self.note_id}"
@@ -18,13 +100,20 @@ class CommentConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        if not await self._can_read_note(self.scope["user"]):
+            await self.close()
+            return
+
         await self.channel_layer.group_add(
             self.group_name,
             self.channel_name
         )
         await self.accept()
+        self._start_batching()
 
     async def disconnect(self, close_code):
+        self._stop_batching()
+
         await self.channel_layer.group_discard(
             self.group_name,
             self.channel_name
@@ -52,9 +141,9 @@ class CommentConsumer(AsyncWebsocketConsumer):
         if user.is_anonymous or not content:
             return
 
-        comment = await self._create_comment(user, content)
-
-        serialized = CommentSerializer(comment).data
+        serialized = await self._create_comment(user, content)
+        if serialized is None:
+            return
 
         await self.channel_layer.group_send(
             self.group_name,
@@ -90,28 +179,53 @@ class CommentConsumer(AsyncWebsocketConsumer):
     # SOCKET EVENTS
     # -------------------------
     async def comment_created(self, event):
-        await self.send(text_data=json.dumps({
+        self._enqueue({
             "event": "created",
             "comment": event["comment"],
-        }))
+        })
 
     async def comment_deleted(self, event):
-        await self.send(text_data=json.dumps({
+        comment_id = event["comment_id"]
+
+        # Created and deleted within the same window: send neither.
+        for queued in self._outbox:
+            if (
+                queued["event"] == "created"
+                and str(queued["comment"]["id"]) == str(comment_id)
+            ):
+                self._outbox.remove(queued)
+                return
+
+        self._enqueue({
             "event": "deleted",
-            "comment_id": event["comment_id"],
-        }))
+            "comment_id": comment_id,
+        })
 
     # -------------------------
     # DATABASE HELPERS
     # -------------------------
+    @database_sync_to_async
+    def _can_read_note(self, user):
+        return visibility.readable(user).filter(pk=self.note_id).exists()
+
     @database_sync_to_async
     def _create_comment(self, user, content):
-        note = Note.objects.get(id=self.note_id)
-        return Comment.objects.create(
-            note=note,
+        """
+        Creates the comment and serializes it in one worker-thread call,
+        so neither the ORM nor DRF runs on the event loop.
+        """
+        if not visibility.readable(user).filter(pk=self.note_id).exists():
+            return None
+
+        comment = Comment.objects.create(
+            note_id=self.note_id,
             user=user,
             content=content,
         )
+        return dict(CommentSerializer(
+            comment,
+            context={"comment_tree": comment_tree.CommentTree([comment])},
+        ).data)
 
     @database_sync_to_async
     def _delete_comment(self, user, comment_id):
@@ -121,3 +235,52 @@ class CommentConsumer(AsyncWebsocketConsumer):
             return True
         except Comment.DoesNotExist:
             return False
+
+
+class ReviewConsumer(BatchingConsumer):
+    """
+    Live moderation queue for admins and moderators: submitted /
+    approved / rejected / removed events for the notes they may review
+    (see apps.notes.review_events).
+    """
+
+    async def connect(self):
+        self.groups_joined = review_events.groups_for_reviewer(
+            self.scope["user"]
+        )
+        if not self.groups_joined:
+            await self.close()
+            return
+
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+        self._start_batching()
+
+    async def disconnect(self, close_code):
+        self._stop_batching()
+
+        for group in getattr(self, "groups_joined", ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive(self, text_data):
+        # Read-only channel; moderation goes through the HTTP API.
+        pass
+
+    async def review_events(self, event):
+        user_id = self.scope["user"].pk
+        now = timezone.now()
+        for payload in event["events"]:
+            # Same lease rule as the pending list: a submission another
+            # reviewer already holds is not this reviewer's to take.
+            note = payload["note"]
+            if payload["event"] == review_events.SUBMITTED and not (
+                review_queue.is_free_for(
+                    user_id,
+                    note.get("review_claimed_by"),
+                    parse_datetime(note.get("review_lease_until") or ""),
+                    now,
+                )
+            ):
+                continue
+            self._enqueue(payload)
@@ -0,0 +1,174 @@
+"""
+Write-behind buffer for hot note counters (downloads).
+
+A download used to be an UPDATE on the note's row, so a popular note
+under load serialized every request on one row lock. add() instead
+counts the increment in memory; a daemon thread writes what has
+accumulated every NOTES_COUNTER_FLUSH_SECONDS, or as soon as
+NOTES_COUNTER_FLUSH_SIZE increments are waiting, with one UPDATE per
+batch of notes (a CASE on the id). Whatever is left is flushed at
+interpreter exit, and a failed flush puts its increments back.
+
+buffered() is what this process has not committed yet, including a
+batch whose flush is still running, so readers show the database value
+plus that (current(), the serializers) without a dip while a flush is
+in progress. Each process
+has its own buffer: other workers' increments appear once they flush,
+and a process that is killed outright loses at most one interval.
+
+NOTES_COUNTER_FLUSH_SECONDS = 0 writes every increment straight through.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Note
+
+
+logger = logging.getLogger(__name__)
+
+BUFFERED_FIELDS = {"downloads"}
+UPDATE_BATCH = 500
+
+_pending = Counter()  # (note_id, field) -> increments not yet written
+_in_flight = Counter()  # taken by a flush that has not committed yet
+_lock = threading.Lock()
+
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def flush_seconds():
+    return getattr(settings, "NOTES_COUNTER_FLUSH_SECONDS", 5)
+
+
+def flush_size():
+    return getattr(settings, "NOTES_COUNTER_FLUSH_SIZE", 1000)
+
+
+# ======================================================
+# INCREMENTS & READS
+# ======================================================
+def add(note_id, field="downloads", n=1):
+    assert field in BUFFERED_FIELDS, field
+    if flush_seconds() <= 0:
+        Note.objects.filter(pk=note_id).update(**{field: F(field) + n})
+        return
+
+    with _lock:
+        _pending[note_id, field] += n
+        waiting = _pending.total()
+    _start()
+    if waiting >= flush_size():
+        _wakeup.set()
+
+
+def buffered(note_id, field="downloads"):
+    key = (note_id, field)
+    with _lock:
+        return _pending.get(key, 0) + _in_flight.get(key, 0)
+
+
+def current(note, field="downloads"):
+    """
+    The counter as readers should see it: stored value + buffered.
+    """
+    return getattr(note, field) + buffered(note.pk, field)
+
+
+# ======================================================
+# FLUSH
+# ======================================================
+def _write(pending):
+    by_field = defaultdict(dict)
+    for (note_id, field), n in pending.items():
+        by_field[field][note_id] = n
+
+    with transaction.atomic():
+        for field, deltas in by_field.items():
+            ids = sorted(deltas)
+            for start in range(0, len(ids), UPDATE_BATCH):
+                batch = ids[start:start + UPDATE_BATCH]
+                delta = Case(
+                    *(When(pk=note_id, then=Value(deltas[note_id]))
+                      for note_id in batch),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                Note.objects.filter(pk__in=batch).update(
+                    **{field: F(field) + delta}
+                )
+
+
+def flush():
+    """
+    Writes every buffered increment. Returns how many were written.
+    """
+    with _lock:
+        pending = _pending.copy()
+        _pending.clear()
+        _in_flight.update(pending)
+    if not pending:
+        return 0
+
+    try:
+        _write(pending)
+    except Exception:
+        with _lock:
+            _in_flight.subtract(pending)
+            _pending.update(pending)
+            _drop_zeros()
+        raise
+    with _lock:
+        _in_flight.subtract(pending)
+        _drop_zeros()
+    return pending.total()
+
+
+def _drop_zeros():
+    for key in [key for key, n in _in_flight.items() if n <= 0]:
+        del _in_flight[key]
+
+
+# ======================================================
+# BACKGROUND WORKER
+# ======================================================
+def _run():
+    while True:
+        _wakeup.wait(flush_seconds())
+        _wakeup.clear()
+        try:
+            close_old_connections()
+            flush()
+        except Exception:
+            logger.exception("Note counter flush failed")
+        finally:
+            close_old_connections()
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        logger.exception("Note counters could not be flushed at exit")
+
+
+def _start():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+
+    with _worker_lock:
+        if _worker is None:
+            atexit.register(_flush_at_exit)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_run, name="note-counters", daemon=True
+            )
+            _worker.start()
@@ -0,0 +1,85 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Note, NoteLike, NoteSave, Comment, Rating
+
+
+RATING_STARS = range(1, 6)
+
+
+# ======================================================
+# ATOMIC INCREMENTS
+# ======================================================
+def bump(note_id, **deltas):
+    """
+    bump(note_id, likes_count=1) -> UPDATE ... SET likes_count = likes_count + 1
+
+    Decrements are clamped at zero so a drifted counter never violates
+    the PositiveIntegerField check.
+    """
+    changes = {}
+    for field, delta in deltas.items():
+        if not delta:
+            continue
+        if delta > 0:
+            changes[field] = F(field) + delta
+        else:
+            changes[field] = Greatest(F(field) - (-delta), 0)
+
+    if changes:
+        Note.objects.filter(pk=note_id).update(**changes)
+
+
+def rating_deltas(old_value, new_value):
+    """
+    Counter deltas for a rating moving from old_value to new_value
+    (None means "no rating").
+    """
+    deltas = {
+        "rating_sum": (new_value or 0) - (old_value or 0),
+        "rating_count": (new_value is not None) - (old_value is not None),
+    }
+    if old_value in RATING_STARS:
+        deltas[f"rating_{old_value}_count"] = -1
+    if new_value in RATING_STARS:
+        key = f"rating_{new_value}_count"
+        deltas[key] = deltas.get(key, 0) + 1
+    return deltas
+
+
+# ======================================================
+# BULK REBUILD
+# ======================================================
+def _per_note(queryset, aggregate):
+    rows = (
+        queryset
+        .filter(note=OuterRef("pk"))
+        .order_by()
+        .values("note")
+        .annotate(total=aggregate)
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def rebuild_counters(queryset=None):
+    """
+    Recomputes every counter from the source tables in one UPDATE.
+    Returns the number of notes touched.
+    """
+    if queryset is None:
+        queryset = Note.objects.all()
+
+    values = {
+        "likes_count": _per_note(NoteLike.objects.all(), Count("pk")),
+        "saves_count": _per_note(NoteSave.objects.all(), Count("pk")),
+        "comments_count": _per_note(Comment.objects.all(), Count("pk")),
+        "rating_sum": _per_note(Rating.objects.all(), Sum("value")),
+        "rating_count": _per_note(Rating.objects.all(), Count("pk")),
+    }
+    for star in RATING_STARS:
+        values[f"rating_{star}_count"] = _per_note(
+            Rating.objects.filter(value=star), Count("pk")
+        )
+
+    return queryset.update(**values)
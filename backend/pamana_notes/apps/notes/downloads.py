@@ -0,0 +1,159 @@
+"""
+Note file downloads with HTTP Range, strong ETags and optional
+X-Accel-Redirect / X-Sendfile hand-off.
+
+NOTES_DOWNLOAD_ACCEL = ""          serve the bytes from Django
+                     = "nginx"     X-Accel-Redirect: NOTES_ACCEL_PREFIX + name
+                     = "sendfile"  X-Sendfile: absolute path (Apache/lighttpd)
+"""
+import mimetypes
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.encoding import escape_uri_path
+from django.utils.http import content_disposition_header
+
+from . import counter_buffer, storage
+
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag(note):
+    digest = storage.blob_sha256(note.file.name) or note.file_sha256
+    return f'"{digest}"' if digest else None
+
+
+def _etag_matches(header, etag):
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single "bytes=" range, None to serve the
+    whole file, or False if the range cannot be satisfied.
+    """
+    if not header:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        # Multiple or malformed ranges: the full body is a valid answer.
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        # No byte of an empty file can be addressed.
+        return False
+
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _read_range(fh, start, end):
+    try:
+        fh.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+def _count_download(note):
+    counter_buffer.add(note.pk, "downloads")
+
+
+def _accel_response(note, mode):
+    response = HttpResponse()
+    if mode == "nginx":
+        prefix = getattr(settings, "NOTES_ACCEL_PREFIX", "/protected-media/")
+        response["X-Accel-Redirect"] = escape_uri_path(prefix + note.file.name)
+    else:
+        response["X-Sendfile"] = note.file.path
+    # Let the proxy pick the type from the real file.
+    del response["Content-Type"]
+    return response
+
+
+def serve_note_file(request, note):
+    """
+    Response for downloading note.file. Counts one download per full
+    fetch or per resumed fetch starting at byte 0; 304s and later range
+    chunks are not counted.
+    """
+    filename = note.file_name or note.file.name.rsplit("/", 1)[-1]
+    etag = _etag(note)
+
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        response = HttpResponse(status=304)
+        response["ETag"] = etag
+        return response
+
+    mode = getattr(settings, "NOTES_DOWNLOAD_ACCEL", "")
+    if mode in ("nginx", "sendfile"):
+        _count_download(note)
+        response = _accel_response(note, mode)
+
+    else:
+        size = note.file.size
+        byte_range = parse_range(request.headers.get("Range"), size)
+
+        # If-Range: only honour the range while the client's copy is current.
+        if_range = request.headers.get("If-Range")
+        if byte_range and if_range and if_range.strip() != etag:
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        if byte_range is None:
+            _count_download(note)
+            response = FileResponse(note.file.open("rb"))
+        else:
+            start, end = byte_range
+            if start == 0:
+                _count_download(note)
+            response = StreamingHttpResponse(
+                _read_range(note.file.open("rb"), start, end),
+                status=206,
+            )
+            response["Content-Length"] = str(end - start + 1)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Type"] = (
+                mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            )
+
+        response["Accept-Ranges"] = "bytes"
+
+    response["Content-Disposition"] = content_disposition_header(
+        as_attachment=True, filename=filename
+    )
+    if etag:
+        response["ETag"] = etag
+        # Blob contents never change under the same hash.
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
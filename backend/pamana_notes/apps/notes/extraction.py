@@ -0,0 +1,297 @@
+"""
+Background text extraction for uploaded note files.
+
+Views call schedule(note) after saving a new file. The work runs on a
+small thread pool once the transaction commits: the file hash is read
+from its blob path (or computed in chunks for legacy files), identical
+bytes reuse an earlier result, and anything new is parsed for text and
+a page/slide count. Notes that do not fit in the pool stay "pending"
+and are picked up by `manage.py extract_notes`.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree.ElementTree import iterparse
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import search, storage
+from .models import Note
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # in requirements.txt; without it PDFs only get a page count
+    PdfReader = None
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+MAX_TEXT_CHARS = 200_000
+
+WORKERS = getattr(settings, "NOTES_EXTRACTION_WORKERS", 2)
+MAX_PENDING = getattr(settings, "NOTES_EXTRACTION_QUEUE", 32)
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+EP_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
+SLIDE_RE = re.compile(r"^ppt/slides/slide(\d+)\.xml$")
+PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+_warned_no_pdf_parser = False
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+
+# ======================================================
+# HASHING
+# ======================================================
+def file_sha256(field_file):
+    digest = hashlib.sha256()
+    with field_file.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ======================================================
+# EXTRACTORS
+# ======================================================
+class _TextBuffer:
+    """
+    Collects text fragments up to MAX_TEXT_CHARS.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def add(self, text):
+        if not text or self.full:
+            return
+        text = text[:MAX_TEXT_CHARS - self.size]
+        self.parts.append(text)
+        self.size += len(text)
+
+    def newline(self):
+        if self.parts and not self.full:
+            self.parts.append("\n")
+            self.size += 1
+
+    @property
+    def full(self):
+        return self.size >= MAX_TEXT_CHARS
+
+    def value(self):
+        return "".join(self.parts).strip()
+
+
+def _xml_text(stream, text_tag, block_tag, buffer):
+    for _, elem in iterparse(stream, events=("end",)):
+        if elem.tag == text_tag:
+            buffer.add(elem.text)
+            if buffer.full:
+                break
+        elif elem.tag == block_tag:
+            buffer.newline()
+            elem.clear()
+
+
+def extract_docx(fh):
+    buffer = _TextBuffer()
+    pages = None
+
+    with zipfile.ZipFile(fh) as archive:
+        with archive.open("word/document.xml") as stream:
+            _xml_text(stream, f"{W_NS}t", f"{W_NS}p", buffer)
+
+        if "docProps/app.xml" in archive.namelist():
+            with archive.open("docProps/app.xml") as stream:
+                for _, elem in iterparse(stream):
+                    if elem.tag == f"{EP_NS}Pages" and elem.text:
+                        pages = int(elem.text)
+
+    return buffer.value(), pages
+
+
+def extract_pptx(fh):
+    buffer = _TextBuffer()
+
+    with zipfile.ZipFile(fh) as archive:
+        slides = sorted(
+            (int(match.group(1)), name)
+            for name in archive.namelist()
+            if (match := SLIDE_RE.match(name))
+        )
+        for _, name in slides:
+            if buffer.full:
+                break
+            with archive.open(name) as stream:
+                _xml_text(stream, f"{A_NS}t", f"{A_NS}p", buffer)
+            buffer.newline()
+
+    return buffer.value(), len(slides)
+
+
+def extract_pdf(fh):
+    if PdfReader is not None:
+        reader = PdfReader(fh)
+        buffer = _TextBuffer()
+        for page in reader.pages:
+            if buffer.full:
+                break
+            buffer.add(page.extract_text() or "")
+            buffer.newline()
+        return buffer.value(), len(reader.pages)
+
+    global _warned_no_pdf_parser
+    if not _warned_no_pdf_parser:
+        _warned_no_pdf_parser = True
+        logger.warning(
+            "pypdf is not installed: PDF notes get a page count but no "
+            "text, so search cannot find them by content."
+        )
+
+    # No parser installed: count page objects, keeping a small overlap
+    # so a marker split across chunks is not missed.
+    pages, tail = 0, b""
+    for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+        window = tail + chunk
+        pages += len(PDF_PAGE_RE.findall(window))
+        tail = window[-16:]
+        pages -= len(PDF_PAGE_RE.findall(tail))
+    pages += len(PDF_PAGE_RE.findall(tail))
+    return "", pages or None
+
+
+EXTRACTORS = {
+    ".docx": extract_docx,
+    ".pptx": extract_pptx,
+    ".pdf": extract_pdf,
+}
+
+
+def extract(field_file):
+    """
+    Returns (text, page_count) for a stored note file.
+    """
+    ext = os.path.splitext(field_file.name)[1].lower()
+    extractor = EXTRACTORS.get(ext)
+    if extractor is None:
+        return "", None
+
+    with field_file.open("rb") as fh:
+        return extractor(fh)
+
+
+# ======================================================
+# PIPELINE
+# ======================================================
+def process(note_id):
+    """
+    Runs extraction for one note. Safe to call repeatedly.
+    """
+    note = Note.objects.filter(pk=note_id, is_deleted=False).first()
+    if note is None or not note.file:
+        Note.objects.filter(pk=note_id).update(
+            extraction_status=Note.EXTRACTION_NONE
+        )
+        return
+
+    digest = storage.blob_sha256(note.file.name) or file_sha256(note.file)
+
+    # Same bytes as the last successful run: nothing to do.
+    if digest == note.file_sha256 and note.extracted_at is not None:
+        Note.objects.filter(pk=note.pk).update(
+            extraction_status=Note.EXTRACTION_DONE
+        )
+        return
+
+    previous = (
+        Note.objects
+        .filter(file_sha256=digest, extracted_at__isnull=False)
+        .exclude(pk=note.pk)
+        .values("extracted_text", "page_count")
+        .first()
+    )
+
+    if previous is not None:
+        text, pages = previous["extracted_text"], previous["page_count"]
+    else:
+        try:
+            text, pages = extract(note.file)
+        except Exception:
+            logger.exception("Text extraction failed for note %s", note.pk)
+            Note.objects.filter(pk=note.pk).update(
+                file_sha256=digest,
+                extracted_at=None,
+                extraction_status=Note.EXTRACTION_FAILED,
+            )
+            return
+
+    Note.objects.filter(pk=note.pk).update(
+        file_sha256=digest,
+        extracted_text=text,
+        page_count=pages,
+        extracted_at=timezone.now(),
+        extraction_status=Note.EXTRACTION_DONE,
+    )
+
+    note.extracted_text = text
+    search.index_note(note)
+
+
+def _run(note_id):
+    try:
+        close_old_connections()
+        process(note_id)
+    except Exception:
+        logger.exception("Extraction worker crashed on note %s", note_id)
+    finally:
+        close_old_connections()
+        _slots.release()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=WORKERS,
+                thread_name_prefix="note-extract",
+            )
+        return _executor
+
+
+def _submit(note_id):
+    if WORKERS <= 0:
+        process(note_id)
+        return
+
+    # Never queue more than MAX_PENDING jobs; the rest stay pending
+    # for the management command.
+    if not _slots.acquire(blocking=False):
+        logger.warning("Extraction queue full; note %s left pending", note_id)
+        return
+
+    _get_executor().submit(_run, note_id)
+
+
+def schedule(note):
+    """
+    Marks note pending and queues it once the current transaction commits.
+    """
+    status = Note.EXTRACTION_PENDING if note.file else Note.EXTRACTION_NONE
+    Note.objects.filter(pk=note.pk).update(extraction_status=status)
+    note.extraction_status = status
+
+    if note.file:
+        transaction.on_commit(lambda: _submit(note.pk))
@@ -0,0 +1,114 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.accounts.models import CustomUser
+from apps.core.parsers import FastJSONParser, MessagePackParser
+from apps.core.renderers import FastJSONRenderer, MessagePackRenderer
+from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.models import Note
+from apps.subjects.models import Course, Subject
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time DRF's JSONRenderer/JSONParser against the orjson and "
+        "MessagePack ones on real AdminNoteSerializer output. The notes "
+        "are generated in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5,
+            help="Runs per measurement; the best time is reported.",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["sizes"]) < 1 or options["repeat"] < 1:
+            raise CommandError("--sizes and --repeat must be positive.")
+
+        formats = [
+            ("drf json", JSONRenderer(), JSONParser()),
+            ("orjson", FastJSONRenderer(), FastJSONParser()),
+        ]
+        if MessagePackRenderer.available:
+            formats.append(
+                ("msgpack", MessagePackRenderer(), MessagePackParser())
+            )
+        else:
+            self.stdout.write("msgpack is not installed; skipping it.")
+
+        try:
+            with transaction.atomic():
+                self._run(sorted(options["sizes"]), options["repeat"], formats)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, sizes, repeat, formats):
+        course = Course.objects.create(name="Bench course")
+        subject = Subject.objects.create(name="Bench subject", course=course)
+        uploader = CustomUser.objects.create_user(
+            "BENCH-0001", "bench@example.com", None,
+            first_name="Bench", last_name="User", course=course,
+        )
+
+        self.stdout.write(
+            f"{'notes':>7}  {'format':<9}{'render':>11}{'parse':>11}{'bytes':>12}"
+        )
+        created = 0
+        for size in sizes:
+            Note.objects.bulk_create(
+                [
+                    Note(
+                        title=f"Bench note {i} — Ünïcode",
+                        description="Generated for bench_json_renderer. " * 4,
+                        uploader=uploader,
+                        subject=subject,
+                        is_approved=True,
+                        likes_count=i % 17,
+                        downloads=i % 101,
+                    )
+                    for i in range(created, size)
+                ],
+                batch_size=2000,
+            )
+            created = size
+            data = AdminNoteSerializer(
+                Note.objects.filter(subject=subject)
+                .select_related("uploader", "subject"),
+                many=True,
+                context={"saved_note_ids": set()},
+            ).data
+
+            for name, renderer, parser in formats:
+                render, body = self._best(
+                    repeat, lambda: renderer.render(data)
+                )
+                parse, _ = self._best(
+                    repeat, lambda: parser.parse(io.BytesIO(body))
+                )
+                self.stdout.write(
+                    f"{size:>7}  {name:<9}{render * 1000:>8.2f} ms"
+                    f"{parse * 1000:>8.2f} ms{len(body):>12,}"
+                )
+
+    def _best(self, repeat, run):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,108 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.models import CustomUser
+from apps.notes.api.note_rows import NoteRowSerializer
+from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.models import Note
+from apps.subjects.models import Course, Subject
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare AdminNoteSerializer with the NoteRowSerializer fast path "
+        "on generated notes (query + serialization). Everything runs in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3,
+            help="Runs per size; the best time is reported.",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["sizes"]) < 1 or options["repeat"] < 1:
+            raise CommandError("--sizes and --repeat must be positive.")
+
+        try:
+            with transaction.atomic():
+                self._run(sorted(options["sizes"]), options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _run(self, sizes, repeat):
+        course = Course.objects.create(name="Bench course")
+        subject = Subject.objects.create(name="Bench subject", course=course)
+        uploader = CustomUser.objects.create_user(
+            "BENCH-0001", "bench@example.com", None,
+            first_name="Bench", last_name="User", course=course,
+        )
+
+        raw = APIRequestFactory().get("/api/notes/")
+        raw.user = AnonymousUser()
+        request = Request(raw)
+        context = {"request": request, "saved_note_ids": set()}
+
+        self.stdout.write(
+            f"{'rows':>8}  {'serializer':>12}  {'fast path':>12}  speedup"
+        )
+        created = 0
+        for size in sizes:
+            Note.objects.bulk_create(
+                [
+                    Note(
+                        title=f"Bench note {i}",
+                        description="Generated for bench_note_serializer.",
+                        uploader=uploader,
+                        subject=subject,
+                        is_approved=i % 3 != 0,
+                        is_rejected=i % 3 == 1,
+                        likes_count=i % 17,
+                        downloads=i % 101,
+                    )
+                    for i in range(created, size)
+                ],
+                batch_size=2000,
+            )
+            created = size
+            notes = Note.objects.filter(subject=subject).order_by("-id")
+
+            slow, slow_body = self._best(repeat, lambda: AdminNoteSerializer(
+                notes.select_related("uploader", "subject"),
+                many=True,
+                context=context,
+            ).data)
+            fast, fast_body = self._best(repeat, lambda: NoteRowSerializer(
+                notes, many=True, context=context,
+            ).data)
+
+            if slow_body != fast_body:
+                raise CommandError(f"Payloads differ at {size} rows.")
+            self.stdout.write(
+                f"{size:>8}  {slow * 1000:>9.1f} ms  {fast * 1000:>9.1f} ms"
+                f"  {slow / fast:>6.1f}x"
+            )
+
+    def _best(self, repeat, serialize):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = serialize()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, JSONRenderer().render(data)
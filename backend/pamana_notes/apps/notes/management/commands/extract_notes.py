@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.notes.extraction import process
+from apps.notes.models import Note
+
+
+class Command(BaseCommand):
+    help = "Extract text from note files that are still pending."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--failed",
+            action="store_true",
+            help="Also retry notes whose extraction failed.",
+        )
+
+    def handle(self, *args, failed=False, **options):
+        statuses = [Note.EXTRACTION_PENDING]
+        if failed:
+            statuses.append(Note.EXTRACTION_FAILED)
+
+        note_ids = list(
+            Note.objects
+            .filter(extraction_status__in=statuses, is_deleted=False)
+            .values_list("pk", flat=True)
+        )
+
+        for note_id in note_ids:
+            process(note_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {len(note_ids)} note(s).")
+        )
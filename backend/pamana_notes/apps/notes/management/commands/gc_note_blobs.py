@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.notes.storage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Delete stored note files that no note references anymore."
+
+    def handle(self, *args, **options):
+        removed = collect_garbage()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} blob(s)."))
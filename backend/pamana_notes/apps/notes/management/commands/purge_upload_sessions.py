@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.notes.resumable import purge
+
+
+class Command(BaseCommand):
+    help = "Delete expired resumable uploads and their part files."
+
+    def handle(self, *args, **options):
+        removed = purge()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} part file(s)."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.notes.counters import rebuild_counters
+from apps.notes.models import Note
+
+
+class Command(BaseCommand):
+    help = "Recompute likes/saves/comments/rating counters on Note."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--note",
+            type=int,
+            action="append",
+            dest="note_ids",
+            help="Only rebuild these note ids (repeatable).",
+        )
+
+    def handle(self, *args, note_ids=None, **options):
+        queryset = Note.objects.all()
+        if note_ids:
+            queryset = queryset.filter(pk__in=note_ids)
+
+        updated = rebuild_counters(queryset)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt counters for {updated} note(s).")
+        )
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.notes.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily rollups behind the admin dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Only rebuild the last N days (default: all history).",
+        )
+
+    def handle(self, *args, days=None, **options):
+        since = None
+        if days:
+            since = timezone.localdate() - timedelta(days=days - 1)
+
+        written = rebuild(since)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {written} daily rollup row(s).")
+        )
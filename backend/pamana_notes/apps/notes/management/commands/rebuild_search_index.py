@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.notes import search
+from apps.notes.models import Note
+
+
+class Command(BaseCommand):
+    help = "Rebuild the notes full-text search index."
+
+    def handle(self, *args, **options):
+        if search.backend() is None:
+            self.stdout.write(
+                f"No search index for {connection.vendor}; "
+                "searches use icontains."
+            )
+            return
+
+        search.create_index(connection)
+        indexed = search.rebuild_index(Note.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} note(s)."))
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:28
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Note = apps.get_model("notes", "Note")
+
+    def per_note(model_name, aggregate, **filters):
+        rows = (
+            apps.get_model("notes", model_name).objects
+            .filter(note=OuterRef("pk"), **filters)
+            .order_by()
+            .values("note")
+            .annotate(total=aggregate)
+            .values("total")
+        )
+        return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+    values = {
+        "likes_count": per_note("NoteLike", Count("pk")),
+        "saves_count": per_note("NoteSave", Count("pk")),
+        "comments_count": per_note("Comment", Count("pk")),
+        "rating_sum": per_note("Rating", Sum("value")),
+        "rating_count": per_note("Rating", Count("pk")),
+    }
+    for star in range(1, 6):
+        values[f"rating_{star}_count"] = per_note(
+            "Rating", Count("pk"), value=star
+        )
+
+    Note.objects.update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0013_note_downloads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='saves_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from apps.notes import search
+
+
+def create_search_index(apps, schema_editor):
+    search.create_index(schema_editor.connection)
+    search.rebuild_index(apps.get_model("notes", "Note").objects.all())
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0014_note_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
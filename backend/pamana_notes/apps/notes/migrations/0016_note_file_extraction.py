@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0015_notes_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='extracted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='extracted_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='extraction_status',
+            field=models.CharField(choices=[('none', 'No file'), ('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='file_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:32
+
+import apps.notes.models
+import apps.notes.storage
+import os
+
+from django.db import migrations, models
+
+
+def backfill_file_names(apps, schema_editor):
+    Note = apps.get_model("notes", "Note")
+    for note in Note.objects.exclude(file="").exclude(file__isnull=True):
+        note.file_name = os.path.basename(note.file.name)
+        note.save(update_fields=["file_name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0016_note_file_extraction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='file_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=apps.notes.storage.note_file_storage, upload_to='files/', validators=[apps.notes.models.validate_file_type]),
+        ),
+        migrations.RunPython(backfill_file_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    Note = apps.get_model("notes", "Note")
+    NoteDailyStat = apps.get_model("notes", "NoteDailyStat")
+
+    rows = (
+        Note.objects
+        .annotate(day=TruncDate("uploaded_at"))
+        .values("day", "subject_id", "is_deleted", "is_approved", "is_rejected")
+        .annotate(notes=Count("id"))
+        .order_by()
+    )
+    NoteDailyStat.objects.bulk_create(
+        [NoteDailyStat(**row) for row in rows if row["day"] is not None],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0017_content_addressed_files'),
+        ('subjects', '0006_mark_general_subjects'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('is_approved', models.BooleanField(default=False)),
+                ('is_rejected', models.BooleanField(default=False)),
+                ('notes', models.IntegerField(default=0)),
+                ('subject', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='subjects.subject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='notes_noted_day_0a0220_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0018_note_daily_stats'),
+        ('subjects', '0006_mark_general_subjects'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='uploader',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='uploaded_notes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['is_deleted', 'is_approved', 'visibility', '-uploaded_at'], name='note_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['uploader', 'is_deleted', '-uploaded_at'], name='note_uploader_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_approved', True), ('is_deleted', False)), fields=['visibility', '-uploaded_at'], name='note_live_visibility_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_approved', True), ('is_deleted', False)), fields=['-uploaded_at', '-id'], name='note_live_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['uploader', '-uploaded_at'], name='note_live_uploader_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(condition=models.Q(('is_approved', False), ('is_deleted', False), ('is_rejected', False)), fields=['-uploaded_at'], name='note_live_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_threads(apps, schema_editor):
+    Comment = apps.get_model("notes", "Comment")
+
+    parents = dict(Comment.objects.values_list("id", "parent_id"))
+    placed = {}
+
+    def place(comment_id):
+        # Walk up to the top-level comment, memoizing along the way.
+        chain = []
+        while comment_id not in placed:
+            parent_id = parents.get(comment_id)
+            if parent_id is None:
+                placed[comment_id] = (None, 0)
+                break
+            chain.append(comment_id)
+            comment_id = parent_id
+        for child_id in reversed(chain):
+            parent_id = parents[child_id]
+            thread_id, depth = placed[parent_id]
+            placed[child_id] = (thread_id or parent_id, depth + 1)
+        return placed[chain[0]] if chain else placed[comment_id]
+
+    updates = []
+    for comment_id in parents:
+        thread_id, depth = place(comment_id)
+        if depth:
+            updates.append(Comment(id=comment_id, thread_id=thread_id, depth=depth))
+    Comment.objects.bulk_update(updates, ["thread", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0019_note_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_comments', to='notes.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['note', 'created_at'], name='notes_comme_note_id_16c8b4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread', 'created_at'], name='notes_comme_thread__870334_idx'),
+        ),
+        migrations.RunPython(backfill_threads, migrations.RunPython.noop),
+    ]
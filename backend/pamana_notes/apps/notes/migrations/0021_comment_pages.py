@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0020_comment_threads'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='notes.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['note', 'parent', '-created_at', '-id'], name='comment_top_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent', 'created_at'], name='comment_parent_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0021_comment_pages'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='review_claimed_by',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='review_lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0023_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileblob',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
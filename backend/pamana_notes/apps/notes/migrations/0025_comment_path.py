@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+PATH_DIGITS = 10
+
+
+def backfill_paths(apps, schema_editor):
+    Comment = apps.get_model("notes", "Comment")
+
+    parents = dict(
+        Comment.objects.filter(parent__isnull=False)
+        .values_list("id", "parent_id")
+    )
+    paths = {}
+
+    def path_of(comment_id):
+        # Walk up to a top-level (or already placed) comment, memoizing
+        # along the way.
+        chain = []
+        ancestor = comment_id
+        while ancestor in parents and ancestor not in paths:
+            chain.append(ancestor)
+            ancestor = parents[ancestor]
+        prefix = paths.get(ancestor, "")
+        for child_id in reversed(chain):
+            prefix = paths[child_id] = (
+                f"{prefix}{parents[child_id]:0{PATH_DIGITS}d}/"
+            )
+        return paths[comment_id]
+
+    updates = [
+        Comment(id=comment_id, path=path_of(comment_id))
+        for comment_id in parents
+    ]
+    Comment.objects.bulk_update(updates, ["path"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0024_file_blob_last_used'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
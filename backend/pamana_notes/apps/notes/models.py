@@ -1,8 +1,15 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db.models import Avg
+from django.utils import timezone
+import hashlib
 import os
+import uuid
+
+from .storage import note_file_storage
+
+
+EMPTY_SHA256 = hashlib.sha256().hexdigest()
 
 
 # --------------------
@@ -30,21 +37,60 @@ class Note(models.Model):
         (VISIBILITY_SCHOOL, "School"),
         (VISIBILITY_COURSE, "Course Only"),
     ]
+
+    EXTRACTION_NONE = "none"
+    EXTRACTION_PENDING = "pending"
+    EXTRACTION_DONE = "done"
+    EXTRACTION_FAILED = "failed"
+
+    EXTRACTION_CHOICES = [
+        (EXTRACTION_NONE, "No file"),
+        (EXTRACTION_PENDING, "Pending"),
+        (EXTRACTION_DONE, "Done"),
+        (EXTRACTION_FAILED, "Failed"),
+    ]
     downloads = models.PositiveIntegerField(default=0)
+
+    # Engagement counters (maintained by apps.notes.counters)
+    likes_count = models.PositiveIntegerField(default=0)
+    saves_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
     title = models.CharField(max_length=255)
     description = models.TextField()
     content = models.TextField(blank=True)
     file = models.FileField(
         upload_to="files/",
+        storage=note_file_storage,
         blank=True,
         null=True,
         validators=[validate_file_type],
     )
+    file_name = models.CharField(max_length=255, blank=True)
+
+    # File text extraction (see apps.notes.extraction)
+    file_sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    extracted_text = models.TextField(blank=True)
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    extraction_status = models.CharField(
+        max_length=10,
+        choices=EXTRACTION_CHOICES,
+        default=EXTRACTION_NONE,
+    )
+    extracted_at = models.DateTimeField(null=True, blank=True)
 
     uploader = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name="uploaded_notes",
+        db_index=False,
     )
 
     subject = models.ForeignKey(
@@ -66,27 +112,167 @@ class Note(models.Model):
     rejection_reason = models.TextField(blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Review lease (see apps.notes.review_queue): a pending note claimed
+    # by a reviewer stays out of other reviewers' queues until the lease
+    # runs out or the note is moderated.
+    review_claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        db_index=False,
+    )
+    review_lease_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Indexes for the hot listings; apps/notes/tests.py checks their
+        # query plans. Django renders boolean filters as bare columns
+        # ("NOT is_deleted"), which SQLite cannot match against a
+        # composite prefix, so the live-row listings also get partial
+        # indexes whose condition matches the query exactly.
+        indexes = [
+            models.Index(
+                fields=["is_deleted", "is_approved", "visibility", "-uploaded_at"],
+                name="note_listing_idx",
+            ),
+            # Also serves the uploader FK (db_index=False on the field).
+            models.Index(
+                fields=["uploader", "is_deleted", "-uploaded_at"],
+                name="note_uploader_idx",
+            ),
+            # Public list
+            models.Index(
+                fields=["visibility", "-uploaded_at"],
+                name="note_live_visibility_idx",
+                condition=models.Q(is_deleted=False, is_approved=True),
+            ),
+            # Keyset feed pages (uploaded_at, id)
+            models.Index(
+                fields=["-uploaded_at", "-id"],
+                name="note_live_approved_idx",
+                condition=models.Q(is_deleted=False, is_approved=True),
+            ),
+            # My notes / per-user counts
+            models.Index(
+                fields=["uploader", "-uploaded_at"],
+                name="note_live_uploader_idx",
+                condition=models.Q(is_deleted=False),
+            ),
+            # Moderation queue
+            models.Index(
+                fields=["-uploaded_at"],
+                name="note_live_pending_idx",
+                condition=models.Q(
+                    is_deleted=False, is_approved=False, is_rejected=False
+                ),
+            ),
+        ]
+
+    # Moved only by atomic UPDATEs (counters.py, counter_buffer.py).
+    COUNTER_FIELDS = frozenset({
+        "downloads",
+        "likes_count",
+        "saves_count",
+        "comments_count",
+        "rating_sum",
+        "rating_count",
+        "rating_1_count",
+        "rating_2_count",
+        "rating_3_count",
+        "rating_4_count",
+        "rating_5_count",
+    })
+
     def __str__(self):
         return f"{self.title} — {self.uploader.school_id}"
 
+    def save(self, *args, **kwargs):
+        # Saving a loaded note must not write back its copies of the
+        # counters over increments made since it was read. Callers that
+        # name update_fields get exactly those.
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def average_rating(self):
-        return self.ratings.aggregate(avg=Avg("value"))["avg"] or 0
+        if not self.rating_count:
+            return 0
+        return self.rating_sum / self.rating_count
+
+    def rating_breakdown(self):
+        """
+        {star: count} for 1–5, read from the stored counters.
+        """
+        return {
+            star: getattr(self, f"rating_{star}_count")
+            for star in range(1, 6)
+        }
 
     def can_view(self, user):
-        if self.is_deleted:
-            return False
+        from .visibility import can_read
+
+        return can_read(user, self)
+
+
+# --------------------
+# File Blob (content-addressed storage)
+# --------------------
+class FileBlob(models.Model):
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set whenever an upload reuses the blob; GC leaves it alone for a
+    # grace period afterwards (see storage.collect_garbage).
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
 
-        if self.is_approved:
-            if self.visibility == self.VISIBILITY_PUBLIC:
-                return True
-            if not user.is_authenticated:
-                return False
-            return user == self.uploader or user.is_staff
 
-        if not user.is_authenticated:
-            return False
+# --------------------
+# Daily Note Stats (admin dashboard rollup)
+# --------------------
+class NoteDailyStat(models.Model):
+    """
+    Number of notes uploaded on `day` for one subject and moderation
+    state. Kept current by the Note signals (see stats.py); rows are only
+    ever summed, so duplicates of a key are harmless.
+    """
+
+    day = models.DateField()
+    # No FK constraint: notes cascade away with their subject and
+    # decrement these rows on the way out.
+    subject = models.ForeignKey(
+        "subjects.Subject",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name="+",
+    )
+    is_deleted = models.BooleanField(default=False)
+    is_approved = models.BooleanField(default=False)
+    is_rejected = models.BooleanField(default=False)
+    notes = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
 
-        return user == self.uploader or user.is_staff
+    def __str__(self):
+        return f"{self.day} subject={self.subject_id}: {self.notes}"
 
 
 # --------------------
@@ -159,14 +345,52 @@ class Comment(models.Model):
         blank=True,
         on_delete=models.CASCADE,
         related_name="replies",
+        db_index=False,  # covered by comment_parent_idx
     )
+    # Top-level comment of the thread (None for top-level comments) and
+    # nesting level, set from the parent on save so a whole tree can be
+    # fetched in one query (see apps/notes/comment_tree.py).
+    thread = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.CASCADE,
+        related_name="thread_comments",
+    )
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    # Ids of the ancestors, top-level first, as fixed-width segments, so
+    # one subtree of a thread is a prefix match (see subtree_path()).
+    path = models.TextField(default="", blank=True, editable=False)
+
+    PATH_DIGITS = 10
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["note", "created_at"]),
+            models.Index(fields=["thread", "created_at"]),
+            # Top-level comment pages (keyset on created_at, id) and
+            # direct replies of a comment.
+            models.Index(
+                fields=["note", "parent", "-created_at", "-id"],
+                name="comment_top_level_idx",
+            ),
+            models.Index(
+                fields=["parent", "created_at"],
+                name="comment_parent_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.school_id} on {self.note.title}"
 
+    def subtree_path(self):
+        """
+        The path every reply under this comment starts with.
+        """
+        return f"{self.path}{self.pk:0{self.PATH_DIGITS}d}/"
+
 
 # --------------------
 # Comment Report Model
@@ -248,3 +472,33 @@ class NoteSave(models.Model):
 
     class Meta:
         unique_together = ("note", "user")
+
+
+# --------------------
+# Resumable Uploads
+# --------------------
+class UploadSession(models.Model):
+    """
+    A file being uploaded in chunks (see apps.notes.resumable). The
+    bytes so far live in a part file; offset and sha256 describe them.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Optional digest of the whole file, checked on finalize.
+    expected_sha256 = models.CharField(max_length=64, blank=True)
+
+    offset = models.PositiveBigIntegerField(default=0)
+    # SHA-256 of the first `offset` bytes.
+    sha256 = models.CharField(max_length=64, default=EMPTY_SHA256)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
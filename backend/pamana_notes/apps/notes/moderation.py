@@ -0,0 +1,189 @@
+"""
+Approving and rejecting notes in bulk.
+
+moderate() applies one decision to a batch of notes: one UPDATE scoped
+to what the reviewer may moderate, one bulk_create for the NoteAction
+timeline, one batch of uploader emails queued in the outbox and one
+live review message per reviewer group. The UPDATE bypasses
+Note.save(), so the dashboard rollups, per-user counts, review events
+and public catalogue invalidation the signals would have produced are
+handled here in bulk.
+
+The per-note API endpoints, the bulk endpoint and the NoteAdmin actions
+all go through it.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core import outbox, response_cache
+
+from . import review_events, stats, visibility
+from .models import Note, NoteAction
+
+
+APPROVE = "approve"
+REJECT = "reject"
+
+# Per-note results
+APPROVED = "approved"
+REJECTED = "rejected"
+UNCHANGED = "unchanged"
+LEASED = "leased"
+NOT_FOUND = "not_found"
+
+DEFAULT_REASON = "Rejected by reviewer"
+MAX_BATCH = 500
+
+STATES = {
+    APPROVE: {"is_approved": True, "is_rejected": False},
+    REJECT: {"is_approved": False, "is_rejected": True},
+}
+ACTIONS = {APPROVE: APPROVED, REJECT: REJECTED}
+
+ROW_FIELDS = (
+    "id",
+    "title",
+    "rejection_reason",
+    "uploader_id",
+    "uploader__email",
+    "uploader__school_id",
+    "uploaded_at",
+    "visibility",
+    "subject__course_id",
+    "subject__is_general",
+    *stats.STATE_FIELDS,
+)
+LEASE_FIELDS = ("review_claimed_by", "review_lease_until")
+
+
+def moderate(user, note_ids, decision, reason=None):
+    """
+    Applies decision (APPROVE or REJECT) to the notes in note_ids that
+    `user` may moderate.
+
+    reason replaces the rejection reason of rejected notes; None keeps
+    each note's current one. Returns {note_id: result}, with result one
+    of APPROVED / REJECTED, UNCHANGED (already in that state), LEASED
+    (another reviewer holds a live review lease on it, see
+    review_queue) or NOT_FOUND (missing, deleted or outside the
+    reviewer's scope).
+    """
+    state = STATES[decision]
+    ids = list(dict.fromkeys(note_ids))
+    results = dict.fromkeys(ids, NOT_FOUND)
+    if not ids:
+        return results
+
+    with transaction.atomic():
+        rows = list(
+            visibility.reviewable(user)
+            .filter(pk__in=ids)
+            .select_for_update(of=("self",))
+            .values(*ROW_FIELDS, *LEASE_FIELDS)
+        )
+        now = timezone.now()
+        changed = []
+        for row in rows:
+            if all(row[field] == value for field, value in state.items()):
+                results[row["id"]] = UNCHANGED
+            elif _leased_to_other(row, user, now):
+                results[row["id"]] = LEASED
+            else:
+                changed.append(row)
+        if not changed:
+            return results
+
+        previous = {
+            row["id"]: {field: row[field] for field in state}
+            for row in changed
+        }
+
+        # Deciding a note also ends any review lease on it.
+        update = dict(state, review_claimed_by=None, review_lease_until=None)
+        if decision == APPROVE:
+            update["rejection_reason"] = ""
+        elif reason is not None:
+            update["rejection_reason"] = reason
+        Note.objects.filter(pk__in=[row["id"] for row in changed]).update(
+            **update
+        )
+        for row in changed:
+            row.update(update)
+
+        NoteAction.objects.bulk_create([
+            NoteAction(
+                note_id=row["id"],
+                action=ACTIONS[decision],
+                actor=user,
+                reason=row["rejection_reason"] if decision == REJECT else None,
+            )
+            for row in changed
+        ])
+
+        stats.move_many(
+            (stats.key_for({**row, **previous[row["id"]]}), stats.key_for(row))
+            for row in changed
+        )
+        for uploader_id in {row["uploader_id"] for row in changed}:
+            stats.forget_user(uploader_id)
+
+        outbox.enqueue_many(
+            _email(decision, row)
+            for row in changed
+            if row["uploader__email"]
+        )
+        if any(
+            visibility.is_public(row)
+            or visibility.is_public({**row, **previous[row["id"]]})
+            for row in changed
+        ):
+            response_cache.invalidate(
+                response_cache.PUBLIC_NOTES, response_cache.PUBLIC_SUBJECTS
+            )
+        review_events.publish(
+            (
+                review_events.groups_for_note(
+                    row["subject__course_id"], row["subject__is_general"]
+                ),
+                review_events.note_event(
+                    ACTIONS[decision], row["id"], row["title"]
+                ),
+            )
+            for row in changed
+        )
+
+    for row in changed:
+        results[row["id"]] = ACTIONS[decision]
+    return results
+
+
+def _leased_to_other(row, user, now):
+    return (
+        row["review_claimed_by"] is not None
+        and row["review_claimed_by"] != user.pk
+        and row["review_lease_until"] is not None
+        and row["review_lease_until"] > now
+    )
+
+
+def _email(decision, row):
+    greeting = f"Hi {row['uploader__school_id']},\n\n"
+    if decision == APPROVE:
+        subject = "Your note has been approved"
+        body = (
+            f"{greeting}Your note '{row['title']}' has been approved "
+            "and is now visible."
+        )
+    else:
+        subject = "Your note was rejected"
+        body = (
+            f"{greeting}Your note '{row['title']}' was rejected.\n\n"
+            f"Reason:\n{row['rejection_reason']}"
+        )
+    return (
+        subject,
+        body,
+        settings.DEFAULT_FROM_EMAIL,
+        [row["uploader__email"]],
+    )
@@ -0,0 +1,73 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# ======================================================
+# CURSOR ENCODING
+# ======================================================
+def encode_cursor(stamp, pk):
+    raw = json.dumps([stamp.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        stamp, pk = json.loads(base64.urlsafe_b64decode(padded))
+        stamp = parse_datetime(stamp)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor.")
+
+    if stamp is None or not isinstance(pk, int):
+        raise InvalidCursor("Invalid cursor.")
+
+    return stamp, pk
+
+
+# ======================================================
+# KEYSET PAGE
+# ======================================================
+def page_size_from(request, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(request.query_params.get("page_size", default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE,
+                field="uploaded_at", oldest_first=False):
+    """
+    Returns (rows, next_cursor) for a newest-first (or oldest-first)
+    page keyed on (field, id). The cursor is the last row of the
+    previous page, so each page is a single index range scan regardless
+    of depth.
+    """
+    op, sign = ("gt", "") if oldest_first else ("lt", "-")
+    if cursor:
+        stamp, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f"{field}__{op}": stamp}) |
+            Q(**{field: stamp, f"id__{op}": pk})
+        )
+
+    rows = list(queryset.order_by(f"{sign}{field}", f"{sign}id")[:page_size + 1])
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+
+    return rows, next_cursor
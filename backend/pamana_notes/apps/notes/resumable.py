@@ -0,0 +1,305 @@
+"""
+Resumable chunked uploads.
+
+A note file can be sent in pieces instead of one multipart request, so
+a dropped connection costs one chunk rather than the whole file:
+
+    POST  student/uploads/                {filename, size, sha256?}
+    PATCH student/uploads/<id>/           body: the next bytes
+          Upload-Offset: <bytes the server already has>
+          Upload-SHA256: <digest of everything through this chunk>
+    GET   student/uploads/<id>/           offset and sha256, to resume
+    POST  student/uploads/<id>/finalize/  note fields, as student/upload/
+
+The declared size must be within NOTES_MAX_UPLOAD_SIZE. A chunk must
+start at the session's offset (409 otherwise, with the offset to resume
+from) and may not run past the declared size: Content-Length is checked
+before anything is read and the byte count again while the body
+streams, so an oversized upload is refused at its first surplus byte.
+
+Appends to one session are serialized by an exclusive lock on its part
+file, taken before the file is touched. A chunk that finds the lock
+held, or finds once it has the lock that another chunk already moved the
+offset, is refused with 409 and leaves the file alone.
+
+The server keeps the running SHA-256 of the bytes it has. Upload-SHA256
+is optional; when it does not match, the chunk is discarded (400) and
+the offset stays where it was. finalize() re-hashes the assembled file
+before creating the note, which also gives the content-addressed
+storage its digest for free.
+
+Part files live under MEDIA_ROOT/partial. Sessions not touched for
+NOTES_UPLOAD_SESSION_HOURS expire; purge() removes them and their files.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+
+from .models import UploadSession
+
+
+CHUNK_SIZE = 64 * 1024
+PART_DIR = "partial"
+MAX_CACHED_HASHERS = 128
+
+# session id -> (offset, hasher) for sessions this process appended to
+# last, so a chunk does not re-read the part file to continue the hash.
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    def __init__(self, detail, status_code):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def lifetime():
+    return timedelta(hours=getattr(settings, "NOTES_UPLOAD_SESSION_HOURS", 24))
+
+
+def sessions(user):
+    """
+    The user's upload sessions that have not expired.
+    """
+    return UploadSession.objects.filter(
+        user=user, updated_at__gte=timezone.now() - lifetime()
+    )
+
+
+def part_path(session_id):
+    return Path(settings.MEDIA_ROOT) / PART_DIR / f"{session_id}.part"
+
+
+def describe(session):
+    return {
+        "id": str(session.pk),
+        "filename": session.filename,
+        "size": session.size,
+        "offset": session.offset,
+        "sha256": session.sha256,
+        "complete": session.offset == session.size,
+        "expires_at": session.updated_at + lifetime(),
+    }
+
+
+# ======================================================
+# RUNNING HASH
+# ======================================================
+def _hash_file(path, limit=None):
+    hasher = hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as fh:
+        while remaining is None or remaining > 0:
+            size = CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining)
+            chunk = fh.read(size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return hasher
+
+
+def _hasher(session):
+    with _hashers_lock:
+        cached = _hashers.get(session.pk)
+    if cached is not None and cached[0] == session.offset:
+        return cached[1].copy()
+    if session.offset == 0:
+        return hashlib.sha256()
+    return _hash_file(part_path(session.pk), session.offset)
+
+
+def _remember(session, hasher):
+    with _hashers_lock:
+        _hashers[session.pk] = (session.offset, hasher)
+        _hashers.move_to_end(session.pk)
+        while len(_hashers) > MAX_CACHED_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def _forget(session_id):
+    with _hashers_lock:
+        _hashers.pop(session_id, None)
+
+
+# ======================================================
+# PART FILE LOCK
+# ======================================================
+@contextmanager
+def locked(fh):
+    """
+    Holds an exclusive lock on an open part file; raises UploadError
+    (409) at once if another request holds it.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        raise UploadError(
+            "Another chunk is being appended to this upload.",
+            status.HTTP_409_CONFLICT,
+        ) from None
+    try:
+        yield fh
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ======================================================
+# APPEND
+# ======================================================
+def _offset_mismatch():
+    return UploadError(
+        "Upload-Offset does not match the bytes received.",
+        status.HTTP_409_CONFLICT,
+    )
+
+
+def append(session, offset, stream, length=None, checksum=None):
+    """
+    Writes the chunk read from `stream` at `offset` and advances the
+    session. Raises UploadError when the chunk is refused; the session
+    and its part file are then left as they were.
+    """
+    if offset != session.offset:
+        raise _offset_mismatch()
+    too_large = UploadError(
+        "Chunk goes past the declared upload size.",
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+    if length is not None and offset + length > session.size:
+        raise too_large
+
+    path = part_path(session.pk)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+    received = 0
+    with open(path, "r+b") as fh, locked(fh):
+        # A chunk that held the lock until just now may have moved on.
+        current = (
+            UploadSession.objects.filter(pk=session.pk)
+            .values_list("offset", flat=True)
+            .first()
+        )
+        if current != offset:
+            raise _offset_mismatch()
+
+        hasher = _hasher(session)
+        fh.seek(offset)
+        # Drop whatever an interrupted chunk left past the offset.
+        fh.truncate()
+        try:
+            while stream is not None:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                if offset + received > session.size:
+                    raise too_large
+                fh.write(chunk)
+                hasher.update(chunk)
+
+            digest = hasher.hexdigest()
+            if checksum and checksum.lower() != digest:
+                raise UploadError(
+                    "Upload-SHA256 does not match the data received.",
+                    status.HTTP_400_BAD_REQUEST,
+                )
+        except BaseException:
+            fh.truncate(offset)
+            raise
+
+        # Advanced before the lock is released, so the next chunk sees it.
+        advanced = UploadSession.objects.filter(
+            pk=session.pk, offset=offset
+        ).update(offset=offset + received, sha256=digest, updated_at=timezone.now())
+    if not advanced:  # the session was discarded meanwhile
+        _forget(session.pk)
+        raise _offset_mismatch()
+
+    session.refresh_from_db()
+    _remember(session, hasher)
+    return session
+
+
+# ======================================================
+# FINALIZE & CLEANUP
+# ======================================================
+def verify(session):
+    """
+    Checks a complete session against its part file; returns the
+    file's SHA-256. Raises UploadError.
+    """
+    if session.offset != session.size:
+        raise UploadError("Upload is incomplete.", status.HTTP_409_CONFLICT)
+
+    digest = _hash_file(part_path(session.pk)).hexdigest()
+    if digest != session.sha256:
+        # The part file was changed outside append().
+        raise UploadError(
+            "Upload data is inconsistent; start a new upload.",
+            status.HTTP_409_CONFLICT,
+        )
+    if session.expected_sha256 and session.expected_sha256 != digest:
+        raise UploadError(
+            "File does not match the declared sha256.",
+            status.HTTP_400_BAD_REQUEST,
+        )
+    return digest
+
+
+def discard(session):
+    _forget(session.pk)
+    part_path(session.pk).unlink(missing_ok=True)
+    session.delete()
+
+
+def purge():
+    """
+    Deletes expired sessions and part files without a session.
+    Returns the number of part files removed.
+    """
+    cutoff = timezone.now() - lifetime()
+    UploadSession.objects.filter(updated_at__lt=cutoff).delete()
+
+    part_dir = Path(settings.MEDIA_ROOT) / PART_DIR
+    if not part_dir.is_dir():
+        return 0
+
+    live = {str(pk) for pk in UploadSession.objects.values_list("pk", flat=True)}
+    stale_before = time.time() - lifetime().total_seconds()
+    removed = 0
+    for path in part_dir.glob("*.part"):
+        if path.stem in live:
+            continue
+        # A session created after the query above may own a new file.
+        if path.stat().st_mtime >= stale_before:
+            continue
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
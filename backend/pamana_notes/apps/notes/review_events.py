@@ -0,0 +1,128 @@
+"""
+Live moderation events for reviewers.
+
+Notes entering or leaving the pending queue are published after commit
+to channel-layer groups that mirror visibility.reviewable():
+
+    reviewers.all            admins: every note
+    reviewers.general        moderators: notes in general subjects
+    reviewers.course.<id>    moderators of that course
+
+ReviewConsumer joins the groups for its user. A note goes to ALL and to
+exactly one moderator group (general subjects to GENERAL, others to
+their course), so a moderator, who joins both, sees each event once.
+Events are grouped per channel group, so a bulk moderation of N notes
+costs one group_send per group rather than one per note.
+
+    submitted  a note became pending (upload or resubmission)
+    approved   a note was approved
+    rejected   a note was rejected
+    removed    a pending note was deleted
+"""
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from . import visibility
+
+
+logger = logging.getLogger(__name__)
+
+SUBMITTED = "submitted"
+APPROVED = "approved"
+REJECTED = "rejected"
+REMOVED = "removed"
+
+ALL = "reviewers.all"
+GENERAL = "reviewers.general"
+
+
+# ======================================================
+# GROUPS
+# ======================================================
+def course_group(course_id):
+    return f"reviewers.course.{course_id}"
+
+
+def groups_for_reviewer(user):
+    role, course_id = visibility.viewer(user)
+    if role == visibility.ADMIN:
+        return [ALL]
+    if role == visibility.MODERATOR:
+        groups = [GENERAL]
+        if course_id is not None:
+            groups.append(course_group(course_id))
+        return groups
+    return []
+
+
+def groups_for_note(course_id, is_general):
+    if is_general:
+        return [ALL, GENERAL]
+    if course_id is not None:
+        return [ALL, course_group(course_id)]
+    return [ALL]
+
+
+# ======================================================
+# EVENTS
+# ======================================================
+def _status(state):
+    if state is None or state[0]:
+        return None
+    if state[1]:
+        return APPROVED
+    if state[2]:
+        return REJECTED
+    return "pending"
+
+
+def change(old_state, new_state):
+    """
+    Event for a note moving between (is_deleted, is_approved,
+    is_rejected) states, or None. old_state is None for new notes and
+    new_state is None for removed ones.
+    """
+    old, new = _status(old_state), _status(new_state)
+    if old == new:
+        return None
+    if new == "pending":
+        return SUBMITTED
+    if new is None:
+        return REMOVED if old == "pending" else None
+    return new
+
+
+def note_event(event, note_id, title, **details):
+    return {"event": event, "note": {"id": note_id, "title": title, **details}}
+
+
+def publish(events):
+    """
+    Sends [(groups, event)] once the current transaction commits.
+    """
+    by_group = defaultdict(list)
+    for groups, event in events:
+        for group in groups:
+            by_group[group].append(event)
+
+    if by_group:
+        transaction.on_commit(lambda: _send(by_group))
+
+
+def _send(by_group):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+
+    try:
+        for group, events in by_group.items():
+            async_to_sync(layer.group_send)(
+                group, {"type": "review.events", "events": events}
+            )
+    except Exception:
+        # Live updates are best-effort; the lists stay correct over HTTP.
+        logger.warning("Could not publish review events", exc_info=True)
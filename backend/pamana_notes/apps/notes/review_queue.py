@@ -0,0 +1,118 @@
+"""
+Reviewer work queue.
+
+Pending notes are handed out oldest first, scoped by
+visibility.reviewable(). claim() leases the next N notes to a reviewer
+by stamping review_claimed_by / review_lease_until; leased notes drop
+out of every other reviewer's queue until the lease runs out
+(NOTES_REVIEW_LEASE_SECONDS) or the note is moderated, so abandoned
+claims expire on their own.
+
+On Postgres the candidates are locked with SELECT ... FOR UPDATE SKIP
+LOCKED, so concurrent claims never wait on each other and never overlap.
+Backends without it (SQLite) claim with one conditional UPDATE, which
+re-checks availability as it writes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q, Subquery
+from django.utils import timezone
+
+from . import visibility
+from .models import Note
+
+
+PENDING = Q(is_approved=False, is_rejected=False)
+MAX_CLAIM = 50
+
+
+def lease_seconds():
+    return getattr(settings, "NOTES_REVIEW_LEASE_SECONDS", 600)
+
+
+def _unleased(now):
+    return Q(review_lease_until__isnull=True) | Q(review_lease_until__lte=now)
+
+
+def queue(user, now=None):
+    """
+    Pending notes `user` may review that nobody else holds a lease on.
+    """
+    now = now or timezone.now()
+    return (
+        visibility.reviewable(user)
+        .filter(PENDING)
+        .filter(_unleased(now) | Q(review_claimed_by=user))
+    )
+
+
+def is_free_for(user_id, claimed_by, lease_until, now=None):
+    """
+    Whether a pending note leased to claimed_by until lease_until is in
+    user_id's queue: the in-memory twin of queue()'s lease filter.
+    """
+    now = now or timezone.now()
+    return lease_until is None or lease_until <= now or claimed_by == user_id
+
+
+def claimed(user, now=None):
+    """
+    Notes currently leased to `user`, oldest first.
+    """
+    now = now or timezone.now()
+    return (
+        visibility.reviewable(user)
+        .filter(PENDING, review_claimed_by=user, review_lease_until__gt=now)
+        .order_by("uploaded_at", "id")
+    )
+
+
+def claim(user, count):
+    """
+    Leases up to `count` more notes to `user` and returns everything the
+    user now holds, with its lease renewed.
+    """
+    count = max(0, min(count, MAX_CLAIM))
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=lease_seconds())
+    available = (
+        visibility.reviewable(user)
+        .filter(PENDING)
+        .filter(_unleased(now))
+        .order_by("uploaded_at", "id")
+    )
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(
+                available
+                .select_for_update(skip_locked=True, of=("self",))
+                .values_list("pk", flat=True)[:count]
+            )
+            target = Note.objects.filter(pk__in=ids)
+        else:
+            target = Note.objects.filter(
+                _unleased(now),
+                pk__in=Subquery(available.values("pk")[:count]),
+            )
+        if count:
+            target.update(
+                review_claimed_by=user,
+                review_lease_until=lease_until,
+            )
+
+        # Renew whatever the reviewer already held.
+        claimed(user, now).update(review_lease_until=lease_until)
+
+    return claimed(user, now)
+
+
+def release(user, note_ids):
+    """
+    Gives back leases `user` holds on note_ids. Returns how many.
+    """
+    return Note.objects.filter(
+        pk__in=note_ids, review_claimed_by=user
+    ).update(review_claimed_by=None, review_lease_until=None)
@@ -1,9 +1,13 @@
 from django.urls import re_path
-from .consumers import CommentConsumer
+from .consumers import CommentConsumer, ReviewConsumer
 
 websocket_urlpatterns = [
     re_path(
         r"ws/notes/(?P<note_id>\d+)/comments/$",
         CommentConsumer.as_asgi(),
     ),
+    re_path(
+        r"ws/notes/review/$",
+        ReviewConsumer.as_asgi(),
+    ),
 ]
\ No newline at end of file
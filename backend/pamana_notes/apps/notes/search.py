@@ -0,0 +1,236 @@
+"""
+Full-text search over notes.
+
+SQLite keeps an FTS5 virtual table and Postgres a tsvector column with a
+GIN index, both named notes_search and keyed by note id. Rows are
+written by the Note post_save/post_delete signals; queries join the
+index against whatever visibility-filtered Note queryset the caller
+passes in. Other backends fall back to icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+TABLE = "notes_search"
+PG_CONFIG = "simple"
+
+# Column weights: title > description > body
+SQLITE_BM25 = "bm25(notes_search, 10.0, 4.0, 1.0)"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ======================================================
+# BACKEND
+# ======================================================
+def backend(conn=None):
+    vendor = (conn or connection).vendor
+    if vendor in ("sqlite", "postgresql"):
+        return vendor
+    return None
+
+
+def create_index(conn):
+    """
+    DDL for the index table. Used by the notes migration.
+    """
+    vendor = backend(conn)
+    with conn.cursor() as cursor:
+        if vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} "
+                "USING fts5(title, description, body, "
+                "tokenize='porter unicode61')"
+            )
+        elif vendor == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+                "note_id bigint PRIMARY KEY "
+                "REFERENCES notes_note(id) ON DELETE CASCADE "
+                "DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE}_document_gin "
+                f"ON {TABLE} USING GIN (document)"
+            )
+
+
+def drop_index(conn):
+    if backend(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+# ======================================================
+# DOCUMENTS
+# ======================================================
+def document_for(note):
+    """
+    (title, description, body) as indexed for a note. The body holds
+    the typed content plus any text extracted from the file.
+    """
+    # Migration 0015 indexes historical notes, which predate
+    # extracted_text.
+    extracted = getattr(note, "extracted_text", "")
+    body = "\n".join(part for part in (note.content, extracted) if part)
+    return (
+        note.title or "",
+        note.description or "",
+        body,
+    )
+
+
+def index_note(note):
+    vendor = backend()
+    if vendor is None:
+        return
+
+    title, description, body = document_for(note)
+
+    with connection.cursor() as cursor:
+        if vendor == "sqlite":
+            cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [note.pk])
+            cursor.execute(
+                f"INSERT INTO {TABLE} (rowid, title, description, body) "
+                "VALUES (%s, %s, %s, %s)",
+                [note.pk, title, description, body],
+            )
+        else:
+            cursor.execute(
+                f"INSERT INTO {TABLE} (note_id, document) VALUES (%s, "
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C')) "
+                "ON CONFLICT (note_id) DO UPDATE SET document = EXCLUDED.document",
+                [
+                    note.pk,
+                    PG_CONFIG, title,
+                    PG_CONFIG, description,
+                    PG_CONFIG, body,
+                ],
+            )
+
+
+def remove_note(note_id):
+    vendor = backend()
+    if vendor is None:
+        return
+
+    column = "rowid" if vendor == "sqlite" else "note_id"
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {column} = %s", [note_id])
+
+
+def rebuild_index(queryset):
+    """
+    Re-indexes every note in queryset. Returns the number indexed.
+    """
+    count = 0
+    for note in queryset.iterator(chunk_size=500):
+        index_note(note)
+        count += 1
+    return count
+
+
+# ======================================================
+# QUERIES
+# ======================================================
+def _terms(query):
+    return TOKEN_RE.findall(query or "")
+
+
+def _match_clause(vendor, terms):
+    """
+    (where_sql, params) matching every term. Terms are prefix-matched
+    and quoted, so user input can never reach the query syntax.
+    """
+    if vendor == "sqlite":
+        expr = " ".join(f'"{term}"*' for term in terms)
+        return f"{TABLE} MATCH %s", [expr]
+
+    expr = " & ".join(f"{term}:*" for term in terms)
+    return "document @@ to_tsquery(%s::regconfig, %s)", [PG_CONFIG, expr]
+
+
+def _scoped(vendor, terms, queryset):
+    id_column = "rowid" if vendor == "sqlite" else "note_id"
+    match_sql, match_params = _match_clause(vendor, terms)
+    scope_sql, scope_params = (
+        queryset.order_by().values("id").query.sql_with_params()
+    )
+    where = f"{match_sql} AND {id_column} IN ({scope_sql})"
+    return id_column, where, [*match_params, *scope_params]
+
+
+def _fallback(queryset, terms):
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) |
+            Q(description__icontains=term) |
+            Q(content__icontains=term)
+        )
+    return queryset
+
+
+def filter_notes(queryset, query):
+    """
+    Restricts queryset to notes matching query, without ranking.
+    """
+    terms = _terms(query)
+    if not terms:
+        return queryset
+
+    vendor = backend()
+    if vendor is None:
+        return _fallback(queryset, terms)
+
+    id_column = "rowid" if vendor == "sqlite" else "note_id"
+    match_sql, match_params = _match_clause(vendor, terms)
+    return queryset.filter(
+        id__in=RawSQL(
+            f"SELECT {id_column} FROM {TABLE} WHERE {match_sql}",
+            match_params,
+        )
+    )
+
+
+def ranked_search(queryset, query, offset=0, limit=20):
+    """
+    Returns (notes, total) for one page of queryset ranked by relevance.
+    """
+    terms = _terms(query)
+    if not terms:
+        return [], 0
+
+    vendor = backend()
+    if vendor is None:
+        matches = _fallback(queryset, terms).order_by("-uploaded_at", "-id")
+        return list(matches[offset:offset + limit]), matches.count()
+
+    id_column, where, params = _scoped(vendor, terms, queryset)
+
+    if vendor == "sqlite":
+        rank_sql, rank_params, order = SQLITE_BM25, [], "ASC"
+    else:
+        _, rank_params = _match_clause(vendor, terms)
+        rank_sql = "ts_rank_cd(document, to_tsquery(%s::regconfig, %s))"
+        order = "DESC"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {id_column}, {rank_sql} AS score FROM {TABLE} "
+            f"WHERE {where} ORDER BY score {order}, {id_column} DESC "
+            "LIMIT %s OFFSET %s",
+            [*rank_params, *params, limit, offset],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE} WHERE {where}", params)
+        total = cursor.fetchone()[0]
+
+    by_id = queryset.in_bulk(ids)
+    return [by_id[pk] for pk in ids if pk in by_id], total
@@ -3,7 +3,7 @@ from apps.notes.models import Note
 
 
 class NoteSerializer(serializers.ModelSerializer):
-    likes_count = serializers.IntegerField(source="likes.count", read_only=True)
+    likes_count = serializers.IntegerField(read_only=True)
     is_liked = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
 
@@ -0,0 +1,250 @@
+import os
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.core import response_cache
+
+from . import review_events, search, stats, storage, visibility
+from .counters import bump, rating_deltas
+from .models import Comment, Note, NoteLike, NoteSave, Rating
+
+
+# ======================================================
+# ENGAGEMENT COUNTERS
+# ======================================================
+COUNTED = {
+    NoteLike: "likes_count",
+    NoteSave: "saves_count",
+    Comment: "comments_count",
+}
+
+
+@receiver(post_save, sender=NoteLike)
+@receiver(post_save, sender=NoteSave)
+@receiver(post_save, sender=Comment)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        bump(instance.note_id, **{COUNTED[sender]: 1})
+
+
+@receiver(post_delete, sender=NoteLike)
+@receiver(post_delete, sender=NoteSave)
+@receiver(post_delete, sender=Comment)
+def count_deleted(sender, instance, **kwargs):
+    bump(instance.note_id, **{COUNTED[sender]: -1})
+
+
+@receiver(pre_save, sender=Rating)
+def remember_previous_rating(sender, instance, **kwargs):
+    instance._previous_value = None
+    if instance.pk:
+        instance._previous_value = (
+            Rating.objects
+            .filter(pk=instance.pk)
+            .values_list("value", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, **kwargs):
+    bump(
+        instance.note_id,
+        **rating_deltas(instance._previous_value, instance.value),
+    )
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, **kwargs):
+    bump(instance.note_id, **rating_deltas(instance.value, None))
+
+
+# ======================================================
+# COMMENT THREADS
+# ======================================================
+@receiver(pre_save, sender=Comment)
+def place_in_thread(sender, instance, **kwargs):
+    if instance.parent_id is None:
+        instance.thread_id = None
+        instance.depth = 0
+        instance.path = ""
+        return
+
+    parent = instance.parent
+    instance.thread_id = parent.thread_id or parent.pk
+    instance.depth = parent.depth + 1
+    instance.path = parent.subtree_path()
+
+
+# ======================================================
+# SEARCH INDEX
+# ======================================================
+SEARCH_FIELDS = {"title", "description", "content"}
+
+
+@receiver(post_save, sender=Note)
+def index_saved_note(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    search.index_note(instance)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_deleted_note(sender, instance, **kwargs):
+    search.remove_note(instance.pk)
+
+
+# ======================================================
+# PREVIOUS STATE
+# ======================================================
+@receiver(pre_save, sender=Note)
+def remember_previous_state(sender, instance, update_fields=None, **kwargs):
+    """
+    Reads the stored file, rollup and visibility columns in one query,
+    for the blob refcount, dashboard rollup and catalogue cache handlers
+    below.
+    """
+    instance._previous_file = None
+    instance._previous_stats_key = None
+    instance._was_public = False
+
+    fields = set(update_fields) if update_fields is not None else None
+    wants_file = fields is None or "file" in fields
+    wants_stats = fields is None or bool(stats.TRACKED_FIELDS & fields)
+    wants_public = wants_stats or "visibility" in fields
+
+    if wants_file and instance.file and not instance.file._committed:
+        instance.file_name = os.path.basename(instance.file.name)
+
+    if not instance.pk or not (wants_file or wants_stats or wants_public):
+        return
+
+    row = (
+        Note.objects
+        .filter(pk=instance.pk)
+        .values("file", "uploaded_at", "visibility", *stats.STATE_FIELDS)
+        .first()
+    )
+    if row is None:
+        return
+
+    if wants_file:
+        instance._previous_file = row["file"] or ""
+    if wants_stats:
+        instance._previous_stats_key = stats.key_for(row)
+    if wants_public:
+        instance._was_public = visibility.is_public(row)
+
+
+# ======================================================
+# FILE BLOBS
+# ======================================================
+@receiver(post_save, sender=Note)
+def count_file_references(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_file", None)
+    if previous is None and not created:
+        return
+
+    current = instance.file.name or ""
+    if current == (previous or ""):
+        return
+
+    storage.incref(current)
+    storage.decref(previous)
+
+    digest = storage.blob_sha256(current)
+    if digest and digest != instance.file_sha256:
+        # New bytes: earlier extraction results no longer apply.
+        Note.objects.filter(pk=instance.pk).update(
+            file_sha256=digest,
+            extracted_at=None,
+        )
+        instance.file_sha256 = digest
+        instance.extracted_at = None
+
+
+@receiver(post_delete, sender=Note)
+def release_file(sender, instance, **kwargs):
+    storage.decref(instance.file.name)
+
+
+# ======================================================
+# DASHBOARD ROLLUPS / PER-USER COUNTS
+# ======================================================
+@receiver(post_save, sender=Note)
+def roll_up_saved_note(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "_previous_stats_key", None) is None:
+        return
+    if stats.move(instance._previous_stats_key, stats.key_for(instance)):
+        stats.forget_user(instance.uploader_id)
+
+
+@receiver(post_delete, sender=Note)
+def roll_up_deleted_note(sender, instance, **kwargs):
+    stats.move(stats.key_for(instance), None)
+    stats.forget_user(instance.uploader_id)
+
+
+# ======================================================
+# LIVE REVIEW EVENTS
+# ======================================================
+def _review_state(key):
+    return None if key is None else key[2:]
+
+
+def _publish_review_event(note, old_key, new_key):
+    event = review_events.change(_review_state(old_key), _review_state(new_key))
+    if event is None:
+        return
+
+    subject = note.subject
+    details = {}
+    if event == review_events.SUBMITTED:
+        lease_until = note.review_lease_until
+        details = {
+            "description": note.description,
+            "subject": subject.name,
+            "uploaded_at": note.uploaded_at.isoformat(),
+            "author_school_id": note.uploader.school_id,
+            # ReviewConsumer hides notes leased to another reviewer.
+            "review_claimed_by": note.review_claimed_by_id,
+            "review_lease_until": lease_until and lease_until.isoformat(),
+        }
+    review_events.publish([(
+        review_events.groups_for_note(subject.course_id, subject.is_general),
+        review_events.note_event(event, note.pk, note.title, **details),
+    )])
+
+
+@receiver(post_save, sender=Note)
+def publish_saved_note(sender, instance, created, **kwargs):
+    if not created and getattr(instance, "_previous_stats_key", None) is None:
+        return
+    _publish_review_event(
+        instance, instance._previous_stats_key, stats.key_for(instance)
+    )
+
+
+@receiver(post_delete, sender=Note)
+def publish_deleted_note(sender, instance, **kwargs):
+    _publish_review_event(instance, stats.key_for(instance), None)
+
+
+# ======================================================
+# PUBLIC CATALOGUE CACHE
+# ======================================================
+@receiver(post_save, sender=Note)
+def refresh_catalogue_for_saved_note(sender, instance, **kwargs):
+    if visibility.is_public(instance) or getattr(instance, "_was_public", False):
+        response_cache.invalidate(
+            response_cache.PUBLIC_NOTES, response_cache.PUBLIC_SUBJECTS
+        )
+
+
+@receiver(post_delete, sender=Note)
+def refresh_catalogue_for_deleted_note(sender, instance, **kwargs):
+    if visibility.is_public(instance):
+        response_cache.invalidate(
+            response_cache.PUBLIC_NOTES, response_cache.PUBLIC_SUBJECTS
+        )
@@ -0,0 +1,279 @@
+"""
+Note statistics: daily rollups behind the admin dashboard, and cached
+per-user status counts for dashboards and profiles.
+
+NoteDailyStat holds one counter per (upload day, subject, moderation
+state). The Note signals move a note between keys when it is created,
+moderated, soft-deleted or removed, so the dashboard reads a table that
+grows with days x subjects instead of scanning every note. Results are
+cached for NOTES_STATS_CACHE_SECONDS and dropped whenever a rollup
+changes.
+
+user_note_counts() answers every status bucket for one uploader with a
+single conditional aggregate, cached until that user's notes change.
+"""
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, DateField, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Note, NoteDailyStat
+
+
+STATE_FIELDS = ("subject_id", "is_deleted", "is_approved", "is_rejected")
+TRACKED_FIELDS = {"uploaded_at", "subject", *STATE_FIELDS}
+
+VERSION_KEY = "notes:stats:version"
+MAX_WINDOW_DAYS = 3650
+
+
+# ======================================================
+# KEYS
+# ======================================================
+def key_for(values):
+    """
+    Rollup key for a note, or for a dict of its column values.
+    """
+    get = values.get if isinstance(values, dict) else (
+        lambda name: getattr(values, name)
+    )
+    uploaded_at = get("uploaded_at")
+    if uploaded_at is None:
+        return None
+    return (
+        timezone.localdate(uploaded_at),
+        *(get(name) for name in STATE_FIELDS),
+    )
+
+
+# ======================================================
+# MAINTENANCE
+# ======================================================
+def _bump(key, delta):
+    day, subject_id, is_deleted, is_approved, is_rejected = key
+    lookup = {
+        "day": day,
+        "subject_id": subject_id,
+        "is_deleted": is_deleted,
+        "is_approved": is_approved,
+        "is_rejected": is_rejected,
+    }
+    if not NoteDailyStat.objects.filter(**lookup).update(notes=F("notes") + delta):
+        NoteDailyStat.objects.create(notes=delta, **lookup)
+
+
+def move(old_key, new_key):
+    """
+    Moves one note from old_key to new_key (either may be None).
+    Returns whether anything changed.
+    """
+    return move_many([(old_key, new_key)])
+
+
+def move_many(moves):
+    """
+    Applies many (old_key, new_key) moves with one write per distinct
+    key, for set-based updates that bypass the Note signals.
+    """
+    deltas = Counter()
+    for old_key, new_key in moves:
+        if old_key == new_key:
+            continue
+        if old_key is not None:
+            deltas[old_key] -= 1
+        if new_key is not None:
+            deltas[new_key] += 1
+
+    changed = False
+    for key, delta in deltas.items():
+        if delta:
+            _bump(key, delta)
+            changed = True
+
+    if changed:
+        invalidate()
+    return changed
+
+
+def rebuild(since=None):
+    """
+    Recomputes the rollups from Note, for days >= since or for all of
+    history. Returns the number of rollup rows written.
+    """
+    notes = Note.objects.all()
+    existing = NoteDailyStat.objects.all()
+    if since is not None:
+        notes = notes.filter(uploaded_at__date__gte=since)
+        existing = existing.filter(day__gte=since)
+
+    rows = (
+        notes
+        .annotate(day=TruncDate("uploaded_at"))
+        .values("day", *STATE_FIELDS)
+        .annotate(notes=Count("id"))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        existing.delete()
+        created = NoteDailyStat.objects.bulk_create(
+            [NoteDailyStat(**row) for row in rows if row["day"] is not None],
+            batch_size=500,
+        )
+
+    invalidate()
+    return len(created)
+
+
+# ======================================================
+# READS
+# ======================================================
+def invalidate():
+    # After commit, so a concurrent read cannot re-cache the old figures.
+    transaction.on_commit(
+        lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    )
+
+
+def window_from(request):
+    """
+    Days of uploads-per-day history requested via ?days= (0 = all).
+    """
+    default = getattr(settings, "NOTES_STATS_WINDOW_DAYS", 90)
+    try:
+        days = int(request.query_params.get("days", default))
+    except (TypeError, ValueError):
+        days = default
+    return max(0, min(days, MAX_WINDOW_DAYS))
+
+
+def summary(days):
+    """
+    Dashboard figures for a uploads-per-day window of `days` (0 = all),
+    from one grouped query over the rollup table:
+
+        totals:   Counter of (is_deleted, is_approved, is_rejected) -> notes
+        per_day:  {day: [notes, approved_notes]} for live notes in the window
+        subjects: {subject name or None: notes} for live notes
+        users:    total user count
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_KEY, version, None)
+        version = cache.get(VERSION_KEY, version)
+
+    cache_key = f"notes:stats:{version}:{days}"
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    if days:
+        start = timezone.localdate() - timedelta(days=days - 1)
+        bucket = Case(
+            When(day__gte=start, then=F("day")),
+            default=Value(None),
+            output_field=DateField(),
+        )
+    else:
+        bucket = F("day")
+
+    rows = (
+        NoteDailyStat.objects
+        .annotate(bucket=bucket)
+        .values(
+            "bucket", "subject__name",
+            "is_deleted", "is_approved", "is_rejected",
+        )
+        .annotate(total=Sum("notes"))
+        .order_by()
+    )
+
+    totals = Counter()
+    per_day = defaultdict(lambda: [0, 0])
+    subjects = Counter()
+
+    for row in rows:
+        if not row["total"]:
+            continue
+        state = (row["is_deleted"], row["is_approved"], row["is_rejected"])
+        totals[state] += row["total"]
+
+        if row["is_deleted"]:
+            continue
+        subjects[row["subject__name"]] += row["total"]
+        if row["bucket"] is not None:
+            per_day[row["bucket"]][0] += row["total"]
+            if row["is_approved"]:
+                per_day[row["bucket"]][1] += row["total"]
+
+    result = {
+        "totals": totals,
+        "per_day": dict(sorted(per_day.items())),
+        "subjects": subjects,
+        "users": get_user_model().objects.count(),
+    }
+    cache.set(
+        cache_key,
+        result,
+        getattr(settings, "NOTES_STATS_CACHE_SECONDS", 60),
+    )
+    return result
+
+
+def count(totals, deleted=None, approved=None, rejected=None):
+    """
+    Sums totals over the states matching the given flags (None = any).
+    """
+    wanted = (deleted, approved, rejected)
+    return sum(
+        notes for state, notes in totals.items()
+        if all(w is None or w == s for w, s in zip(wanted, state))
+    )
+
+
+# ======================================================
+# PER-USER COUNTS
+# ======================================================
+LIVE = Q(is_deleted=False)
+
+
+def _user_key(user_id):
+    return f"notes:user-stats:{user_id}"
+
+
+def forget_user(user_id):
+    transaction.on_commit(lambda: cache.delete(_user_key(user_id)))
+
+
+def user_note_counts(user):
+    """
+    Status buckets for the notes `user` uploaded:
+
+        uploaded  every upload, including deleted ones
+        my_notes  live (not deleted) uploads
+        approved / pending / rejected  among live uploads
+    """
+    key = _user_key(user.pk)
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+
+    counts = Note.objects.filter(uploader=user).aggregate(
+        uploaded=Count("id"),
+        my_notes=Count("id", filter=LIVE),
+        approved=Count("id", filter=LIVE & Q(is_approved=True)),
+        pending=Count(
+            "id", filter=LIVE & Q(is_approved=False, is_rejected=False)
+        ),
+        rejected=Count("id", filter=LIVE & Q(is_rejected=True)),
+    )
+    cache.set(key, counts, getattr(settings, "NOTES_STATS_CACHE_SECONDS", 60))
+    return counts
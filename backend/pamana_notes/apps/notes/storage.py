@@ -0,0 +1,203 @@
+"""
+Content-addressed storage for note files.
+
+Every upload is stored once at blobs/<aa>/<bb>/<sha256><ext>. When the
+blob already exists the write is skipped and the existing path is
+returned, so re-uploads of the same lecture PDF cost no disk. FileBlob
+rows count how many notes point at each blob; `manage.py gc_note_blobs`
+removes blobs that reach zero, and files that never got a row (a note
+save that failed after the write).
+
+An upload that finds its blob already stored marks it used
+(last_used_at) before relying on it, and GC only takes blobs and files
+unused for NOTES_BLOB_GC_GRACE_HOURS, so a collection cannot delete a
+blob between an upload's save() and the incref of its note's commit.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+BLOB_DIR = "blobs"
+BLOB_RE = re.compile(
+    rf"^{BLOB_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.\w+)?$"
+)
+
+
+def blob_name(digest, ext=""):
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+def blob_sha256(name):
+    """
+    The content hash encoded in a blob path, or None for legacy paths.
+    """
+    match = BLOB_RE.match(name or "")
+    return match.group(1) if match else None
+
+
+def content_sha256(content):
+    """
+    Hash of an upload. HashingUploadHandler computes it while the body
+    is received; anything else is hashed here in chunks.
+    """
+    digest = getattr(content, "sha256", None)
+    if digest is None:
+        digest = getattr(getattr(content, "file", None), "sha256", None)
+    if digest is not None:
+        return digest
+
+    hasher = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return hasher.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Identical names always mean identical bytes, so a concurrent
+        # writer of the same blob may simply overwrite it.
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+
+        ext = os.path.splitext(name)[1]
+        digest = content_sha256(content)
+        path = blob_name(digest, ext)
+
+        if self.exists(path):
+            # A collection that already holds the blob has deleted the
+            # file by the time touch() returns; write it again then.
+            touch(path)
+            if self.exists(path):
+                return path
+
+        return self._save(path, content)
+
+
+note_file_store = ContentAddressedStorage()
+
+
+def note_file_storage():
+    return note_file_store
+
+
+# ======================================================
+# REFERENCE COUNTS
+# ======================================================
+def incref(name):
+    from .models import FileBlob
+
+    digest = blob_sha256(name)
+    if digest is None:
+        return
+
+    if FileBlob.objects.filter(pk=digest).update(ref_count=F("ref_count") + 1):
+        return
+
+    try:
+        with transaction.atomic():
+            FileBlob.objects.create(
+                sha256=digest,
+                name=name,
+                size=note_file_store.size(name),
+                ref_count=1,
+            )
+    except IntegrityError:
+        FileBlob.objects.filter(pk=digest).update(ref_count=F("ref_count") + 1)
+
+
+def touch(name):
+    """
+    Marks a stored blob as just used, so GC spares it for the grace
+    period.
+    """
+    from .models import FileBlob
+
+    digest = blob_sha256(name)
+    if digest is None:
+        return
+    if not FileBlob.objects.filter(pk=digest).update(last_used_at=timezone.now()):
+        # No row yet: the file's age is what GC looks at.
+        try:
+            os.utime(note_file_store.path(name))
+        except FileNotFoundError:
+            pass
+
+
+def decref(name):
+    from .models import FileBlob
+
+    digest = blob_sha256(name)
+    if digest is not None:
+        FileBlob.objects.filter(pk=digest).update(ref_count=F("ref_count") - 1)
+
+
+# ======================================================
+# GARBAGE COLLECTION
+# ======================================================
+def gc_grace():
+    return timedelta(hours=getattr(settings, "NOTES_BLOB_GC_GRACE_HOURS", 1))
+
+
+def collect_garbage():
+    """
+    Deletes unreferenced blobs and stored files without a FileBlob row,
+    once unused for the grace period. Returns the number of files removed.
+    """
+    from .models import FileBlob, Note
+
+    cutoff = timezone.now() - gc_grace()
+    unused = {"ref_count__lte": 0, "last_used_at__lt": cutoff}
+
+    removed = 0
+    for blob in FileBlob.objects.filter(**unused):
+        with transaction.atomic():
+            blob = (
+                FileBlob.objects
+                .select_for_update()
+                .filter(pk=blob.pk, **unused)
+                .first()
+            )
+            if blob is None or Note.objects.filter(file=blob.name).exists():
+                continue
+            blob.delete()
+            note_file_store.delete(blob.name)
+            removed += 1
+    return removed + _collect_orphans(cutoff)
+
+
+def _collect_orphans(cutoff):
+    from .models import FileBlob, Note
+
+    root = Path(note_file_store.path(BLOB_DIR))
+    if not root.is_dir():
+        return 0
+
+    removed = 0
+    for path in root.glob("*/*/*"):
+        name = path.relative_to(note_file_store.location).as_posix()
+        digest = blob_sha256(name)
+        if digest is None or path.stat().st_mtime >= cutoff.timestamp():
+            continue
+        if (FileBlob.objects.filter(pk=digest).exists()
+                or Note.objects.filter(file=name).exists()):
+            continue
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -1,3 +1,2276 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipIf
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    Client, RequestFactory, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.accounts.models import CustomUser
+from apps.core import response_cache
+from apps.notes import (
+    comment_tree, consumers, counter_buffer, counters, downloads, extraction,
+    moderation, resumable, review_events, search, stats, storage, views,
+    visibility,
+)
+from apps.notes.api import views as api_views
+from apps.notes.api.note_rows import NoteRowSerializer
+from apps.notes.api.serializers import AdminNoteSerializer
+from apps.notes.models import (
+    Comment, FileBlob, Note, NoteAction, NoteDailyStat, NoteLike, NoteSave,
+    Rating, UploadSession,
+)
+from apps.notes.uploadhandlers import (
+    HashingMemoryFileUploadHandler, MaxSizeUploadHandler,
+)
+from apps.subjects.models import Course, Subject
+
+try:
+    from channels.testing import WebsocketCommunicator
+except ImportError:  # channels.testing needs daphne
+    WebsocketCommunicator = None
+
+
+# ======================================================
+# QUERY PLAN REGRESSION TESTS
+# ======================================================
+# Each hot listing endpoint is called, every query it runs against
+# notes_note or notes_comment is EXPLAINed, and the test fails if the
+# plan falls back to a full table scan (or, on SQLite, sorts the whole
+# result in a temp b-tree instead of reading an index in order).
+NOTE_QUERY = re.compile(r'\bFROM "notes_(note|comment)"')
+
+REGRESSIONS = {
+    "sqlite": [
+        re.compile(
+            r"\bSCAN notes_(note|comment)\b(?! USING (COVERING )?INDEX)"
+        ),
+        re.compile(r"USE TEMP B-TREE FOR ORDER BY"),
+    ],
+    "postgresql": [
+        re.compile(r"\bSeq Scan on notes_(note|comment)\b"),
+    ],
+}
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return "\n".join(row[-1] for row in cursor.fetchall())
+
+        # Test tables are tiny; make the planner show which index it
+        # would use instead of preferring a sequential scan.
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN " + sql)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+class NoteQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        subject = Subject.objects.create(name="Programming", course=course)
+
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.moderator = CustomUser.objects.create_user(
+            "M-0001", "moderator@example.com", "pw-12345678",
+            first_name="Mo", last_name="Derator", course=course,
+            role=CustomUser.Role.MODERATOR,
+        )
+        cls.admin = CustomUser.objects.create_superuser(
+            "A-0001", "admin@example.com", "pw-12345678",
+        )
+
+        for i in range(12):
+            Note.objects.create(
+                title=f"Note {i}",
+                uploader=cls.student if i % 2 else cls.moderator,
+                subject=subject,
+                visibility=[
+                    Note.VISIBILITY_PUBLIC,
+                    Note.VISIBILITY_SCHOOL,
+                    Note.VISIBILITY_COURSE,
+                ][i % 3],
+                is_approved=i % 4 != 0,
+                is_deleted=i == 11,
+            )
+
+    def assertIndexedPlans(self, url, user=None):
+        if connection.vendor not in REGRESSIONS:
+            self.skipTest(f"no plan checks for {connection.vendor}")
+
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        queries = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and NOTE_QUERY.search(q["sql"])
+        ]
+        self.assertTrue(queries, f"{url} ran no notes_note queries")
+
+        for sql in queries:
+            plan = explain(sql)
+            for pattern in REGRESSIONS[connection.vendor]:
+                self.assertIsNone(
+                    pattern.search(plan),
+                    f"{url} regressed to {pattern.pattern!r}:\n{sql}\n\n{plan}",
+                )
+
+    def test_public_notes(self):
+        self.assertIndexedPlans("/api/notes/public/")
+
+    def test_student_dashboard(self):
+        self.assertIndexedPlans("/api/notes/student/dashboard/", self.student)
+
+    def test_student_dashboard_next_page(self):
+        first = self.client_for(self.student).get(
+            "/api/notes/student/dashboard/?page_size=2"
+        )
+        cursor = first.json()["next_cursor"]
+        self.assertIndexedPlans(
+            f"/api/notes/student/dashboard/?page_size=2&cursor={cursor}",
+            self.student,
+        )
+
+    def test_note_comments(self):
+        note = Note.objects.get(title="Note 1")
+        comment = Comment.objects.create(
+            note=note, user=self.student, content="Top",
+        )
+        Comment.objects.create(
+            note=note, user=self.student, content="Reply", parent=comment,
+        )
+        self.assertIndexedPlans(
+            f"/api/notes/notes/{note.pk}/comments/", self.student
+        )
+        self.assertIndexedPlans(
+            f"/api/notes/comments/{comment.pk}/replies/", self.student
+        )
+
+    def test_student_my_notes(self):
+        self.assertIndexedPlans("/api/notes/student/my-notes/", self.student)
+
+    def test_pending_notes_admin(self):
+        self.assertIndexedPlans("/api/notes/pending/", self.admin)
+
+    def test_pending_notes_moderator(self):
+        self.assertIndexedPlans("/api/notes/pending/", self.moderator)
+
+    def test_review_queue(self):
+        self.assertIndexedPlans("/api/notes/review-queue/", self.moderator)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+
+# ======================================================
+# DASHBOARD FEED
+# ======================================================
+class DashboardFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.reader = CustomUser.objects.create_user(
+            "S-0002", "reader@example.com", "pw-12345678",
+            first_name="Rea", last_name="Der", course=course,
+        )
+        subject = Subject.objects.create(name="Programming", course=course)
+
+        # Three notes share a timestamp, so pages must break ties on id.
+        now = timezone.now()
+        cls.notes = []
+        for i, age in enumerate([0, 1, 1, 1, 2, 3, 4]):
+            note = Note.objects.create(
+                title=f"Note {i}", uploader=cls.student, subject=subject,
+                visibility=Note.VISIBILITY_PUBLIC, is_approved=True,
+            )
+            Note.objects.filter(pk=note.pk).update(
+                uploaded_at=now - timedelta(days=age)
+            )
+            cls.notes.append(note)
+        Note.objects.create(
+            title="Pending", uploader=cls.student, subject=subject,
+        )
+
+        liked = cls.notes[2]
+        NoteLike.objects.create(note=liked, user=cls.student)
+        NoteLike.objects.create(note=liked, user=cls.reader)
+        NoteSave.objects.create(note=liked, user=cls.reader)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def get(self, **params):
+        response = self.client.get("/api/notes/student/dashboard/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_pages_cover_the_feed_once_newest_first(self):
+        titles, cursor = [], None
+        while True:
+            page = self.get(page_size=2, **({"cursor": cursor} if cursor else {}))
+            self.assertLessEqual(len(page["notes"]), 2)
+            titles += [note["title"] for note in page["notes"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        expected = sorted(
+            Note.objects.filter(is_approved=True),
+            key=lambda note: (note.uploaded_at, note.pk),
+            reverse=True,
+        )
+        self.assertEqual(titles, [note.title for note in expected])
+
+    def test_counts_and_saved_flag_come_with_the_page(self):
+        page = self.get()
+        liked = next(n for n in page["notes"] if n["id"] == self.notes[2].pk)
+        self.assertEqual((liked["likes_count"], liked["saves_count"]), (2, 1))
+        self.assertEqual(
+            [n["title"] for n in page["notes"] if n["is_saved"]], ["Note 2"]
+        )
+        self.assertEqual(
+            (page["my_notes"], page["approved"], page["pending"]), (0, 0, 0)
+        )
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.get()  # warms the per-user counts
+
+        with CaptureQueriesContext(connection) as small:
+            self.get(page_size=1)
+        with CaptureQueriesContext(connection) as large:
+            self.get(page_size=50)
+        self.assertEqual(len(small), len(large))
+
+    def test_bad_cursor_is_a_400(self):
+        response = self.client.get(
+            "/api/notes/student/dashboard/", {"cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+# ======================================================
+# COMMENT TREES
+# ======================================================
+@override_settings(NOTES_COMMENT_MAX_DEPTH=3)
+class CommentTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.note = Note.objects.create(
+            title="Thread",
+            uploader=cls.student,
+            subject=Subject.objects.create(name="Programming", course=course),
+            visibility=Note.VISIBILITY_PUBLIC,
+            is_approved=True,
+        )
+
+        # One 6-deep chain plus a wide layer of replies to its root.
+        parent = None
+        for i in range(6):
+            parent = Comment.objects.create(
+                note=cls.note, user=cls.student,
+                content=f"level {i}", parent=parent,
+            )
+        cls.root = Comment.objects.get(content="level 0")
+        for i in range(40):
+            Comment.objects.create(
+                note=cls.note, user=cls.student,
+                content=f"reply {i}", parent=cls.root,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_thread_and_depth_follow_parent(self):
+        deepest = Comment.objects.get(content="level 5")
+        self.assertEqual(deepest.thread_id, self.root.pk)
+        self.assertEqual(deepest.depth, 5)
+        self.assertIsNone(self.root.thread_id)
+
+    def replies(self, comment):
+        return self.client.get(f"/api/notes/comments/{comment.pk}/replies/")
+
+    def test_thread_loads_without_per_comment_queries(self):
+        # Comment, note authorization, the levels shown, then the count of
+        # replies below the last of them.
+        with self.assertNumQueries(4):
+            response = self.replies(self.root)
+        self.assertEqual(len(response.json()["replies"]), 41)
+
+    def test_deep_replies_become_stubs(self):
+        node = {"replies": self.replies(self.root).json()["replies"]}
+        for _ in range(2):
+            node = next(
+                r for r in node["replies"]
+                if r["replies"] or r["more_replies"]
+            )
+        self.assertEqual(node["content"], "level 2")
+        self.assertEqual(node["replies"], [])
+        self.assertEqual(node["more_replies"], 3)
+
+        # Expanding the stub counts the cap from that comment.
+        stub = Comment.objects.get(content="level 2")
+        level_3 = self.replies(stub).json()["replies"][0]
+        self.assertEqual(level_3["content"], "level 3")
+        self.assertEqual(level_3["replies"][0]["content"], "level 4")
+
+    def test_subtree_loads_only_its_own_shown_levels(self):
+        level_1 = Comment.objects.get(content="level 1")
+        Comment.objects.create(
+            note=self.note, user=self.student, content="aside",
+            parent=Comment.objects.get(content="reply 0"),
+        )
+
+        tree = comment_tree.for_subtree(level_1)
+        # Not the root's other replies, nor levels 4 and 5 past the cap.
+        self.assertEqual(
+            [c.content for c in tree.comments],
+            ["level 1", "level 2", "level 3"],
+        )
+        level_3 = tree.comments[-1]
+        self.assertEqual(tree.more_replies(level_3), 2)
+        self.assertEqual(tree.replies(level_3), [])
+
+    def test_top_level_pages(self):
+        for i in range(4):
+            Comment.objects.create(
+                note=self.note, user=self.student, content=f"top {i}",
+            )
+        url = f"/api/notes/notes/{self.note.pk}/comments/?page_size=3"
+
+        with self.assertNumQueries(2):
+            first = self.client.get(url).json()
+        self.assertEqual(
+            [c["content"] for c in first["comments"]],
+            ["top 3", "top 2", "top 1"],
+        )
+
+        second = self.client.get(
+            f"{url}&cursor={first['next_cursor']}"
+        ).json()
+        self.assertEqual(
+            [(c["content"], c["reply_count"]) for c in second["comments"]],
+            [("top 0", 0), ("level 0", 45)],
+        )
+        self.assertIsNone(second["next_cursor"])
+
+
+# ======================================================
+# VISIBILITY
+# ======================================================
+# Who may browse (feed) and open (readable) which notes, per role.
+# Students open what their feed lists; anonymous visitors only ever see
+# public notes; moderators outside their course only see their scope.
+class VisibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        it = Course.objects.create(name="BSIT")
+        ed = Course.objects.create(name="BSED")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=it,
+        )
+        cls.uploader = CustomUser.objects.create_user(
+            "S-0002", "uploader@example.com", "pw-12345678",
+            first_name="Up", last_name="Loader", course=ed,
+        )
+        cls.moderator = CustomUser.objects.create_user(
+            "M-0001", "moderator@example.com", "pw-12345678",
+            first_name="Mo", last_name="Derator", course=it,
+            role=CustomUser.Role.MODERATOR,
+        )
+        cls.other_moderator = CustomUser.objects.create_user(
+            "M-0002", "other@example.com", "pw-12345678",
+            first_name="Ot", last_name="Her", course=ed,
+            role=CustomUser.Role.MODERATOR,
+        )
+        cls.admin = CustomUser.objects.create_user(
+            "A-0001", "admin@example.com", "pw-12345678",
+            first_name="Ad", last_name="Min", role=CustomUser.Role.ADMIN,
+        )
+
+        programming = Subject.objects.create(name="Programming", course=it)
+        teaching = Subject.objects.create(name="Teaching", course=ed)
+        ethics = Subject.objects.create(name="Ethics")  # general
+
+        cls.notes = {}
+        for title, subject, fields in [
+            ("Public", programming, {"visibility": Note.VISIBILITY_PUBLIC}),
+            ("School", programming, {"visibility": Note.VISIBILITY_SCHOOL}),
+            ("IT course", programming, {"visibility": Note.VISIBILITY_COURSE}),
+            ("ED course", teaching, {"visibility": Note.VISIBILITY_COURSE}),
+            ("General", ethics, {"visibility": Note.VISIBILITY_COURSE}),
+            ("Pending", programming, {"is_approved": False}),
+            ("Deleted", programming, {"is_deleted": True}),
+        ]:
+            cls.notes[title] = Note.objects.create(
+                title=title, uploader=cls.uploader, subject=subject,
+                **{"visibility": Note.VISIBILITY_PUBLIC, "is_approved": True,
+                   **fields},
+            )
+
+    def titles(self, queryset):
+        return set(queryset.values_list("title", flat=True))
+
+    def test_feed_by_role(self):
+        approved = {"Public", "School", "IT course", "ED course", "General"}
+        expected = {
+            None: {"Public"},
+            self.student: {"Public", "School", "IT course", "General"},
+            self.uploader: {"Public", "School", "ED course", "General"},
+            self.moderator: {"Public", "School", "IT course", "General"},
+            self.other_moderator: {"ED course", "General"},
+            self.admin: approved,
+        }
+        for user, titles in expected.items():
+            with self.subTest(user=user):
+                self.assertEqual(self.titles(visibility.feed(user)), titles)
+
+    def test_readable_by_role(self):
+        live = {"Public", "School", "IT course", "ED course", "General", "Pending"}
+        expected = {
+            None: {"Public"},
+            self.student: {"Public", "School", "IT course", "General"},
+            # Their own uploads, approved or not, in any course.
+            self.uploader: live,
+            # Plus everything in their scope awaiting review.
+            self.moderator: {"Public", "School", "IT course", "General", "Pending"},
+            self.other_moderator: {"Public", "ED course", "General"},
+            self.admin: live,
+        }
+        for user, titles in expected.items():
+            with self.subTest(user=user):
+                self.assertEqual(self.titles(visibility.readable(user)), titles)
+                for title, note in self.notes.items():
+                    self.assertEqual(
+                        note.can_view(user or AnonymousUser()), title in titles
+                    )
+
+    def test_detail_is_a_404_for_hidden_notes(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        for title, status_code in [
+            ("School", 200),
+            ("IT course", 200),
+            ("ED course", 404),
+            ("Pending", 404),
+            ("Deleted", 404),
+        ]:
+            with self.subTest(title=title):
+                response = client.get(f"/api/notes/notes/{self.notes[title].pk}/")
+                self.assertEqual(response.status_code, status_code)
+
+    def test_public_notes_api_shows_anonymous_visitors_public_notes(self):
+        request = APIRequestFactory().get("/api/notes/public/")
+        response = api_views.public_notes_api(request)
+        notes = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([note["title"] for note in notes], ["Public"])
+
+
+# ======================================================
+# FULL-TEXT SEARCH
+# ======================================================
+class NoteSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        it = Course.objects.create(name="BSIT")
+        ed = Course.objects.create(name="BSED")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=it,
+        )
+        programming = Subject.objects.create(name="Programming", course=it)
+        teaching = Subject.objects.create(name="Teaching", course=ed)
+
+        filler = "Lecture notes on loops, arrays and functions. " * 20
+        cls.notes = {}
+        for title, subject, fields in [
+            ("Recursion basics", programming, {}),
+            ("Week 3", programming, {"description": "Recursion and stacks"}),
+            ("Week 4", programming, {"content": filler + "Recursion again."}),
+            ("School only", programming, {
+                "description": "Recursion for everyone at school",
+                "visibility": Note.VISIBILITY_SCHOOL,
+            }),
+            ("Other course", teaching, {
+                "description": "Recursion in lesson plans",
+                "visibility": Note.VISIBILITY_COURSE,
+            }),
+            ("Pending", programming, {
+                "description": "Recursion draft", "is_approved": False,
+            }),
+            ("Deleted", programming, {
+                "description": "Recursion removed", "is_deleted": True,
+            }),
+        ]:
+            cls.notes[title] = Note.objects.create(
+                title=title, uploader=cls.student, subject=subject,
+                **{"visibility": Note.VISIBILITY_PUBLIC, "is_approved": True,
+                   **fields},
+            )
+
+    def setUp(self):
+        if search.backend() is None:
+            self.skipTest(f"no search index on {connection.vendor}")
+
+    def search(self, q, user=None, **params):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        response = client.get("/api/notes/search/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def titles(self, q, user=None, **params):
+        return [note["title"] for note in self.search(q, user, **params)["notes"]]
+
+    def test_title_matches_rank_above_description_and_body(self):
+        self.assertEqual(
+            self.titles("recursion"),
+            ["Recursion basics", "Week 3", "Week 4"],
+        )
+
+    def test_results_are_scoped_to_what_the_caller_may_browse(self):
+        results = self.search("recursion", self.student)
+        self.assertEqual(
+            {note["title"] for note in results["notes"]},
+            {"Recursion basics", "Week 3", "Week 4", "School only"},
+        )
+        # The count is scoped too, not just the page.
+        self.assertEqual(results["count"], 4)
+        self.assertEqual(self.search("recursion")["count"], 3)
+
+    def test_terms_are_prefixes_and_all_must_match(self):
+        self.assertEqual(self.titles("recur stack"), ["Week 3"])
+        self.assertEqual(self.titles("recursion giraffe"), [])
+
+    def test_pages(self):
+        page = self.search("recursion", page=2, page_size=1)
+        self.assertEqual(
+            ([note["title"] for note in page["notes"]], page["count"]),
+            (["Week 3"], 3),
+        )
+
+    def test_query_syntax_in_input_is_searched_as_text(self):
+        for q in ['"recursion', "recursion OR NOT", "title:week*", "(^)"]:
+            with self.subTest(q=q):
+                self.search(q)
+        self.assertEqual(self.search("")["notes"], [])
+
+    def test_index_follows_edits_and_deletes(self):
+        note = self.notes["Week 3"]
+        note.description = "Trees and graphs"
+        note.save()
+        self.assertEqual(self.titles("stacks"), [])
+        self.assertEqual(self.titles("graphs"), ["Week 3"])
+
+        # Saves that do not touch indexed text skip the index.
+        with CaptureQueriesContext(connection) as ctx:
+            note.save(update_fields=["downloads"])
+        self.assertFalse(
+            [q for q in ctx.captured_queries if search.TABLE in q["sql"]]
+        )
+
+        pk = note.pk
+        note.delete()
+        column = "rowid" if search.backend() == "sqlite" else "note_id"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {search.TABLE} WHERE {column} = %s", [pk]
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+# ======================================================
+# BULK MODERATION
+# ======================================================
+class BulkModerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        other = Course.objects.create(name="BSED")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.moderator = CustomUser.objects.create_user(
+            "M-0001", "moderator@example.com", "pw-12345678",
+            first_name="Mo", last_name="Derator", course=course,
+            role=CustomUser.Role.MODERATOR,
+        )
+        mine = Subject.objects.create(name="Programming", course=course)
+        theirs = Subject.objects.create(name="Pedagogy", course=other)
+
+        cls.in_scope = [
+            Note.objects.create(
+                title=f"Note {i}", uploader=cls.student, subject=mine,
+            ).pk
+            for i in range(30)
+        ]
+        cls.out_of_scope = Note.objects.create(
+            title="Elsewhere", uploader=cls.student, subject=theirs,
+        ).pk
+
+    def moderate(self, ids, decision, **extra):
+        client = APIClient()
+        client.force_authenticate(self.moderator)
+        return client.post(
+            "/api/notes/moderate/",
+            {"ids": ids, "decision": decision, **extra},
+            format="json",
+        )
+
+    def rollups(self):
+        return sorted(
+            NoteDailyStat.objects.filter(notes__gt=0).values_list(
+                "day", "subject_id", "is_deleted", "is_approved",
+                "is_rejected", "notes",
+            )
+        )
+
+    def test_results_per_id(self):
+        self.moderate(self.in_scope[:1], "approve")
+
+        response = self.moderate(
+            self.in_scope[:3] + [self.out_of_scope], "reject", reason="Dup",
+        )
+        self.assertEqual(response.json()["updated"], 3)
+        self.assertEqual(
+            [r["result"] for r in response.json()["results"]],
+            ["rejected", "rejected", "rejected", "not_found"],
+        )
+
+        again = self.moderate(self.in_scope[:1], "reject")
+        self.assertEqual(again.json()["results"][0]["result"], "unchanged")
+        self.assertEqual(
+            Note.objects.get(pk=self.in_scope[0]).rejection_reason, "Dup"
+        )
+
+    def test_writes_do_not_grow_with_batch_size(self):
+        # The first approval creates the rollup row both batches update.
+        self.moderate(self.in_scope[:1], "approve")
+
+        with CaptureQueriesContext(connection) as small:
+            self.moderate(self.in_scope[1:3], "approve")
+        with CaptureQueriesContext(connection) as large:
+            self.moderate(self.in_scope[3:], "approve")
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(
+            NoteAction.objects.filter(action="approved").count(), 30
+        )
+
+    def test_rollups_match_a_rebuild(self):
+        self.moderate(self.in_scope[:10], "approve")
+        self.moderate(self.in_scope[5:20], "reject", reason="Off-topic")
+
+        incremental = self.rollups()
+        stats.rebuild()
+        self.assertEqual(incremental, self.rollups())
+
+
+# ======================================================
+# DASHBOARD STATISTICS
+# ======================================================
+LOCAL_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(EMAIL_OUTBOX_WORKER=False, CACHES=LOCAL_CACHE)
+class DashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.admin = CustomUser.objects.create_superuser(
+            "A-0001", "admin@example.com", "pw-12345678",
+        )
+        programming = Subject.objects.create(name="Programming", course=course)
+        databases = Subject.objects.create(name="Databases", course=course)
+
+        now = timezone.now()
+        cls.notes = []
+        for i, (subject, age, fields) in enumerate([
+            (programming, 0, {"is_approved": True}),
+            (programming, 0, {}),
+            (programming, 1, {"is_rejected": True}),
+            (databases, 1, {"is_approved": True}),
+            (databases, 10, {"is_approved": True}),
+            (databases, 10, {"is_deleted": True}),
+        ]):
+            note = Note.objects.create(
+                title=f"Note {i}", uploader=cls.student, subject=subject,
+                **fields,
+            )
+            Note.objects.filter(pk=note.pk).update(
+                uploaded_at=now - timedelta(days=age)
+            )
+            cls.notes.append(note)
+        # update() bypasses the signals; roll the backdated notes up again.
+        stats.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def dashboard(self, **params):
+        response = self.client.get("/api/notes/admin/dashboard/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_figures_match_the_notes_table(self):
+        live = Note.objects.filter(is_deleted=False)
+        data = self.dashboard(days=0)
+        self.assertEqual(data["stats"], {
+            "total_users": CustomUser.objects.count(),
+            "total_notes": live.count(),
+            "pending_notes": live.filter(is_approved=False, is_rejected=False).count(),
+            "approved_notes": live.filter(is_approved=True).count(),
+            "rejected_notes": Note.objects.filter(is_rejected=True).count(),
+        })
+        self.assertEqual(
+            data["uploads_by_subject"],
+            [{"subject": "Programming", "notes": 3},
+             {"subject": "Databases", "notes": 2}],
+        )
+        self.assertEqual(
+            [day["notes"] for day in data["uploads_per_day"]], [1, 2, 2]
+        )
+
+    def test_window_limits_the_daily_series(self):
+        self.assertEqual(len(self.dashboard(days=3)["uploads_per_day"]), 2)
+        self.assertEqual(len(self.dashboard(days=0)["uploads_per_day"]), 3)
+        # Totals always cover all history.
+        self.assertEqual(self.dashboard(days=3)["stats"]["total_notes"], 5)
+
+    def test_repeat_reads_are_cached_until_moderation_changes(self):
+        self.dashboard()
+        with self.assertNumQueries(0):
+            self.dashboard()
+
+        pending = self.notes[1]
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            moderation.moderate(self.admin, [pending.pk], moderation.APPROVE)
+        # Until the change commits, readers keep the old figures.
+        self.assertEqual(self.dashboard()["stats"]["pending_notes"], 1)
+
+        for callback in callbacks:
+            callback()
+        stats_now = self.dashboard()["stats"]
+        self.assertEqual(
+            (stats_now["pending_notes"], stats_now["approved_notes"]), (0, 4)
+        )
+
+    def test_note_lifecycle_moves_the_rollups(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            note = Note.objects.create(
+                title="New", uploader=self.student, subject=self.notes[0].subject,
+            )
+        self.assertEqual(self.dashboard()["stats"]["pending_notes"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            note.is_rejected = True
+            note.save()
+        data = self.dashboard()["stats"]
+        self.assertEqual((data["pending_notes"], data["rejected_notes"]), (1, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            note.delete()
+        data = self.dashboard()["stats"]
+        self.assertEqual((data["total_notes"], data["rejected_notes"]), (5, 1))
+
+    def test_rebuild_command_repairs_drift(self):
+        expected = self.dashboard(days=0)
+        NoteDailyStat.objects.update(notes=7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_note_stats", stdout=io.StringIO())
+        self.assertEqual(self.dashboard(days=0), expected)
+
+
+@override_settings(EMAIL_OUTBOX_WORKER=False, CACHES=LOCAL_CACHE)
+class UserNoteCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.classmate = CustomUser.objects.create_user(
+            "S-0002", "classmate@example.com", "pw-12345678",
+            first_name="Class", last_name="Mate", course=course,
+        )
+        cls.subject = Subject.objects.create(name="Programming", course=course)
+        cls.notes = [
+            Note.objects.create(
+                title=f"Note {i}", uploader=cls.student, subject=cls.subject,
+                **fields,
+            )
+            for i, fields in enumerate([
+                {"is_approved": True},
+                {"is_approved": True},
+                {},
+                {"is_rejected": True},
+                {"is_approved": True, "is_deleted": True},
+            ])
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_buckets_come_from_one_query_then_the_cache(self):
+        with self.assertNumQueries(1):
+            counts = stats.user_note_counts(self.student)
+        self.assertEqual(counts, {
+            "uploaded": 5, "my_notes": 4,
+            "approved": 2, "pending": 1, "rejected": 1,
+        })
+        with self.assertNumQueries(0):
+            stats.user_note_counts(self.student)
+
+    def test_own_note_changes_refresh_the_counts(self):
+        stats.user_note_counts(self.student)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moderation.moderate(
+                CustomUser.objects.create_superuser(
+                    "A-0001", "admin@example.com", "pw-12345678",
+                ),
+                [self.notes[2].pk],
+                moderation.APPROVE,
+            )
+        self.assertEqual(stats.user_note_counts(self.student)["pending"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notes[0].is_deleted = True
+            self.notes[0].save()
+        counts = stats.user_note_counts(self.student)
+        self.assertEqual((counts["my_notes"], counts["approved"]), (3, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notes[3].delete()
+        counts = stats.user_note_counts(self.student)
+        self.assertEqual((counts["uploaded"], counts["rejected"]), (4, 0))
+
+    def test_other_uploads_keep_the_cache(self):
+        stats.user_note_counts(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.create(
+                title="Theirs", uploader=self.classmate, subject=self.subject,
+            )
+        with self.assertNumQueries(0):
+            stats.user_note_counts(self.student)
+
+    def test_dashboard_and_profile_report_the_counts(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+
+        dashboard = client.get("/api/notes/student/dashboard/").json()
+        self.assertEqual(
+            [dashboard[k] for k in ("my_notes", "approved", "pending", "rejected")],
+            [4, 2, 1, 1],
+        )
+        profile = client.get("/api/accounts/profile/").json()
+        self.assertEqual(profile["notes_count"], 5)
+
+
+# ======================================================
+# REVIEW QUEUE
+# ======================================================
+class ReviewQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        subject = Subject.objects.create(name="Programming", course=course)
+        student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.reviewers = [
+            CustomUser.objects.create_user(
+                f"M-000{i}", f"moderator{i}@example.com", "pw-12345678",
+                first_name="Mo", last_name="Derator", course=course,
+                role=CustomUser.Role.MODERATOR,
+            )
+            for i in range(2)
+        ]
+        cls.notes = [
+            Note.objects.create(
+                title=f"Note {i}", uploader=student, subject=subject,
+            ).pk
+            for i in range(6)
+        ]
+
+    def claim(self, reviewer, count):
+        client = APIClient()
+        client.force_authenticate(reviewer)
+        response = client.post(
+            "/api/notes/review-queue/claim/", {"count": count}, format="json"
+        )
+        return [note["id"] for note in response.json()["notes"]]
+
+    def test_claims_do_not_overlap(self):
+        first, second = self.reviewers
+        self.assertEqual(self.claim(first, 4), self.notes[:4])
+        self.assertEqual(self.claim(second, 4), self.notes[4:])
+        # Claiming again keeps (and renews) what is already held.
+        self.assertEqual(self.claim(first, 4), self.notes[:4])
+
+    def test_expired_leases_return_to_the_queue(self):
+        first, second = self.reviewers
+        self.claim(first, 6)
+        Note.objects.update(review_lease_until=timezone.now())
+
+        self.assertEqual(self.claim(second, 2), self.notes[:2])
+
+    def test_moderating_ends_the_lease(self):
+        first, second = self.reviewers
+        self.claim(first, 1)
+        moderation.moderate(first, self.notes[:1], moderation.APPROVE)
+
+        note = Note.objects.get(pk=self.notes[0])
+        self.assertIsNone(note.review_claimed_by_id)
+        self.assertEqual(self.claim(second, 1), self.notes[1:2])
+
+    def test_notes_leased_to_another_reviewer_cannot_be_decided(self):
+        first, second = self.reviewers
+        self.claim(first, 2)
+        client = APIClient()
+        client.force_authenticate(second)
+
+        response = client.post(f"/api/notes/approve/{self.notes[0]}/")
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Note.objects.get(pk=self.notes[0]).is_approved)
+
+        results = moderation.moderate(
+            second, self.notes[1:3], moderation.REJECT
+        )
+        self.assertEqual(results, {
+            self.notes[1]: moderation.LEASED,
+            self.notes[2]: moderation.REJECTED,
+        })
+
+        # An expired lease no longer blocks anyone.
+        Note.objects.update(review_lease_until=timezone.now())
+        response = client.post(f"/api/notes/approve/{self.notes[0]}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_form_endpoints_report_leased_and_unchanged_notes(self):
+        first, _ = self.reviewers
+        admin = CustomUser.objects.create_superuser(
+            "A-0001", "admin@example.com", "pw-12345678",
+        )
+        self.claim(first, 1)
+        factory = RequestFactory()
+
+        def approve(pk):
+            request = factory.post(f"/notes/{pk}/approve/")
+            request.user = admin
+            response = views.approve_note(request, pk)
+            return response.status_code, json.loads(response.content)
+
+        status_code, data = approve(self.notes[0])
+        self.assertEqual((status_code, data["success"]), (409, False))
+        self.assertFalse(Note.objects.get(pk=self.notes[0]).is_approved)
+
+        self.assertEqual(approve(self.notes[1]), (200, {"success": True}))
+        status_code, data = approve(self.notes[1])
+        self.assertEqual((status_code, data["success"]), (200, False))
+
+    def test_pending_list_hides_notes_leased_to_others(self):
+        first, second = self.reviewers
+        self.claim(first, 2)
+        client = APIClient()
+
+        client.force_authenticate(second)
+        ids = [note["id"] for note in client.get("/api/notes/pending/").json()]
+        self.assertCountEqual(ids, self.notes[2:])
+
+        client.force_authenticate(first)
+        ids = [note["id"] for note in client.get("/api/notes/pending/").json()]
+        self.assertCountEqual(ids, self.notes)
+
+
+@override_settings(EMAIL_OUTBOX_WORKER=False)
+class ReviewEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        other = Course.objects.create(name="BSED")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.moderator = CustomUser.objects.create_user(
+            "M-0001", "moderator@example.com", "pw-12345678",
+            first_name="Mo", last_name="Derator", course=course,
+            role=CustomUser.Role.MODERATOR,
+        )
+        cls.mine = Subject.objects.create(name="Programming", course=course)
+        cls.theirs = Subject.objects.create(name="Pedagogy", course=other)
+
+    def setUp(self):
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        for group in review_events.groups_for_reviewer(self.moderator):
+            async_to_sync(self.layer.group_add)(group, self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.layer.flush)()
+
+    def receive_all(self):
+        return async_to_sync(self._receive_all)()
+
+    async def _receive_all(self):
+        messages = []
+        while True:
+            try:
+                messages.append(await asyncio.wait_for(
+                    self.layer.receive(self.channel), timeout=0.05
+                ))
+            except asyncio.TimeoutError:
+                return messages
+
+    def events(self):
+        return [
+            event["event"]
+            for message in self.receive_all()
+            for event in message["events"]
+        ]
+
+    def test_state_changes(self):
+        pending = (False, False, False)
+        approved = (False, True, False)
+        rejected = (False, False, True)
+        deleted = (True, False, False)
+
+        self.assertEqual(review_events.change(None, pending), "submitted")
+        self.assertEqual(review_events.change(rejected, pending), "submitted")
+        self.assertEqual(review_events.change(pending, approved), "approved")
+        self.assertEqual(review_events.change(approved, rejected), "rejected")
+        self.assertEqual(review_events.change(pending, deleted), "removed")
+        self.assertEqual(review_events.change(pending, None), "removed")
+        self.assertIsNone(review_events.change(approved, None))
+        self.assertIsNone(review_events.change(pending, pending))
+
+    def test_events_reach_reviewers_of_the_course(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mine = Note.objects.create(
+                title="Mine", uploader=self.student, subject=self.mine,
+            )
+            Note.objects.create(
+                title="Theirs", uploader=self.student, subject=self.theirs,
+            )
+        self.assertEqual(self.events(), ["submitted"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mine.delete()
+        self.assertEqual(self.events(), ["removed"])
+
+    def test_general_subjects_of_a_course_arrive_once(self):
+        general = Subject.objects.create(
+            name="Ethics", course=self.mine.course, is_general=True,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.create(
+                title="Shared", uploader=self.student, subject=general,
+            )
+        self.assertEqual(self.events(), ["submitted"])
+
+    def forwarded(self, user, message):
+        consumer = consumers.ReviewConsumer()
+        consumer.scope = {"user": user}
+        sent = []
+        consumer._enqueue = sent.append
+        async_to_sync(consumer.review_events)(message)
+        return [(p["event"], p["note"]["title"]) for p in sent]
+
+    def test_submissions_leased_to_another_reviewer_are_held_back(self):
+        colleague = CustomUser.objects.create_user(
+            "M-0002", "colleague@example.com", "pw-12345678",
+            first_name="Col", last_name="League", course=self.mine.course,
+            role=CustomUser.Role.MODERATOR,
+        )
+        note = Note.objects.create(
+            title="Leased", uploader=self.student, subject=self.mine,
+            is_rejected=True,
+        )
+        Note.objects.filter(pk=note.pk).update(
+            review_claimed_by=colleague,
+            review_lease_until=timezone.now() + timedelta(minutes=5),
+        )
+        note.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            note.is_rejected = False
+            note.save()
+        [message] = self.receive_all()
+
+        self.assertEqual(self.forwarded(self.moderator, message), [])
+        self.assertEqual(
+            self.forwarded(colleague, message), [("submitted", "Leased")]
+        )
+
+        # Once the lease runs out the note is anyone's again.
+        with mock.patch.object(
+            consumers.timezone, "now",
+            return_value=timezone.now() + timedelta(minutes=10),
+        ):
+            self.assertEqual(
+                self.forwarded(self.moderator, message), [("submitted", "Leased")]
+            )
+
+    def test_bulk_moderation_sends_one_message(self):
+        ids = [
+            Note.objects.create(
+                title=f"Note {i}", uploader=self.student, subject=self.mine,
+            ).pk
+            for i in range(5)
+        ]
+        self.receive_all()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moderation.moderate(self.moderator, ids, moderation.APPROVE)
+
+        messages = self.receive_all()
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(
+            [event["event"] for event in messages[0]["events"]],
+            ["approved"] * 5,
+        )
+
+
+@override_settings(
+    EMAIL_OUTBOX_WORKER=False,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class PublicCatalogueCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.admin = CustomUser.objects.create_user(
+            "A-0001", "admin@example.com", "pw-12345678",
+            first_name="Ad", last_name="Min", role=CustomUser.Role.ADMIN,
+        )
+        cls.subject = Subject.objects.create(name="Programming", course=course)
+        cls.public = Note.objects.create(
+            title="Public", uploader=cls.student, subject=cls.subject,
+            visibility=Note.VISIBILITY_PUBLIC, is_approved=True,
+        )
+        cls.pending = Note.objects.create(
+            title="Pending", uploader=cls.student, subject=cls.subject,
+            visibility=Note.VISIBILITY_PUBLIC,
+        )
+        cls.school = Note.objects.create(
+            title="School", uploader=cls.student, subject=cls.subject,
+            visibility=Note.VISIBILITY_SCHOOL, is_approved=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self):
+        response = APIClient().get("/api/notes/public/")
+        return [note["title"] for note in response.json()["notes"]]
+
+    def test_hits_skip_the_database(self):
+        first = APIClient().get("/api/notes/public/")
+        with self.assertNumQueries(0):
+            second = APIClient().get("/api/notes/public/")
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second["Content-Type"], "application/json")
+
+    def test_unread_query_parameters_share_the_entry(self):
+        APIClient().get("/api/notes/public/")
+        with self.assertNumQueries(0):
+            APIClient().get("/api/notes/public/?utm_source=mail&_=1")
+
+        # The format still picks its own entry.
+        response = APIClient().get("/api/notes/public/?format=msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+
+    def test_public_changes_invalidate(self):
+        self.assertEqual(self.titles(), ["Public"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            moderation.moderate(self.admin, [self.pending.pk], moderation.APPROVE)
+        self.assertEqual(self.titles(), ["Pending", "Public"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.public.title = "Renamed"
+            self.public.save()
+        self.assertEqual(self.titles(), ["Pending", "Renamed"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.public.visibility = Note.VISIBILITY_SCHOOL
+            self.public.save(update_fields=["visibility"])
+        self.assertEqual(self.titles(), ["Pending"])
+
+    def test_private_changes_keep_the_cache(self):
+        self.titles()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.school.title = "Still school"
+            self.school.save()
+        self.assertEqual(callbacks, [])
+
+    def test_subject_and_course_changes_invalidate(self):
+        client = APIClient()
+        client.get("/api/subjects/public/")
+        client.get("/api/subjects/courses/public/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subject.name = "Databases"
+            self.subject.save()
+            Course.objects.create(name="BSED")
+
+        subjects = client.get("/api/subjects/public/").json()
+        courses = client.get("/api/subjects/courses/public/").json()
+        self.assertEqual([s["name"] for s in subjects], ["Databases"])
+        self.assertEqual([c["name"] for c in courses], ["BSED", "BSIT"])
+
+    def test_rebuild_in_progress_serves_the_previous_body(self):
+        self.titles()
+        Note.objects.filter(pk=self.public.pk).update(title="Quietly renamed")
+
+        clock = time.time
+        later = SimpleNamespace(
+            time=lambda: clock() + 3600,
+            monotonic=time.monotonic,
+            sleep=time.sleep,
+        )
+        with mock.patch.object(response_cache, "time", later):
+            # Another worker holds the rebuild lock.
+            with mock.patch.object(response_cache.cache, "add", return_value=False):
+                self.assertEqual(self.titles(), ["Public"])
+            self.assertEqual(self.titles(), ["Quietly renamed"])
+
+
+class NoteRowSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        subject = Subject.objects.create(name="Programming", course=course)
+        for i, state in enumerate([
+            {"is_approved": True},
+            {"is_rejected": True, "rejection_reason": "Blurry scan"},
+            {},
+        ]):
+            Note.objects.create(
+                title=f"Note {i}", description="Ünïcode ✓",
+                uploader=cls.student, subject=subject, **state,
+            )
+        Note.objects.filter(title="Note 0").update(
+            file="files/ab/cd/abcd.pdf", likes_count=3, downloads=7,
+        )
+        NoteSave.objects.create(
+            user=cls.student, note=Note.objects.get(title="Note 1")
+        )
+
+    def request(self, user):
+        raw = APIRequestFactory().get("/api/notes/")
+        request = Request(raw)
+        request.user = user
+        return request
+
+    def test_payload_matches_admin_note_serializer(self):
+        notes = Note.objects.order_by("-uploaded_at", "-id")
+        for context in (
+            {},
+            {"request": self.request(self.student)},
+            {"saved_note_ids": {notes[0].pk}},
+        ):
+            with self.subTest(context=sorted(context)):
+                expected = AdminNoteSerializer(notes, many=True, context=context)
+                actual = NoteRowSerializer(notes, many=True, context=context)
+                self.assertEqual(
+                    JSONRenderer().render(actual.data),
+                    JSONRenderer().render(expected.data),
+                )
+
+    def test_two_queries_for_rows_and_saves(self):
+        notes = Note.objects.order_by("-uploaded_at")
+        context = {"request": self.request(self.student)}
+        with self.assertNumQueries(2):
+            data = NoteRowSerializer(notes, many=True, context=context).data
+        self.assertEqual(
+            [note["is_saved"] for note in data], [False, True, False]
+        )
+
+
+# ======================================================
+# SOCKET BATCHING
+# ======================================================
+class CountingConsumer(consumers.BatchingConsumer):
+    """
+    Queues the number of events each message asks for; `delay` stands in
+    for a client that takes its time reading frames.
+    """
+    delay = 0
+
+    async def connect(self):
+        await self.accept()
+        self._start_batching()
+
+    async def disconnect(self, close_code):
+        self._stop_batching()
+
+    async def receive(self, text_data):
+        for n in range(int(text_data)):
+            self._enqueue({"event": "count", "n": n})
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(self.delay)
+        await super().send(*args, **kwargs)
+
+
+@skipIf(WebsocketCommunicator is None, "channels.testing is unavailable")
+class BatchingConsumerTests(TestCase):
+    async def connect(self, consumer=CountingConsumer):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), "/ws/count/")
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_events_in_one_window_share_a_frame(self):
+        communicator = await self.connect()
+
+        await communicator.send_to("3")
+        frame = await communicator.receive_json_from()
+        self.assertEqual(frame["event"], "batch")
+        self.assertEqual([event["n"] for event in frame["events"]], [0, 1, 2])
+
+        # A lone event keeps its own shape.
+        await communicator.send_to("1")
+        self.assertEqual(
+            await communicator.receive_json_from(), {"event": "count", "n": 0}
+        )
+        await communicator.disconnect()
+
+    @mock.patch.object(consumers, "MAX_PENDING", 5)
+    async def test_falling_too_far_behind_closes_the_socket(self):
+        communicator = await self.connect()
+
+        await communicator.send_to("6")
+        self.assertEqual(
+            await communicator.receive_output(),
+            {"type": "websocket.close", "code": consumers.CLOSE_TOO_SLOW},
+        )
+        await communicator.disconnect()
+
+    @mock.patch.object(consumers, "SEND_TIMEOUT", 0.05)
+    async def test_a_stalled_send_closes_the_socket(self):
+        stalled = type("StalledConsumer", (CountingConsumer,), {"delay": 1})
+        communicator = await self.connect(stalled)
+
+        await communicator.send_to("1")
+        self.assertEqual(
+            await communicator.receive_output(),
+            {"type": "websocket.close", "code": consumers.CLOSE_TOO_SLOW},
+        )
+        await communicator.disconnect()
+
+
+# ======================================================
+# ENGAGEMENT COUNTERS
+# ======================================================
+class EngagementCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.reader = CustomUser.objects.create_user(
+            "S-0002", "reader@example.com", "pw-12345678",
+            first_name="Rea", last_name="Der", course=course,
+        )
+        cls.critic = CustomUser.objects.create_user(
+            "S-0003", "critic@example.com", "pw-12345678",
+            first_name="Cri", last_name="Tic", course=course,
+        )
+        cls.note = Note.objects.create(
+            title="Lecture", uploader=cls.student,
+            subject=Subject.objects.create(name="Programming", course=course),
+            visibility=Note.VISIBILITY_PUBLIC, is_approved=True,
+        )
+
+    def stored(self, *fields):
+        return Note.objects.values_list(*fields).get(pk=self.note.pk)
+
+    def ratings(self):
+        note = Note.objects.get(pk=self.note.pk)
+        return note.rating_sum, note.rating_count, note.rating_breakdown()
+
+    def test_likes_saves_and_comments_follow_their_rows(self):
+        like = NoteLike.objects.create(note=self.note, user=self.reader)
+        NoteSave.objects.create(note=self.note, user=self.reader)
+        comment = Comment.objects.create(
+            note=self.note, user=self.reader, content="Thanks",
+        )
+        Comment.objects.create(note=self.note, user=self.critic, content="Hm")
+        fields = ("likes_count", "saves_count", "comments_count")
+        self.assertEqual(self.stored(*fields), (1, 1, 2))
+
+        like.delete()
+        comment.delete()
+        self.assertEqual(self.stored(*fields), (0, 1, 1))
+
+        # A drifted counter stops at zero instead of failing the check.
+        counters.bump(self.note.pk, likes_count=-1)
+        self.assertEqual(self.stored("likes_count"), (0,))
+
+    def test_ratings_move_the_sum_count_and_stars(self):
+        no_stars = {star: 0 for star in range(1, 6)}
+
+        Rating.objects.create(note=self.note, user=self.reader, value=4)
+        self.assertEqual(self.ratings(), (4, 1, {**no_stars, 4: 1}))
+
+        # Changing a rating moves it between stars; the count stays.
+        Rating.objects.update_or_create(
+            note=self.note, user=self.reader, defaults={"value": 2},
+        )
+        self.assertEqual(self.ratings(), (2, 1, {**no_stars, 2: 1}))
+
+        Rating.objects.create(note=self.note, user=self.critic, value=5)
+        self.assertEqual(self.ratings(), (7, 2, {**no_stars, 2: 1, 5: 1}))
+        self.assertEqual(Note.objects.get(pk=self.note.pk).average_rating(), 3.5)
+
+        Rating.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.ratings(), (5, 1, {**no_stars, 5: 1}))
+
+    def test_rating_deltas(self):
+        self.assertEqual(
+            counters.rating_deltas(None, 3),
+            {"rating_sum": 3, "rating_count": 1, "rating_3_count": 1},
+        )
+        self.assertEqual(
+            counters.rating_deltas(5, 1),
+            {"rating_sum": -4, "rating_count": 0,
+             "rating_5_count": -1, "rating_1_count": 1},
+        )
+        self.assertEqual(
+            counters.rating_deltas(3, 3),
+            {"rating_sum": 0, "rating_count": 0, "rating_3_count": 0},
+        )
+
+    def test_saving_a_loaded_note_keeps_newer_counts(self):
+        stale = Note.objects.get(pk=self.note.pk)
+        NoteLike.objects.create(note=self.note, user=self.reader)
+        Rating.objects.create(note=self.note, user=self.reader, value=5)
+        Note.objects.filter(pk=self.note.pk).update(downloads=3)
+
+        stale.title = "Edited"
+        stale.save()
+        self.assertEqual(
+            self.stored("title", "likes_count", "rating_sum", "downloads"),
+            ("Edited", 1, 5, 3),
+        )
+
+        # Naming update_fields writes exactly those columns.
+        stale.description = "Not written"
+        stale.save(update_fields=["likes_count"])
+        self.assertEqual(self.stored("description", "likes_count"), ("", 0))
+
+    def test_rebuild_repairs_drifted_counters(self):
+        NoteLike.objects.create(note=self.note, user=self.reader)
+        Rating.objects.create(note=self.note, user=self.reader, value=4)
+        Note.objects.filter(pk=self.note.pk).update(
+            likes_count=9, saves_count=2, rating_sum=0, rating_4_count=0,
+        )
+
+        call_command("rebuild_note_counters", stdout=io.StringIO())
+        self.assertEqual(
+            self.stored("likes_count", "saves_count", "rating_sum", "rating_4_count"),
+            (1, 0, 4, 1),
+        )
+
+
+# ======================================================
+# WRITE-BEHIND COUNTERS
+# ======================================================
+@mock.patch.object(counter_buffer, "_start")
+class CounterBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        subject = Subject.objects.create(name="Programming", course=course)
+        cls.notes = [
+            Note.objects.create(
+                title=f"Note {i}", uploader=cls.student, subject=subject,
+                is_approved=True,
+            )
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.addCleanup(counter_buffer._pending.clear)
+        self.addCleanup(counter_buffer._in_flight.clear)
+        self.addCleanup(counter_buffer._wakeup.clear)
+
+    def track(self, note):
+        return self.client.post(f"/api/notes/notes/{note.pk}/track-download/")
+
+    def stored(self, note):
+        return Note.objects.values_list("downloads", flat=True).get(pk=note.pk)
+
+    def test_downloads_are_buffered_and_merged_on_read(self, start):
+        first, second = self.notes
+        with self.assertNumQueries(1):
+            self.assertEqual(self.track(first).data, {"downloads": 1})
+        self.track(first)
+        self.track(second)
+
+        self.assertEqual(self.stored(first), 0)
+        data = AdminNoteSerializer(Note.objects.order_by("pk"), many=True).data
+        self.assertEqual([note["downloads"] for note in data], [2, 1])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counter_buffer.flush(), 3)
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)  # one UPDATE for both notes
+        self.assertEqual((self.stored(first), self.stored(second)), (2, 1))
+        self.assertEqual(self.track(first).data, {"downloads": 3})
+        start.assert_called()
+
+    def test_saving_a_loaded_note_keeps_newer_counts(self, start):
+        note = Note.objects.get(pk=self.notes[0].pk)
+        NoteSave.objects.create(user=self.student, note=note)
+        self.track(note)
+        counter_buffer.flush()
+
+        note.title = "Edited"
+        note.save()
+
+        stored = Note.objects.get(pk=note.pk)
+        self.assertEqual(
+            (stored.title, stored.saves_count, stored.downloads),
+            ("Edited", 1, 1),
+        )
+
+    @override_settings(NOTES_COUNTER_FLUSH_SIZE=2)
+    def test_size_threshold_wakes_the_flusher(self, start):
+        self.track(self.notes[0])
+        self.assertFalse(counter_buffer._wakeup.is_set())
+        self.track(self.notes[1])
+        self.assertTrue(counter_buffer._wakeup.is_set())
+
+    def test_failed_flush_keeps_increments(self, start):
+        self.track(self.notes[0])
+        with mock.patch.object(
+            counter_buffer, "_write", side_effect=RuntimeError("db down")
+        ), self.assertRaises(RuntimeError):
+            counter_buffer.flush()
+        self.assertEqual(counter_buffer.buffered(self.notes[0].pk), 1)
+        self.assertEqual(counter_buffer._in_flight, {})
+
+    def test_reads_do_not_dip_while_a_flush_runs(self, start):
+        note = self.notes[0]
+        self.track(note)
+        seen = []
+
+        def write(pending):
+            seen.append(counter_buffer.buffered(note.pk))
+            self.track(note)  # an increment arriving mid-flush
+            seen.append(counter_buffer.buffered(note.pk))
+
+        with mock.patch.object(counter_buffer, "_write", side_effect=write):
+            counter_buffer.flush()
+        self.assertEqual(seen, [1, 2])
+        self.assertEqual(counter_buffer.buffered(note.pk), 1)
+
+    @override_settings(NOTES_COUNTER_FLUSH_SECONDS=0)
+    def test_write_through(self, start):
+        self.track(self.notes[0])
+        self.assertEqual(self.stored(self.notes[0]), 1)
+        start.assert_not_called()
+
+
+# ======================================================
+# TEXT EXTRACTION
+# ======================================================
+def office_file(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, xml in members.items():
+            archive.writestr(name, xml)
+    buffer.seek(0)
+    return buffer
+
+
+def docx_xml(paragraphs, tail=""):
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+    return (
+        f'<w:document xmlns:w="{extraction.W_NS[1:-1]}"><w:body>'
+        f"{body}{tail}</w:body></w:document>"
+    )
+
+
+def slide_xml(text):
+    return (
+        f'<p:sld xmlns:p="urn:p" xmlns:a="{extraction.A_NS[1:-1]}">'
+        f"<a:p><a:r><a:t>{text}</a:t></a:r></a:p></p:sld>"
+    )
+
+
+class ExtractionTests(TestCase):
+    def test_docx(self):
+        fh = office_file({
+            "word/document.xml": docx_xml(["Binary search", "halves the range"]),
+            "docProps/app.xml": (
+                f'<Properties xmlns="{extraction.EP_NS[1:-1]}">'
+                "<Pages>3</Pages></Properties>"
+            ),
+        })
+        self.assertEqual(
+            extraction.extract_docx(fh), ("Binary search\nhalves the range", 3)
+        )
+
+    def test_pptx_slides_in_order(self):
+        fh = office_file({
+            "ppt/slides/slide10.xml": slide_xml("Ten"),
+            "ppt/slides/slide2.xml": slide_xml("Two"),
+            "ppt/slides/slide1.xml": slide_xml("One"),
+        })
+        text, slides = extraction.extract_pptx(fh)
+        self.assertEqual(text.split(), ["One", "Two", "Ten"])
+        self.assertEqual(slides, 3)
+
+    def test_text_stops_at_the_cap(self):
+        # Malformed XML far past the cap is never parsed.
+        filler = ["word " * 20] * 2000
+        fh = office_file({
+            "word/document.xml": docx_xml(filler, tail="<broken"),
+        })
+        with mock.patch.object(extraction, "MAX_TEXT_CHARS", 50):
+            text, _ = extraction.extract_docx(fh)
+        self.assertEqual(len(text), 50 - 1)  # trailing space stripped
+
+    def test_pdf_page_count_without_pypdf(self):
+        pdf = (
+            b"%PDF-1.4\n1 0 obj <</Type /Pages /Count 2>> endobj\n"
+            b"2 0 obj <</Type /Page>> endobj\n"
+            + b" " * (extraction.CHUNK_SIZE - 40)
+            + b"3 0 obj <</Type/Page>> endobj\n%%EOF"
+        )
+        with mock.patch.object(extraction, "PdfReader", None), \
+                self.assertLogs(extraction.logger, "WARNING"):
+            self.assertEqual(extraction.extract_pdf(io.BytesIO(pdf)), ("", 2))
+
+
+@override_settings(EMAIL_OUTBOX_WORKER=False)
+class ExtractionPipelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.subject = Subject.objects.create(name="Programming", course=course)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def note_with(self, data):
+        return Note.objects.create(
+            title="Lecture", uploader=self.student, subject=self.subject,
+            file=SimpleUploadedFile("lecture.docx", data),
+        )
+
+    def test_process_stores_text_and_reuses_it_for_identical_files(self):
+        data = office_file({
+            "word/document.xml": docx_xml(["Recursion"]),
+        }).getvalue()
+        first = self.note_with(data)
+        extraction.process(first.pk)
+
+        first.refresh_from_db()
+        self.assertEqual(first.extracted_text, "Recursion")
+        self.assertEqual(first.extraction_status, Note.EXTRACTION_DONE)
+
+        second = self.note_with(data)
+        with mock.patch.object(extraction, "extract") as extract:
+            extraction.process(second.pk)
+        extract.assert_not_called()
+        second.refresh_from_db()
+        self.assertEqual(second.extracted_text, "Recursion")
+
+    def test_unreadable_files_are_marked_failed(self):
+        note = self.note_with(b"not a zip")
+        with self.assertLogs(extraction.logger, "ERROR"):
+            extraction.process(note.pk)
+        note.refresh_from_db()
+        self.assertEqual(note.extraction_status, Note.EXTRACTION_FAILED)
+
+
+# ======================================================
+# CONTENT-ADDRESSED STORAGE
+# ======================================================
+class BlobStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.subject = Subject.objects.create(name="Programming", course=course)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.long_ago = timezone.now() - storage.gc_grace() - timedelta(minutes=1)
+
+    def note_with(self, data, name="lecture.pdf"):
+        return Note.objects.create(
+            title="Lecture", uploader=self.student, subject=self.subject,
+            file=SimpleUploadedFile(name, data),
+        )
+
+    def refs(self, note):
+        return FileBlob.objects.get(pk=storage.blob_sha256(note.file.name)).ref_count
+
+    def age(self, name):
+        past = self.long_ago.timestamp()
+        os.utime(storage.note_file_store.path(name), (past, past))
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.note_with(b"same bytes")
+        second = self.note_with(b"same bytes", name="copy.pdf")
+
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(
+            first.file.name,
+            storage.blob_name(hashlib.sha256(b"same bytes").hexdigest(), ".pdf"),
+        )
+        self.assertEqual(self.refs(first), 2)
+        files = list(Path(storage.note_file_store.path(storage.BLOB_DIR)).rglob("*.pdf"))
+        self.assertEqual(len(files), 1)
+
+    def test_references_follow_notes(self):
+        first = self.note_with(b"same bytes")
+        second = self.note_with(b"same bytes")
+        old_name = second.file.name
+
+        second.file = SimpleUploadedFile("lecture.pdf", b"new bytes")
+        second.save()
+        self.assertEqual(self.refs(first), 1)
+        self.assertEqual(self.refs(second), 1)
+
+        first.delete()
+        self.assertEqual(FileBlob.objects.get(name=old_name).ref_count, 0)
+
+    def test_garbage_collection(self):
+        dropped = self.note_with(b"dropped")
+        kept = self.note_with(b"kept")
+        dropped_name = dropped.file.name
+        dropped.delete()
+
+        # Unreferenced, but within the grace period.
+        self.assertEqual(storage.collect_garbage(), 0)
+
+        FileBlob.objects.update(last_used_at=self.long_ago)
+        self.assertEqual(storage.collect_garbage(), 1)
+        self.assertFalse(storage.note_file_store.exists(dropped_name))
+        self.assertFalse(FileBlob.objects.filter(name=dropped_name).exists())
+        self.assertTrue(storage.note_file_store.exists(kept.file.name))
+
+    def test_reuse_protects_a_blob_from_collection(self):
+        note = self.note_with(b"reused")
+        name = note.file.name
+        note.delete()
+        FileBlob.objects.update(last_used_at=self.long_ago)
+
+        # An upload of the same bytes, before its note commits.
+        storage.note_file_store.save(
+            "lecture.pdf", SimpleUploadedFile("lecture.pdf", b"reused")
+        )
+        self.assertEqual(storage.collect_garbage(), 0)
+        self.assertTrue(storage.note_file_store.exists(name))
+
+    def test_files_without_a_row_are_collected(self):
+        name = storage.note_file_store.save(
+            "lecture.pdf", SimpleUploadedFile("lecture.pdf", b"orphan")
+        )
+        self.assertEqual(storage.collect_garbage(), 0)
+
+        self.age(name)
+        self.assertEqual(storage.collect_garbage(), 1)
+        self.assertFalse(storage.note_file_store.exists(name))
+
+
+# ======================================================
+# FILE DOWNLOADS
+# ======================================================
+@override_settings(NOTES_COUNTER_FLUSH_SECONDS=0)
+class NoteDownloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.subject = Subject.objects.create(name="Programming", course=course)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.data = bytes(range(256)) * 4
+        self.note = self.note_with(self.data)
+        self.etag = f'"{hashlib.sha256(self.data).hexdigest()}"'
+
+    def note_with(self, data):
+        return Note.objects.create(
+            title="Lecture", uploader=self.student, subject=self.subject,
+            file=SimpleUploadedFile("lecture.pdf", data),
+        )
+
+    def get(self, note=None, **headers):
+        note = note or self.note
+        return self.client.get(
+            f"/api/notes/notes/{note.pk}/download/", headers=headers
+        )
+
+    def download_count(self):
+        return Note.objects.values_list("downloads", flat=True).get(
+            pk=self.note.pk
+        )
+
+    def test_parse_range(self):
+        parse = downloads.parse_range
+        self.assertIsNone(parse(None, 100))
+        self.assertIsNone(parse("bytes=0-1,5-6", 100))
+        self.assertEqual(parse("bytes=10-19", 100), (10, 19))
+        self.assertEqual(parse("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse("bytes=90-500", 100), (90, 99))
+        self.assertEqual(parse("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse("bytes=-500", 100), (0, 99))
+        self.assertIs(parse("bytes=100-", 100), False)
+        self.assertIs(parse("bytes=-0", 100), False)
+        self.assertIs(parse("bytes=-10", 0), False)
+        self.assertIs(parse("bytes=0-", 0), False)
+
+    def test_full_download(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("attachment", response["Content-Disposition"])
+        self.assertEqual(self.download_count(), 1)
+
+    def test_ranges(self):
+        response = self.get(Range="bytes=0-9")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[:10])
+        self.assertEqual(response["Content-Range"], f"bytes 0-9/{len(self.data)}")
+        self.assertEqual(response["Content-Length"], "10")
+
+        # Later chunks of the same download are not counted again.
+        response = self.get(Range="bytes=-24")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[-24:])
+        self.assertEqual(self.download_count(), 1)
+
+    def test_unsatisfiable_ranges(self):
+        response = self.get(Range=f"bytes={len(self.data)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.data)}")
+
+        empty = self.note_with(b"")
+        response = self.get(empty, Range="bytes=-10")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */0")
+
+    def test_if_range(self):
+        response = self.get(Range="bytes=0-9", **{"If-Range": self.etag})
+        self.assertEqual(response.status_code, 206)
+
+        # The client's copy is stale: send the whole current file.
+        response = self.get(Range="bytes=0-9", **{"If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.data)
+
+    def test_if_none_match(self):
+        response = self.get(**{"If-None-Match": f'"other", {self.etag}'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(self.download_count(), 0)
+
+        self.assertEqual(self.get(**{"If-None-Match": '"other"'}).status_code, 200)
+
+    @override_settings(
+        NOTES_DOWNLOAD_ACCEL="nginx", NOTES_ACCEL_PREFIX="/protected/"
+    )
+    def test_nginx_hand_off(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected/" + self.note.file.name
+        )
+        self.assertNotIn("Content-Type", response)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(self.download_count(), 1)
+
+    @override_settings(NOTES_DOWNLOAD_ACCEL="sendfile")
+    def test_sendfile_hand_off(self):
+        response = self.get()
+        self.assertEqual(response["X-Sendfile"], self.note.file.path)
+        self.assertEqual(response.content, b"")
+
+
+# ======================================================
+# UPLOAD LIMITS & RESUMABLE UPLOADS
+# ======================================================
+@override_settings(EMAIL_OUTBOX_WORKER=False)
+class ResumableUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        course = Course.objects.create(name="BSIT")
+        cls.student = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        cls.subject = Subject.objects.create(name="Programming", course=course)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.addCleanup(resumable._hashers.clear)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.data = bytes(range(256)) * 40
+
+    def start(self, size=None, **fields):
+        response = self.client.post(
+            "/api/notes/student/uploads/",
+            {"filename": "lecture.pdf", "size": size or len(self.data), **fields},
+            format="json",
+        )
+        return response
+
+    def send(self, session_id, offset, chunk, **headers):
+        return self.client.patch(
+            f"/api/notes/student/uploads/{session_id}/",
+            chunk,
+            content_type="application/offset+octet-stream",
+            headers={"Upload-Offset": str(offset), **headers},
+        )
+
+    def test_chunks_resume_and_finalize_into_a_note(self):
+        session = self.start(sha256=hashlib.sha256(self.data).hexdigest()).data
+        head, tail = self.data[:4000], self.data[4000:]
+
+        response = self.send(
+            session["id"], 0, head,
+            **{"Upload-SHA256": hashlib.sha256(head).hexdigest()},
+        )
+        self.assertEqual(response.data["offset"], 4000)
+
+        # A retried chunk at a stale offset is refused with the offset.
+        response = self.send(session["id"], 0, head)
+        self.assertEqual((response.status_code, response.data["offset"]), (409, 4000))
+
+        # Another process continues the hash from the part file.
+        resumable._hashers.clear()
+        response = self.send(session["id"], 4000, tail)
+        self.assertTrue(response.data["complete"])
+        self.assertEqual(
+            response.data["sha256"], hashlib.sha256(self.data).hexdigest()
+        )
+
+        response = self.client.post(
+            f"/api/notes/student/uploads/{session['id']}/finalize/",
+            {"title": "Lecture", "subject": self.subject.pk, "visibility": "public"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        note = Note.objects.get(pk=response.data["id"])
+        with note.file.open("rb") as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(resumable.part_path(session["id"]).exists())
+
+    def test_bad_chunks_leave_the_session_unchanged(self):
+        session = self.start().data
+        self.send(session["id"], 0, self.data[:100])
+
+        response = self.send(
+            session["id"], 100, self.data[100:200],
+            **{"Upload-SHA256": "0" * 64},
+        )
+        self.assertEqual((response.status_code, response.data["offset"]), (400, 100))
+
+        response = self.send(session["id"], 100, self.data[100:] + b"extra")
+        self.assertEqual((response.status_code, response.data["offset"]), (413, 100))
+        self.assertEqual(resumable.part_path(session["id"]).stat().st_size, 100)
+
+        response = self.client.post(
+            f"/api/notes/student/uploads/{session['id']}/finalize/",
+            {"title": "Lecture", "subject": self.subject.pk}, format="json",
+        )
+        self.assertEqual(response.status_code, 409)
+
+    def test_racing_chunks_leave_the_part_file_alone(self):
+        session = self.start().data
+        self.send(session["id"], 0, self.data[:100])
+        path = resumable.part_path(session["id"])
+
+        # A chunk at offset 100 is still being written.
+        with open(path, "r+b") as fh, resumable.locked(fh):
+            response = self.send(session["id"], 100, self.data[100:200])
+        self.assertEqual((response.status_code, response.data["offset"]), (409, 100))
+        self.assertEqual(path.read_bytes(), self.data[:100])
+
+        # It finished; a request that read the session before then loses.
+        stale = UploadSession.objects.get(pk=session["id"])
+        self.send(session["id"], 100, self.data[100:200])
+        with self.assertRaises(resumable.UploadError) as caught:
+            resumable.append(stale, 100, io.BytesIO(b"x" * 100))
+        self.assertEqual(caught.exception.status_code, 409)
+        self.assertEqual(path.read_bytes(), self.data[:200])
+
+    def test_chunk_for_a_discarded_session_is_not_found(self):
+        session = self.start().data
+        discard = resumable.discard
+
+        # The session is finalized elsewhere while this chunk is read.
+        def racing_append(session, *args, **kwargs):
+            discard(UploadSession.objects.get(pk=session.pk))
+            raise resumable.UploadError("gone", 409)
+
+        with mock.patch.object(resumable, "append", racing_append):
+            response = self.send(session["id"], 0, self.data[:100])
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(NOTES_MAX_UPLOAD_SIZE=1000)
+    def test_sessions_over_the_limit_are_refused(self):
+        self.assertEqual(self.start(size=1001).status_code, 413)
+        self.assertEqual(self.start(size=1000).status_code, 201)
+
+    @override_settings(NOTES_MAX_UPLOAD_SIZE=1000)
+    def test_single_shot_upload_is_stopped_while_streaming(self):
+        received = []
+        original = HashingMemoryFileUploadHandler.receive_data_chunk
+
+        def spy(handler, raw_data, start):
+            received.append(len(raw_data))
+            return original(handler, raw_data, start)
+
+        upload = SimpleUploadedFile("lecture.pdf", self.data)
+        with mock.patch.object(
+            HashingMemoryFileUploadHandler, "receive_data_chunk", spy
+        ):
+            response = self.client.post(
+                "/api/notes/student/upload/",
+                {"title": "Lecture", "subject": self.subject.pk, "file": upload},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(sum(received), 0)
+        self.assertFalse(Note.objects.exists())
+
+    @override_settings(NOTES_MAX_UPLOAD_SIZE=1000, DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_declared_length_is_refused_before_reading(self):
+        upload = SimpleUploadedFile("lecture.pdf", self.data)
+        with mock.patch.object(
+            MaxSizeUploadHandler, "receive_data_chunk"
+        ) as receive:
+            response = self.client.post(
+                "/api/notes/student/upload/",
+                {"title": "Lecture", "subject": self.subject.pk, "file": upload},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 413)
+        receive.assert_not_called()
+
+    @override_settings(NOTES_MAX_UPLOAD_SIZE=1000)
+    def test_form_upload_over_the_limit_returns_to_the_form(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.student)
+        upload = SimpleUploadedFile("lecture.pdf", self.data)
+
+        response = client.post(
+            "/notes/upload/",
+            {"title": "Lecture", "subject": self.subject.pk, "file": upload},
+        )
+        self.assertRedirects(
+            response, "/notes/upload/", fetch_redirect_response=False
+        )
+        self.assertFalse(Note.objects.exists())
+
+        # Within the limit the CSRF check still applies.
+        response = client.post("/notes/upload/", {"title": "Lecture"})
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(NOTES_MAX_UPLOAD_SIZE=1000)
+    def test_other_uploads_are_not_held_to_the_note_limit(self):
+        avatar = SimpleUploadedFile("me.txt", self.data, "text/plain")
+        response = self.client.patch(
+            "/api/accounts/student/profile/update/",
+            {"avatar": avatar},
+            format="multipart",
+        )
+        # Refused by the avatar checks, not while streaming.
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("avatar", response.data)
+
+
+# ======================================================
+# MIGRATIONS ON POPULATED DATABASES
+# ======================================================
+class SearchIndexMigrationTests(TransactionTestCase):
+    before = [("notes", "0014_note_engagement_counters")]
+    after = [("notes", "0015_notes_search_index")]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_notes_are_indexed(self):
+        # Only notes was migrated back; other apps are current.
+        course = Course.objects.create(name="BSIT")
+        subject = Subject.objects.create(name="Programming", course=course)
+        uploader = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        apps = self.executor.loader.project_state(self.before).apps
+        note = apps.get_model("notes", "Note").objects.create(
+            title="Recursion basics", description="Call stacks",
+            uploader_id=uploader.pk, subject_id=subject.pk,
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+
+        if search.backend() is None:
+            return
+        column = "rowid" if connection.vendor == "sqlite" else "note_id"
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {column} FROM {search.TABLE}")
+            self.assertEqual([row[0] for row in cursor.fetchall()], [note.pk])
+
+
+class CommentPathMigrationTests(TransactionTestCase):
+    before = [("notes", "0024_file_blob_last_used")]
+    after = [("notes", "0025_comment_path")]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_replies_get_their_paths(self):
+        course = Course.objects.create(name="BSIT")
+        subject = Subject.objects.create(name="Programming", course=course)
+        user = CustomUser.objects.create_user(
+            "S-0001", "student@example.com", "pw-12345678",
+            first_name="Stu", last_name="Dent", course=course,
+        )
+        apps = self.executor.loader.project_state(self.before).apps
+        note = apps.get_model("notes", "Note").objects.create(
+            title="Thread", uploader_id=user.pk, subject_id=subject.pk,
+        )
+        OldComment = apps.get_model("notes", "Comment")
+        root = OldComment.objects.create(note=note, user_id=user.pk)
+        reply = OldComment.objects.create(
+            note=note, user_id=user.pk, parent=root, thread=root, depth=1,
+        )
+        nested = OldComment.objects.create(
+            note=note, user_id=user.pk, parent=reply, thread=root, depth=2,
+        )
+
+        MigrationExecutor(connection).migrate(self.after)
+
+        paths = dict(Comment.objects.values_list("id", "path"))
+        self.assertEqual(paths[root.pk], "")
+        self.assertEqual(paths[reply.pk], f"{root.pk:010d}/")
+        self.assertEqual(paths[nested.pk], f"{root.pk:010d}/{reply.pk:010d}/")
+        self.assertEqual(
+            Comment.objects.get(pk=reply.pk).subtree_path(), paths[nested.pk]
+        )
@@ -0,0 +1,102 @@
+import hashlib
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+from django.template.defaultfilters import filesizeformat
+
+
+def max_upload_size():
+    return getattr(settings, "NOTES_MAX_UPLOAD_SIZE", 10 * 1024 * 1024)
+
+
+def too_large_message():
+    return f"File size must be {filesizeformat(max_upload_size())} or less."
+
+
+class UploadTooLarge(RequestDataTooBig):
+    pass
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Rejects uploaded files over NOTES_MAX_UPLOAD_SIZE while the request
+    is still being read: at once when Content-Length already rules the
+    body out, otherwise at the first chunk past the limit. Nothing more
+    is received or spooled to disk after that. Chunks within the limit
+    pass through.
+
+    Only note uploads are held to this limit, so the handler is not in
+    FILE_UPLOAD_HANDLERS; limit_upload_size() puts it first for one
+    request.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        # Besides the file the body holds boundaries and form fields,
+        # which Django caps at DATA_UPLOAD_MAX_MEMORY_SIZE.
+        allowance = settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0
+        if content_length > max_upload_size() + allowance:
+            raise UploadTooLarge(too_large_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > max_upload_size():
+            raise UploadTooLarge(too_large_message())
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def limit_upload_size(request):
+    """
+    Holds the files of this request to NOTES_MAX_UPLOAD_SIZE. Call it
+    before anything reads request.POST / FILES.
+    """
+    request.upload_handlers.insert(0, MaxSizeUploadHandler(request))
+
+
+class MaxUploadSizeMixin:
+    """
+    For API views that take note files: limit_upload_size() runs before
+    DRF wraps the request, so before any parser reads the body.
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        limit_upload_size(request)
+        return super().initialize_request(request, *args, **kwargs)
+
+
+class HashingMixin:
+    """
+    Computes the SHA-256 of each uploaded file while it is received and
+    exposes it as uploaded_file.sha256 (used by ContentAddressedStorage).
+    """
+
+    def new_file(self, *args, **kwargs):
+        self.hasher = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # An inactive memory handler only passes chunks along.
+        if getattr(self, "activated", True):
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.sha256 = self.hasher.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    pass
@@ -1,19 +1,17 @@
 import json
-import os
+from functools import wraps
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login
 from django.contrib import messages
-from django.http import FileResponse, JsonResponse
+from django.http import Http404, JsonResponse
 from django.urls import reverse
 from django.db.models import Q
 from django.core.paginator import Paginator
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_POST
 from django.core.exceptions import PermissionDenied
-from django.conf import settings
-from django.core.mail import send_mail
 from django.http import HttpResponseForbidden
 from django.db.models import Count
 from django.db.models import Prefetch
@@ -22,7 +20,10 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
 from apps.subjects.models import Course
+from . import extraction, moderation, search, visibility
+from .downloads import serve_note_file
 from .models import Note, Bookmark, Rating, Comment
+from .uploadhandlers import UploadTooLarge, limit_upload_size
 from .forms import NoteForm, CommentForm
 
 
@@ -34,18 +35,6 @@ def is_admin(user):
     return user.is_staff or user.is_superuser
 
 
-def visible_notes(user):
-    qs = Note.objects.filter(is_deleted=False, is_approved=True)
-
-    if not user.is_authenticated:
-        return qs.order_by("-uploaded_at")
-
-    if user.is_staff or user.is_superuser:
-        return Note.objects.filter(is_deleted=False).order_by("-uploaded_at")
-
-    return qs.order_by("-uploaded_at")
-
-
 # =====================================================
 # Notes List
 # =====================================================
@@ -54,14 +43,15 @@ def notes_list(request):
     query = request.GET.get("q", "")
     course_id = request.GET.get("course")
 
-    notes = visible_notes(request.user)
+    # Staff also see notes awaiting moderation.
+    if is_admin(request.user):
+        notes = visibility.reviewable(request.user)
+    else:
+        notes = visibility.feed(request.user)
+    notes = notes.order_by("-uploaded_at")
 
     if query:
-        notes = notes.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(content__icontains=query)
-        )
+        notes = search.filter_notes(notes, query)
 
     if course_id:
         notes = notes.filter(subject__course_id=course_id)
@@ -88,7 +78,32 @@ def notes_list(request):
 # Upload Note
 # =====================================================
 
+def limits_upload_size(view):
+    """
+    Holds a form view's file to NOTES_MAX_UPLOAD_SIZE. The upload
+    handler has to be in place before CSRF reads the body, so the CSRF
+    check runs here instead of in the middleware; a file over the limit
+    goes back to the form with a message instead of a bare 400.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method == "POST":
+            limit_upload_size(request)
+            try:
+                request.POST
+            except UploadTooLarge as exc:
+                messages.error(request, str(exc))
+                return redirect(request.path)
+        return protected(request, *args, **kwargs)
+
+    return wrapper
+
+
 @login_required
+@limits_upload_size
 def note_upload(request):
     if request.method == "POST":
         form = NoteForm(request.POST, request.FILES, user=request.user)
@@ -97,6 +112,7 @@ def note_upload(request):
             note.uploader = request.user
             note.is_approved = False
             note.save()
+            extraction.schedule(note)
             messages.success(request, "Note submitted for approval.")
             return redirect("notes:my_notes")
     else:
@@ -133,16 +149,9 @@ def note_detail(request, pk):
             .first()
         ) or 0
 
-    # ⭐ Rating breakdown (INLINE, no helper)
-    rating_counts = (
-        Rating.objects
-        .filter(note=note)
-        .values("value")
-        .annotate(count=Count("id"))
-    )
-
-    counts_map = {row["value"]: row["count"] for row in rating_counts}
-    total = sum(counts_map.values())
+    # ⭐ Rating breakdown (stored counters, no GROUP BY)
+    counts_map = note.rating_breakdown()
+    total = note.rating_count
 
     rating_rows = []
     for star in range(5, 0, -1):
@@ -210,6 +219,7 @@ def my_notes(request):
 # =====================================================
 
 @login_required
+@limits_upload_size
 def note_update(request, pk):
     note = get_object_or_404(Note, pk=pk, uploader=request.user)
 
@@ -219,6 +229,8 @@ def note_update(request, pk):
             note = form.save(commit=False)
             note.is_approved = False
             note.save()
+            if "file" in form.changed_data:
+                extraction.schedule(note)
             messages.success(request, "Note updated and resubmitted for approval.")
             return redirect("notes:my_notes")
     else:
@@ -249,7 +261,7 @@ def note_delete(request, pk):
 # =====================================================
 @login_required
 def toggle_save_note(request, note_id):
-    note = get_object_or_404(Note, id=note_id)
+    note = visibility.readable_note_or_404(request.user, note_id)
 
     bookmark, created = Bookmark.objects.get_or_create(
         user=request.user,
@@ -293,6 +305,7 @@ def rate_note(request, pk):
         user=request.user,
         defaults={"value": value}
     )
+    note.refresh_from_db(fields=["rating_sum", "rating_count"])
 
     return JsonResponse({
         "success": True,
@@ -317,11 +330,7 @@ def download_note(request, pk):
         messages.error(request, "No file attached.")
         return redirect("notes:note_detail", pk=pk)
 
-    return FileResponse(
-        note.file.open("rb"),
-        as_attachment=True,
-        filename=os.path.basename(note.file.name),
-    )
+    return serve_note_file(request, note)
 
 
 # =====================================================
@@ -330,11 +339,11 @@ def download_note(request, pk):
 
 @login_required
 def saved_notes_list(request):
-    notes = Note.objects.filter(
-        bookmarked_by__user=request.user,
-        is_approved=True,
-        is_deleted=False
-    ).order_by("-uploaded_at")
+    notes = (
+        visibility.feed(request.user)
+        .filter(bookmarked_by__user=request.user)
+        .order_by("-uploaded_at")
+    )
 
     paginator = Paginator(notes, 10)
     page_obj = paginator.get_page(request.GET.get("page"))
@@ -360,44 +369,46 @@ def pending_notes(request):
     return render(request, "notes/pending_notes.html", {"page_obj": page_obj})
 
 
+def _moderation_response(result, done):
+    """
+    JSON answer for one note's moderation result, as in
+    api/views._moderate_one.
+    """
+    if result == moderation.NOT_FOUND:
+        raise Http404
+    if result == moderation.LEASED:
+        return JsonResponse(
+            {"success": False,
+             "detail": "Another reviewer is reviewing this note."},
+            status=409,
+        )
+    if result == moderation.UNCHANGED:
+        return JsonResponse(
+            {"success": False, "detail": f"Note is already {done}."}
+        )
+    return JsonResponse({"success": True})
+
+
 @login_required
 @user_passes_test(is_admin)
 @require_POST
 def approve_note(request, pk):
-    note = get_object_or_404(Note, pk=pk, is_deleted=False)
-    note.is_approved = True
-    note.is_rejected = False
-    note.save()
-    return JsonResponse({"success": True})
+    results = moderation.moderate(request.user, [pk], moderation.APPROVE)
+    return _moderation_response(results[pk], "approved")
 
 
 @login_required
 @user_passes_test(is_admin)
 @require_POST
 def reject_note(request, pk):
-    note = get_object_or_404(Note, pk=pk, is_deleted=False)
-
     data = json.loads(request.body)
     reason = data.get("reason", "").strip()
 
-    note.is_approved = False
-    note.is_rejected = True
-    note.rejection_reason = reason
-    note.save()
-
-    send_mail(
-        subject="Your note was rejected",
-        message=(
-            f"Hi {note.uploader.school_id},\n\n"
-            f"Your note '{note.title}' was rejected.\n\n"
-            f"Reason:\n{note.rejection_reason}"
-        ),
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[note.uploader.email],
-        fail_silently=True,
+    # Emails the uploader through the outbox, in the same transaction.
+    results = moderation.moderate(
+        request.user, [pk], moderation.REJECT, reason
     )
-
-    return JsonResponse({"success": True})
+    return _moderation_response(results[pk], "rejected")
 
 
 # =====================================================
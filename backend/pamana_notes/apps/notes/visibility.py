@@ -0,0 +1,165 @@
+"""
+Who may see which notes.
+
+Every read path (lists, feeds, search, detail, download, comments and the
+comments websocket) goes through this module. A viewer is reduced to
+(role, course_id), and the Q predicate for that pair is built once and
+memoized; callers combine it with their own filters and ordering. All
+predicates filter on Note columns plus the subject FK, so the listing
+indexes on Note (see Note.Meta) stay usable.
+
+    feed(user)        approved notes the user may browse
+    readable(user)    notes the user may open (feed + own uploads +
+                      anything a reviewer can moderate)
+    reviewable(user)  notes an admin/moderator may moderate
+"""
+from functools import lru_cache
+
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+
+from .models import Note
+
+
+ANONYMOUS = "anonymous"
+STUDENT = "student"
+MODERATOR = "moderator"
+ADMIN = "admin"
+
+LIVE = Q(is_deleted=False)
+APPROVED = LIVE & Q(is_approved=True)
+PUBLIC = APPROVED & Q(visibility=Note.VISIBILITY_PUBLIC)
+
+
+def viewer(user):
+    """
+    (role, course_id) for a user; staff and superusers count as admins.
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS, None
+    if user.is_staff or user.is_superuser or user.role == ADMIN:
+        return ADMIN, None
+    if user.role == MODERATOR:
+        return MODERATOR, user.course_id
+    return STUDENT, user.course_id
+
+
+# ======================================================
+# COMPILED PREDICATES
+# ======================================================
+def _moderator_scope(course_id):
+    return Q(subject__course_id=course_id) | Q(subject__is_general=True)
+
+
+@lru_cache(maxsize=512)
+def _feed(role, course_id):
+    if role == ANONYMOUS:
+        return PUBLIC
+    if role == ADMIN:
+        return APPROVED
+
+    predicate = APPROVED & (
+        Q(visibility__in=[Note.VISIBILITY_PUBLIC, Note.VISIBILITY_SCHOOL]) |
+        (
+            Q(visibility=Note.VISIBILITY_COURSE) &
+            (
+                Q(subject__course_id=course_id) |
+                Q(subject__course__isnull=True)
+            )
+        )
+    )
+
+    # Moderators are scoped to their course + general subjects
+    if role == MODERATOR:
+        predicate &= _moderator_scope(course_id)
+    return predicate
+
+
+@lru_cache(maxsize=512)
+def _reviewable(role, course_id):
+    if role == ADMIN:
+        return LIVE
+    if role == MODERATOR:
+        return LIVE & _moderator_scope(course_id)
+    return None
+
+
+@lru_cache(maxsize=512)
+def _readable(role, course_id):
+    predicate = PUBLIC | _feed(role, course_id)
+    review = _reviewable(role, course_id)
+    if review is not None:
+        predicate |= review
+    return predicate
+
+
+# ======================================================
+# PUBLIC API
+# ======================================================
+def feed_predicate(user):
+    return _feed(*viewer(user))
+
+
+def readable_predicate(user):
+    predicate = _readable(*viewer(user))
+    if user is not None and user.is_authenticated:
+        predicate |= LIVE & Q(uploader_id=user.pk)
+    return predicate
+
+
+def feed(user, queryset=None):
+    """
+    Approved notes `user` may browse.
+    """
+    queryset = Note.objects.all() if queryset is None else queryset
+    return queryset.filter(feed_predicate(user))
+
+
+def readable(user, queryset=None):
+    """
+    Notes `user` may open: their feed, public notes, their own live
+    uploads, and for reviewers everything they may moderate.
+    """
+    queryset = Note.objects.all() if queryset is None else queryset
+    return queryset.filter(readable_predicate(user))
+
+
+def reviewable(user, queryset=None):
+    """
+    Live notes an admin or moderator may moderate; none for others.
+    """
+    queryset = Note.objects.all() if queryset is None else queryset
+    predicate = _reviewable(*viewer(user))
+    if predicate is None:
+        return queryset.none()
+    return queryset.filter(predicate)
+
+
+def is_public(values):
+    """
+    Whether a note, or a dict of its column values, is in the public
+    catalogue (the in-memory twin of PUBLIC).
+    """
+    if isinstance(values, dict):
+        get = values.get
+    else:
+        def get(name):
+            return getattr(values, name)
+    return (
+        not get("is_deleted")
+        and get("is_approved")
+        and get("visibility") == Note.VISIBILITY_PUBLIC
+    )
+
+
+def can_read(user, note):
+    if note.is_deleted:
+        return False
+    return readable(user).filter(pk=note.pk).exists()
+
+
+def readable_note_or_404(user, pk, queryset=None):
+    """
+    Fetches and authorizes a note in one query; hidden notes are 404s.
+    """
+    return get_object_or_404(readable(user, queryset), pk=pk)
@@ -1,7 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from rest_framework.response import Response
 
+from apps.core import response_cache
 from apps.subjects.models import Course
 
 
@@ -9,7 +9,9 @@ class PublicCourseListAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        courses = Course.objects.all().order_by("name")
-        return Response(
-            [{"id": c.id, "name": c.name} for c in courses]
+        return response_cache.respond(
+            request, response_cache.PUBLIC_COURSES, self.build
         )
+
+    def build(self):
+        return list(Course.objects.order_by("name").values("id", "name"))
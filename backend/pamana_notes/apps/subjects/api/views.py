@@ -1,9 +1,9 @@
 from rest_framework.views import APIView
-from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 
 from django.db.models import Count, Q
 
+from apps.core import response_cache
 from apps.subjects.models import Subject
 
 
@@ -11,7 +11,12 @@ class PublicSubjectListAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        subjects = (
+        return response_cache.respond(
+            request, response_cache.PUBLIC_SUBJECTS, self.build
+        )
+
+    def build(self):
+        return list(
             Subject.objects
             .filter(
                 notes__visibility="public",
@@ -31,5 +36,3 @@ class PublicSubjectListAPIView(APIView):
             .values("id", "name", "public_notes_count")
             .order_by("name")
         )
-
-        return Response(subjects)
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class SubjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.subjects'
\ No newline at end of file
+    name = 'apps.subjects'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core import response_cache
+
+from .models import Course, Subject
+
+
+# ======================================================
+# PUBLIC CATALOGUE CACHE
+# ======================================================
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def refresh_catalogue_for_subject(sender, instance, **kwargs):
+    # Public notes show their subject's name.
+    response_cache.invalidate(
+        response_cache.PUBLIC_NOTES, response_cache.PUBLIC_SUBJECTS
+    )
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def refresh_catalogue_for_course(sender, instance, **kwargs):
+    response_cache.invalidate(response_cache.PUBLIC_COURSES)
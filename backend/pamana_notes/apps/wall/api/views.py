@@ -4,6 +4,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
 
+from apps.core import idempotency, streaming, toggles
+
 from apps.wall.models import (
     FreedomPost,
     FreedomComment,
@@ -31,12 +33,12 @@ class FreedomPostListCreateAPIView(APIView):
             .select_related("user", "user__profile")
         )
 
-        serializer = FreedomPostSerializer(
+        return streaming.stream_list(
+            request,
             posts,
-            many=True,
+            FreedomPostSerializer,
             context={"request": request},
         )
-        return Response(serializer.data)
 
     def post(self, request):
         serializer = FreedomPostCreateSerializer(
@@ -82,27 +84,19 @@ class FreedomPostLikeAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, post_id):
-        post = get_object_or_404(
-            FreedomPost,
-            id=post_id,
-            is_deleted=False,
-        )
-
-        like, created = FreedomPostLike.objects.get_or_create(
-            post=post,
-            user=request.user,
-        )
-
-        if not created:
-            like.delete()
-            liked = False
-        else:
-            liked = True
+        def perform():
+            get_object_or_404(
+                FreedomPost.objects.only("id"),
+                id=post_id,
+                is_deleted=False,
+            )
+            liked, count = toggles.toggle(
+                FreedomPostLike, "post", post_id, request.user
+            )
+            return {"liked": liked, "likes_count": count}
 
-        return Response({
-            "liked": liked,
-            "likes_count": post.likes.count(),
-        })
+        # One statement per toggle; Idempotency-Key makes retries safe.
+        return idempotency.respond(request, perform)
 
 
 # ======================================================
@@ -135,27 +129,19 @@ class FreedomCommentLikeAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, comment_id):
-        comment = get_object_or_404(
-            FreedomComment,
-            id=comment_id,
-            is_deleted=False,
-        )
-
-        like, created = FreedomCommentLike.objects.get_or_create(
-            comment=comment,
-            user=request.user,
-        )
-
-        if not created:
-            like.delete()
-            liked = False
-        else:
-            liked = True
+        def perform():
+            get_object_or_404(
+                FreedomComment.objects.only("id"),
+                id=comment_id,
+                is_deleted=False,
+            )
+            liked, count = toggles.toggle(
+                FreedomCommentLike, "comment", comment_id, request.user
+            )
+            return {"liked": liked, "likes_count": count}
 
-        return Response({
-            "liked": liked,
-            "likes_count": comment.likes.count(),
-        })
+        # One statement per toggle; Idempotency-Key makes retries safe.
+        return idempotency.respond(request, perform)
 
 
 # ======================================================
@@ -133,11 +133,55 @@ else:
 # =========================
 # CHANNELS
 # =========================
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
+# Multiple ASGI workers need a shared layer: Redis pub/sub when REDIS_URL
+# is set, otherwise a local broker (`manage.py run_channel_broker`) on
+# CHANNEL_BROKER_SOCKET. A single process can keep the in-memory layer.
+REDIS_URL = config("REDIS_URL", default="")
+CHANNEL_BROKER_SOCKET = config("CHANNEL_BROKER_SOCKET", default="")
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+            "CONFIG": {"hosts": [REDIS_URL]},
+        }
+    }
+elif CHANNEL_BROKER_SOCKET:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "apps.core.channel_layers.UnixSocketChannelLayer",
+            "CONFIG": {"path": CHANNEL_BROKER_SOCKET},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        }
+    }
+
+# =========================
+# CACHE
+# =========================
+# Dashboard stats, per-user note counts and the public response cache
+# are invalidated on write, which only works if every worker shares the
+# cache: Redis when REDIS_URL is set, otherwise a database table
+# (created by core migration 0003, or `manage.py createcachetable`).
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "pamana",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": config("CACHE_TABLE", default="pamana_cache"),
+        }
     }
-}
 
 # =========================
 # REST FRAMEWORK
@@ -149,6 +193,19 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    # orjson / msgpack are optional; see apps/core/renderers.py
+    "DEFAULT_RENDERER_CLASSES": (
+        "apps.core.renderers.FastJSONRenderer",
+        "apps.core.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "apps.core.parsers.FastJSONParser",
+        "apps.core.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "apps.core.parsers.MultiPartParser",
+    ),
+    "DEFAULT_CONTENT_NEGOTIATION_CLASS": "apps.core.negotiation.ContentNegotiation",
 }
 
 SIMPLE_JWT = {
@@ -186,6 +243,125 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Hash uploads while they stream in (see apps.notes.storage). Note
+# upload views also stop oversized files mid-stream
+# (apps.notes.uploadhandlers.limit_upload_size).
+FILE_UPLOAD_HANDLERS = [
+    "apps.notes.uploadhandlers.HashingMemoryFileUploadHandler",
+    "apps.notes.uploadhandlers.HashingTemporaryFileUploadHandler",
+]
+
+# =========================
+# NOTE UPLOADS
+# =========================
+# Largest note file, enforced while uploads stream in and for resumable
+# uploads (apps/notes/resumable.py), which expire after
+# NOTES_UPLOAD_SESSION_HOURS without a chunk.
+NOTES_MAX_UPLOAD_SIZE = config("NOTES_MAX_UPLOAD_SIZE", default=10 * 1024 * 1024, cast=int)
+NOTES_UPLOAD_SESSION_HOURS = config("NOTES_UPLOAD_SESSION_HOURS", default=24, cast=int)
+
+# `manage.py gc_note_blobs` spares unreferenced blobs, and stored files
+# without a FileBlob row, for this long after they were last written or
+# reused, so it never races an upload that has not committed yet.
+NOTES_BLOB_GC_GRACE_HOURS = config("NOTES_BLOB_GC_GRACE_HOURS", default=1, cast=int)
+
+# =========================
+# NOTE DOWNLOADS
+# =========================
+# "" serves files from Django (Range/ETag aware). "nginx" answers with
+# X-Accel-Redirect to NOTES_ACCEL_PREFIX (an internal location aliased to
+# MEDIA_ROOT); "sendfile" answers with X-Sendfile for Apache/lighttpd.
+NOTES_DOWNLOAD_ACCEL = config("NOTES_DOWNLOAD_ACCEL", default="")
+NOTES_ACCEL_PREFIX = config("NOTES_ACCEL_PREFIX", default="/protected-media/")
+
+# =========================
+# NOTE FILE EXTRACTION
+# =========================
+# Background threads that pull text out of uploaded PDF/DOCX/PPTX files.
+# 0 runs extraction inline (handy for tests).
+NOTES_EXTRACTION_WORKERS = config("NOTES_EXTRACTION_WORKERS", default=2, cast=int)
+NOTES_EXTRACTION_QUEUE = config("NOTES_EXTRACTION_QUEUE", default=32, cast=int)
+
+# =========================
+# ADMIN DASHBOARD STATS
+# =========================
+# Default uploads-per-day window (?days= overrides, 0 = all history) and
+# how long a computed dashboard stays cached.
+NOTES_STATS_WINDOW_DAYS = config("NOTES_STATS_WINDOW_DAYS", default=90, cast=int)
+NOTES_STATS_CACHE_SECONDS = config("NOTES_STATS_CACHE_SECONDS", default=60, cast=int)
+
+# =========================
+# PUBLIC RESPONSE CACHE
+# =========================
+# How long cached public notes/subjects/courses bodies stay fresh
+# (apps/core/response_cache.py). Content changes invalidate them at
+# once; engagement counters and author details catch up within this.
+RESPONSE_CACHE_SECONDS = config("RESPONSE_CACHE_SECONDS", default=60, cast=int)
+
+# =========================
+# STREAMING LISTS
+# =========================
+# Rows fetched and serialized per batch by unpaged list endpoints that
+# stream their JSON (apps/core/streaming.py).
+STREAMING_CHUNK_SIZE = config("STREAMING_CHUNK_SIZE", default=500, cast=int)
+
+# =========================
+# EMAIL
+# =========================
+# Notifications go through the outbox (apps/core/outbox.py). Use
+# django.core.mail.backends.locmem.EmailBackend or .filebased.EmailBackend
+# (with EMAIL_FILE_PATH) to run without an SMTP server.
+EMAIL_BACKEND = config(
+    "EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend"
+)
+EMAIL_HOST = config("EMAIL_HOST", default="localhost")
+EMAIL_PORT = config("EMAIL_PORT", default=25, cast=int)
+EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
+EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
+EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=False, cast=bool)
+EMAIL_TIMEOUT = config("EMAIL_TIMEOUT", default=10, cast=int)
+EMAIL_FILE_PATH = config("EMAIL_FILE_PATH", default=str(BASE_DIR / "sent_emails"))
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="webmaster@localhost")
+
+# Deliver from a background thread after each commit; False leaves it to
+# `manage.py send_outbox --loop`. Failed sends retry with exponential
+# backoff from EMAIL_OUTBOX_RETRY_SECONDS.
+EMAIL_OUTBOX_WORKER = config("EMAIL_OUTBOX_WORKER", default=True, cast=bool)
+EMAIL_OUTBOX_BATCH = config("EMAIL_OUTBOX_BATCH", default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config("EMAIL_OUTBOX_MAX_ATTEMPTS", default=5, cast=int)
+EMAIL_OUTBOX_RETRY_SECONDS = config("EMAIL_OUTBOX_RETRY_SECONDS", default=60, cast=int)
+
+# =========================
+# REVIEW QUEUE
+# =========================
+# How long a reviewer keeps notes claimed from the work queue before
+# they return to everyone else's queue.
+NOTES_REVIEW_LEASE_SECONDS = config("NOTES_REVIEW_LEASE_SECONDS", default=600, cast=int)
+
+# =========================
+# NOTE COMMENTS
+# =========================
+# Reply levels inlined in comment trees; deeper replies are summarized
+# as a `more_replies` count on the last visible level.
+NOTES_COMMENT_MAX_DEPTH = config("NOTES_COMMENT_MAX_DEPTH", default=5, cast=int)
+
+# =========================
+# NOTE COUNTERS
+# =========================
+# Downloads are counted in memory and written every
+# NOTES_COUNTER_FLUSH_SECONDS, or once NOTES_COUNTER_FLUSH_SIZE are
+# waiting (apps/notes/counter_buffer.py). 0 seconds writes each one.
+NOTES_COUNTER_FLUSH_SECONDS = config("NOTES_COUNTER_FLUSH_SECONDS", default=5, cast=float)
+NOTES_COUNTER_FLUSH_SIZE = config("NOTES_COUNTER_FLUSH_SIZE", default=1000, cast=int)
+
+# =========================
+# IDEMPOTENCY KEYS
+# =========================
+# How long an Idempotency-Key replays its first response (toggles in
+# apps/notes and apps/wall). `manage.py purge_idempotency_keys` deletes
+# older keys.
+IDEMPOTENCY_KEY_HOURS = config("IDEMPOTENCY_KEY_HOURS", default=24, cast=int)
+
 # =========================
 # DEFAULTS
 # =========================
@@ -7,6 +7,7 @@ import {
   TextField,
   Chip,
   Stack,
+  Button,
 } from "@mui/material";
 import { useOutletContext } from "react-router-dom";
 
@@ -29,6 +30,8 @@ export default function Home() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [search, setSearch] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const [detailOpen, setDetailOpen] = useState(false);
   const [detailNote, setDetailNote] = useState(null);
@@ -46,6 +49,7 @@ export default function Home() {
         const list = data.notes || [];
         setNotes(list);
         setFilteredNotes(list);
+        setNextCursor(data.next_cursor ?? null);
       } catch {
         setError("Failed to load notes.");
       } finally {
@@ -67,6 +71,26 @@ export default function Home() {
     );
   }, [search, notes]);
 
+  // The dashboard feed comes in keyset pages; follow next_cursor.
+  const loadMoreNotes = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const data = await apiFetch(
+        `/api/notes/student/dashboard/?cursor=${encodeURIComponent(nextCursor)}`
+      );
+      setNotes((prev) => {
+        const seen = new Set(prev.map((n) => n.id));
+        return [...prev, ...(data.notes || []).filter((n) => !seen.has(n.id))];
+      });
+      setNextCursor(data.next_cursor ?? null);
+    } catch {
+      setError("Failed to load notes.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const openDetails = (note) => {
     setDetailNote(note);
     setDetailOpen(true);
@@ -193,6 +217,18 @@ export default function Home() {
         ))}
       </Stack>
 
+      {nextCursor && (
+        <Box sx={{ display: "flex", justifyContent: "center", mt: 4 }}>
+          <Button
+            variant="outlined"
+            onClick={loadMoreNotes}
+            disabled={loadingMore}
+          >
+            {loadingMore ? "Loading…" : "Load more notes"}
+          </Button>
+        </Box>
+      )}
+
       <NoteDetailModal
         open={detailOpen}
         onClose={() => setDetailOpen(false)}
@@ -31,6 +31,8 @@ const NoteDetailModal = ({ open, onClose, note, onSaved }) => {
   const [likesCount, setLikesCount] = useState(0);
   const [saved, setSaved] = useState(false);
   const [comments, setComments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [replies, setReplies] = useState({});
   const [text, setText] = useState("");
   const [likeAnim, setLikeAnim] = useState(false);
   const [downloads, setDownloads] = useState(0);
@@ -43,18 +45,26 @@ const NoteDetailModal = ({ open, onClose, note, onSaved }) => {
     setDownloads(Number(note.downloads) || 0);
   }, [note]);
 
+  const fetchComments = (cursor) =>
+    axios.get(`${API_BASE}/api/notes/notes/${note.id}/comments/`, {
+      headers: { Authorization: `Bearer ${token}` },
+      params: cursor ? { cursor } : {},
+    });
+
   useEffect(() => {
     if (!open || !note || !token) return;
 
-    axios
-      .get(`${API_BASE}/api/notes/notes/${note.id}/comments/`, {
-        headers: { Authorization: `Bearer ${token}` },
-      })
+    setReplies({});
+    fetchComments()
       .then((res) => {
-        const list = res.data?.comments ?? res.data ?? [];
+        const list = res.data?.comments ?? [];
         setComments(Array.isArray(list) ? list : []);
+        setNextCursor(res.data?.next_cursor ?? null);
       })
-      .catch(() => setComments([]));
+      .catch(() => {
+        setComments([]);
+        setNextCursor(null);
+      });
   }, [open, note, token]);
 
   if (!note) return null;
@@ -114,6 +124,58 @@ const NoteDetailModal = ({ open, onClose, note, onSaved }) => {
       }
     });
 
+  const loadMoreComments = async () => {
+    if (!nextCursor) return;
+    const res = await fetchComments(nextCursor);
+    setComments((prev) => [...prev, ...(res.data?.comments ?? [])]);
+    setNextCursor(res.data?.next_cursor ?? null);
+  };
+
+  // Threads are fetched only when expanded; deeper levels come back as
+  // `more_replies` counts and expand through the same endpoint.
+  const toggleReplies = async (id) => {
+    if (replies[id]) {
+      setReplies(({ [id]: _, ...rest }) => rest);
+      return;
+    }
+    const res = await axios.get(
+      `${API_BASE}/api/notes/comments/${id}/replies/`,
+      { headers: { Authorization: `Bearer ${token}` } }
+    );
+    setReplies((prev) => ({ ...prev, [id]: res.data?.replies ?? [] }));
+  };
+
+  const renderReplies = (list, level = 1) =>
+    list.map((r) => (
+      <Box
+        key={r.id}
+        sx={{
+          ml: 2 * level,
+          mt: 1,
+          pl: 1.5,
+          borderLeft: "2px solid #5d9459",
+        }}
+      >
+        <Typography fontWeight={600} fontSize={15}>
+          {r.user_school_id}
+        </Typography>
+        <Typography fontSize={14}>{r.content}</Typography>
+        <Typography variant="caption" color="text.secondary">
+          {formatTime(r.created_at)}
+        </Typography>
+        {renderReplies(r.replies ?? [], level + 1)}
+        {r.more_replies > 0 && (
+          replies[r.id]
+            ? renderReplies(replies[r.id], level + 1)
+            : (
+              <Button size="small" onClick={() => toggleReplies(r.id)}>
+                Show {r.more_replies} more replies
+              </Button>
+            )
+        )}
+      </Box>
+    ));
+
   const deleteComment = async (id) => {
     await axios.delete(`${API_BASE}/api/notes/comments/${id}/`, {
       headers: { Authorization: `Bearer ${token}` },
@@ -307,8 +369,25 @@ const NoteDetailModal = ({ open, onClose, note, onSaved }) => {
               <Typography variant="caption" color="text.secondary">
                 {formatTime(c.created_at)}
               </Typography>
+
+              {c.reply_count > 0 && (
+                <Box>
+                  <Button size="small" onClick={() => toggleReplies(c.id)}>
+                    {replies[c.id]
+                      ? "Hide replies"
+                      : `Show replies (${c.reply_count})`}
+                  </Button>
+                  {replies[c.id] && renderReplies(replies[c.id])}
+                </Box>
+              )}
             </Box>
           ))}
+
+          {nextCursor && (
+            <Button size="small" onClick={loadMoreComments}>
+              Load more comments
+            </Button>
+          )}
         </Stack>
       </DialogContent>
     </Dialog>
@@ -14,6 +14,7 @@ import {
 } from "@mui/material";
 import axios from "axios";
 import { useNavigate } from "react-router-dom";
+import { uploadResumable } from "../../services/resumableUpload";
 
 const UploadNote = () => {
   const MAX_FILE_SIZE = 10 * 1024 * 1024;
@@ -64,27 +65,29 @@ const UploadNote = () => {
     const token = localStorage.getItem("access");
     if (!token) return setError("Session expired.");
 
-    const data = new FormData();
-    data.append("title", form.title.trim());
-    data.append("description", form.description.trim());
-    data.append("subject", form.subject.id);
-    data.append("visibility", form.visibility);
-    if (form.file) data.append("file", form.file);
+    const fields = {
+      title: form.title.trim(),
+      description: form.description.trim(),
+      subject: form.subject.id,
+      visibility: form.visibility,
+    };
 
     try {
       setProgress(0);
 
-      await axios.post(
-        "http://127.0.0.1:8000/notes/api/student/upload/",
-        data,
-        {
-          headers: { Authorization: `Bearer ${token}` },
-          onUploadProgress: (e) => {
-            if (!e.total) return;
-            setProgress(Math.round((e.loaded * 100) / e.total));
-          },
-        }
-      );
+      if (form.file) {
+        // Chunked, so a dropped connection resumes instead of restarting.
+        await uploadResumable(form.file, fields, {
+          token,
+          onProgress: setProgress,
+        });
+      } else {
+        await axios.post(
+          "http://127.0.0.1:8000/notes/api/student/upload/",
+          fields,
+          { headers: { Authorization: `Bearer ${token}` } }
+        );
+      }
 
       setSuccess("Note submitted successfully for review.");
       setTimeout(() => navigate("/app/my-notes"), 900);
@@ -92,6 +95,8 @@ const UploadNote = () => {
       setError(
         err?.response?.data?.detail ||
           err?.response?.data?.file ||
+          err?.response?.data?.size ||
+          err?.response?.data?.filename ||
           "Upload failed."
       );
     }
@@ -0,0 +1,15 @@
+export function connectReviewSocket(onEvent) {
+  const token = localStorage.getItem("access");
+
+  const socket = new WebSocket(
+    `ws://127.0.0.1:8000/ws/notes/review/?token=${token}`
+  );
+
+  socket.onmessage = (event) => {
+    const data = JSON.parse(event.data);
+    const events = data.event === "batch" ? data.events : [data];
+    events.forEach(onEvent);
+  };
+
+  return socket;
+}
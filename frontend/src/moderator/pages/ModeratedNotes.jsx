@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { apiFetch } from "../../services/api";
 import NoteDetailModal from "../../app/pages/NoteDetailModal";
+import { connectReviewSocket } from "../../hooks/useReviewSocket";
 
 export default function ModeratedNotes() {
   const [notes, setNotes] = useState([]);
@@ -12,6 +13,21 @@ export default function ModeratedNotes() {
     apiFetch("/notes/api/moderated/").then(setNotes);
   }, []);
 
+  // Live list: decisions (anyone's) come in, resubmitted or deleted
+  // notes go back out.
+  useEffect(() => {
+    const socket = connectReviewSocket(({ event, note }) => {
+      if (event === "approved" || event === "rejected") {
+        const decided = { ...note, is_approved: event === "approved" };
+        setNotes((prev) => [decided, ...prev.filter((n) => n.id !== note.id)]);
+      } else {
+        setNotes((prev) => prev.filter((n) => n.id !== note.id));
+      }
+    });
+
+    return () => socket.close();
+  }, []);
+
   const viewNote = async (id) => {
     const note = await apiFetch(`/notes/api/notes/${id}/`);
     setSelectedNote(note);
@@ -1,6 +1,15 @@
 import { useEffect, useState } from "react";
 import { apiFetch } from "../../services/api";
 import NoteDetailModal from "../../app/pages/NoteDetailModal";
+import { connectReviewSocket } from "../../hooks/useReviewSocket";
+
+const detailOf = (err) => {
+  try {
+    return JSON.parse(err.message).detail || err.message;
+  } catch {
+    return err.message;
+  }
+};
 
 export default function PendingNotes() {
   const [notes, setNotes] = useState([]);
@@ -21,26 +30,49 @@ export default function PendingNotes() {
     setOpen(true);
   };
 
-  const approveNote = async (id) => {
-    await apiFetch(`/notes/api/approve/${id}/`, { method: "POST" });
-    loadNotes();
+  // The decided note leaves the list at once; other reviewers' decisions
+  // arrive over the socket. A refused decision (409: another reviewer
+  // holds the note's lease) reloads the list instead.
+  const decide = async (id, url, options) => {
+    try {
+      await apiFetch(url, { method: "POST", ...options });
+      setNotes((prev) => prev.filter((n) => n.id !== id));
+    } catch (err) {
+      alert(detailOf(err));
+      loadNotes();
+    }
   };
 
-  const rejectNote = async (id) => {
+  const approveNote = (id) => decide(id, `/notes/api/approve/${id}/`);
+
+  const rejectNote = (id) => {
     const reason = prompt("Reason for rejection");
     if (!reason) return;
 
-    await apiFetch(`/notes/api/reject/${id}/`, {
-      method: "POST",
+    decide(id, `/notes/api/reject/${id}/`, {
       body: JSON.stringify({ reason }),
     });
-    loadNotes();
   };
 
   useEffect(() => {
     loadNotes();
   }, []);
 
+  // Live queue: new submissions appear, decided notes drop out. The
+  // socket applies the list's lease rule, so a submission another
+  // reviewer already holds is never delivered here.
+  useEffect(() => {
+    const socket = connectReviewSocket(({ event, note }) => {
+      if (event === "submitted") {
+        setNotes((prev) => [note, ...prev.filter((n) => n.id !== note.id)]);
+      } else {
+        setNotes((prev) => prev.filter((n) => n.id !== note.id));
+      }
+    });
+
+    return () => socket.close();
+  }, []);
+
   if (loading) return <p>Loading…</p>;
   if (!notes.length) return <p>No pending notes.</p>;
 
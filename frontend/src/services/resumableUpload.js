@@ -0,0 +1,52 @@
+import axios from "axios";
+
+const API_BASE = "http://127.0.0.1:8000/api/notes/student/uploads/";
+const CHUNK_SIZE = 1024 * 1024;
+const MAX_RETRIES = 5;
+
+// Sends `file` in chunks (backend: apps/notes/resumable.py). A failed
+// chunk is retried from the offset the server reports, so a dropped
+// connection only costs the chunk in flight. Resolves to the new note.
+export async function uploadResumable(file, fields, { token, onProgress }) {
+  const auth = { Authorization: `Bearer ${token}` };
+
+  const { data: session } = await axios.post(
+    API_BASE,
+    { filename: file.name, size: file.size },
+    { headers: auth }
+  );
+  const url = `${API_BASE}${session.id}/`;
+
+  let offset = session.offset;
+  let retries = 0;
+  while (offset < file.size) {
+    try {
+      const { data } = await axios.patch(
+        url,
+        file.slice(offset, offset + CHUNK_SIZE),
+        {
+          headers: {
+            ...auth,
+            "Content-Type": "application/offset+octet-stream",
+            "Upload-Offset": String(offset),
+          },
+        }
+      );
+      offset = data.offset;
+      retries = 0;
+      onProgress?.(Math.round((offset * 100) / file.size));
+    } catch (err) {
+      const status = err?.response?.status;
+      if ((status && status !== 409 && status < 500) || ++retries > MAX_RETRIES) {
+        throw err;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+      ({ data: { offset } } = await axios.get(url, { headers: auth }));
+    }
+  }
+
+  const { data: note } = await axios.post(`${url}finalize/`, fields, {
+    headers: auth,
+  });
+  return note;
+}